@@ -1,6 +1,47 @@
+import asyncio
+import contextlib
+import time
+import weakref
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from address.models import Address
+from core import api_usage
+from DAO import single_flight
+
+# Seconds allowed for one async request (connect + read); callers add their own overall deadline.
+ASYNC_REQUEST_TIMEOUT = getattr(settings, 'GOOGLE_MAPS_ASYNC_TIMEOUT_SECONDS', 5.0)
+ASYNC_MAX_CONNECTIONS = getattr(settings, 'GOOGLE_MAPS_ASYNC_MAX_CONNECTIONS', 200)
+ASYNC_POOLED = getattr(settings, 'GOOGLE_MAPS_ASYNC_POOLED', False)
+
+# Under the ASGI server, one pooled httpx.AsyncClient per event loop shared by every request.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _new_async_session():
+    import httpx  # Only the async code path needs httpx.
+
+    return httpx.AsyncClient(
+        timeout=ASYNC_REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=20),
+    )
+
+
+@contextlib.asynccontextmanager
+async def _async_session():
+    """
+    The pooled client of the running loop when the server keeps its loop (ASGI). Otherwise the
+    loop only lives for this request (async_to_sync under WSGI): a client of its own, closed on exit.
+    """
+    if not ASYNC_POOLED:
+        async with _new_async_session() as session:
+            yield session
+        return
+    loop = asyncio.get_running_loop()
+    session = _async_clients.get(loop)
+    if session is None:
+        session = _async_clients[loop] = _new_async_session()
+    yield session
 
 class GoogleMapsClient:
     def __init__(self, api_key=None):
@@ -10,19 +51,42 @@ class GoogleMapsClient:
         self.base_url = "https://maps.googleapis.com/maps/api"
         self.session = requests.Session()
 
+    def _get_json(self, api, elements, send, label):
+        """
+        Sends one request through the usage ledger. Returns the decoded response, or None when the
+        request failed or the API's soft quota keeps this caller on cached data.
+        """
+        if not api_usage.admit(api, elements):
+            return None
+        started = time.perf_counter()
+        error = True
+        try:
+            response = send()
+            response.raise_for_status()
+            data = response.json()
+            error = False
+            return data
+        except requests.exceptions.RequestException as e:
+            print(f"Error during {label} request: {e}")
+            return None
+        finally:
+            api_usage.record(api, elements, time.perf_counter() - started, error=error)
+
+    def _get_results(self, api, send, label):
+        data = self._get_json(api, 1, send, label)
+        return data.get("results", []) if data else []
+
+    # Identical lookups running at the same time share one request (see DAO.single_flight).
     def geocode(self, address: str):
         """
         Geocodes a human-readable address string. Biased towards Canada.
         """
         endpoint = f"{self.base_url}/geocode/json"
         params = {"address": address, "key": self.api_key, "components": "country:CA"}
-        try:
-            response = self.session.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json().get("results", [])
-        except requests.exceptions.RequestException as e:
-            print(f"Error during geocoding request: {e}")
-            return []
+        return single_flight.run(
+            f"geocode:{single_flight.normalize_query(address)}",
+            lambda: self._get_results('geocode', lambda: self.session.get(endpoint, params=params), "geocoding"),
+        )
 
     def geocode_by_place_id(self, place_id: str):
         """
@@ -30,13 +94,10 @@ class GoogleMapsClient:
         """
         endpoint = f"{self.base_url}/geocode/json"
         params = {"place_id": place_id, "key": self.api_key}
-        try:
-            response = self.session.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json().get("results", [])
-        except requests.exceptions.RequestException as e:
-            print(f"Error during place_id geocoding request: {e}")
-            return []
+        return single_flight.run(
+            f"place_id:{place_id}",
+            lambda: self._get_results('geocode', lambda: self.session.get(endpoint, params=params), "place_id geocoding"),
+        )
 
     def place_search(self, business_name: str, address_query: str):
         """
@@ -49,13 +110,56 @@ class GoogleMapsClient:
             "key": self.api_key,
             "region": "ca"
         }
+        return single_flight.run(
+            f"place_search:{single_flight.normalize_query(full_query)}",
+            lambda: self._get_results('place_search', lambda: self.session.get(endpoint, params=params), "place search"),
+        )
+
+    # --- Async API (for async views) ---
+    async def _aget_results(self, api, endpoint, params, label):
+        if not await sync_to_async(api_usage.admit)(api):
+            return []
+        import httpx
+
+        started = time.perf_counter()
+        error = True
         try:
-            response = self.session.get(endpoint, params=params)
+            async with _async_session() as session:
+                response = await session.get(endpoint, params=params)
             response.raise_for_status()
-            return response.json().get("results", [])
-        except requests.exceptions.RequestException as e:
-            print(f"Error during place search request: {e}")
+            results = response.json().get("results", [])
+            error = False
+            return results
+        except httpx.HTTPError as e:
+            print(f"Error during {label} request: {e}")
             return []
+        finally:
+            await sync_to_async(api_usage.record)(api, 1, time.perf_counter() - started, error=error)
+
+    async def ageocode(self, address: str):
+        """Async geocode()."""
+        params = {"address": address, "key": self.api_key, "components": "country:CA"}
+        return await single_flight.arun(
+            f"geocode:{single_flight.normalize_query(address)}",
+            lambda: self._aget_results('geocode', f"{self.base_url}/geocode/json", params, "geocoding"),
+        )
+
+    async def ageocode_by_place_id(self, place_id: str):
+        """Async geocode_by_place_id()."""
+        params = {"place_id": place_id, "key": self.api_key}
+        return await single_flight.arun(
+            f"place_id:{place_id}",
+            lambda: self._aget_results('geocode', f"{self.base_url}/geocode/json", params, "place_id geocoding"),
+        )
+
+    async def aplace_search(self, business_name: str, address_query: str):
+        """Async place_search()."""
+        query = f"{business_name} {address_query}"
+        params = {"query": query, "key": self.api_key, "region": "ca"}
+        return await single_flight.arun(
+            f"place_search:{single_flight.normalize_query(query)}",
+            lambda: self._aget_results('place_search', f"{self.base_url}/place/textsearch/json", params, "place search"),
+        )
 
     def geocode_and_save(self, address_string: str):
         results = self.geocode(address_string)
@@ -73,31 +177,35 @@ class GoogleMapsClient:
             "mode": mode,
             "key": self.api_key,
         }
-        try:
-            response = self.session.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error during distance matrix request: {e}")
-            return None
+        elements = len(origin_place_ids) * len(destination_place_ids)
+        return self._get_json('distance_matrix', elements, lambda: self.session.get(endpoint, params=params), "distance matrix")
 
     def compute_routes_matrix(self, origin_place_ids: list, destination_place_ids: list, routing_preference='TRAFFIC_AWARE'):
-        endpoint = "https://routes.googleapis.com/distanceMatrix/v2"
+        return self.compute_routes_matrix_waypoints(
+            [{"placeId": pid} for pid in origin_place_ids],
+            [{"placeId": pid} for pid in destination_place_ids],
+            routing_preference=routing_preference,
+        )
+
+    def compute_routes_matrix_waypoints(self, origin_waypoints: list, destination_waypoints: list, routing_preference='TRAFFIC_AWARE'):
+        """
+        Calls the Routes API matrix endpoint with raw waypoints ({"placeId": ...} or
+        {"location": {"latLng": {...}}}). Returns the list of matrix elements, or None on error
+        or when the soft quota keeps this caller on cached travel times.
+        """
+        endpoint = "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix"
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "originIndex,destinationIndex,duration,distanceMeters,status",
+            "X-Goog-FieldMask": "originIndex,destinationIndex,duration,distanceMeters,status,condition",
         }
         payload = {
-            "origins": [{"waypoint": {"place_id": pid}} for pid in origin_place_ids],
-            "destinations": [{"waypoint": {"place_id": pid}} for pid in destination_place_ids],
+            "origins": [{"waypoint": waypoint} for waypoint in origin_waypoints],
+            "destinations": [{"waypoint": waypoint} for waypoint in destination_waypoints],
             "travelMode": "DRIVE",
             "routingPreference": routing_preference,
         }
-        try:
-            response = self.session.post(endpoint, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error during compute routes matrix request: {e}")
-            return None
+        elements = len(origin_waypoints) * len(destination_waypoints)
+        return self._get_json(
+            'route_matrix', elements, lambda: self.session.post(endpoint, json=payload, headers=headers), "compute routes matrix",
+        )
@@ -0,0 +1,185 @@
+"""
+Request coalescing for GoogleMapsClient. Concurrent callers asking for the same normalized lookup
+share one in-flight request and its result: threads of a process through `run`, tasks of an event
+loop through `arun`.
+
+With GOOGLE_MAPS_SINGLE_FLIGHT_ACROSS_WORKERS, the leader also takes a Postgres advisory lock on
+the key and leaves its result in the Django cache for SHARED_RESULT_SECONDS, so a worker asking for
+the same lookup a moment later waits for it and reuses the answer. Sharing results between workers
+needs a shared cache backend (REDIS_URL).
+"""
+import asyncio
+import contextlib
+import hashlib
+import threading
+import time
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+ACROSS_WORKERS = getattr(settings, 'GOOGLE_MAPS_SINGLE_FLIGHT_ACROSS_WORKERS', False)
+SHARED_RESULT_SECONDS = getattr(settings, 'GOOGLE_MAPS_SINGLE_FLIGHT_RESULT_SECONDS', 30)
+# How long a follower waits on someone else's request before sending its own.
+WAIT_SECONDS = getattr(settings, 'GOOGLE_MAPS_SINGLE_FLIGHT_WAIT_SECONDS', 10)
+_LOCK_POLL_SECONDS = 0.05
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+# One {key: task} table per event loop, dropped with its loop.
+_async_flights = weakref.WeakKeyDictionary()
+
+
+def normalize_query(text):
+    """Case and whitespace do not change what Google returns for a free-text query."""
+    return ' '.join(str(text).casefold().split())
+
+
+def _digest(key):
+    return hashlib.sha1(key.encode('utf-8')).digest()
+
+
+def _cache_key(key):
+    return f'gmaps:single-flight:{_digest(key).hex()}'
+
+
+# --- Across workers ---
+def _lock_id(key):
+    """Advisory locks take a signed 64-bit id."""
+    return int.from_bytes(_digest(key)[:8], 'big', signed=True)
+
+
+def _try_advisory_lock(lock_id):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+        return cursor.fetchone()[0]
+
+
+def _advisory_unlock(lock_id):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+@contextlib.contextmanager
+def _advisory_lock(key):
+    """Holds the key's advisory lock, or gives up after WAIT_SECONDS. A no-op outside Postgres."""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    lock_id = _lock_id(key)
+    deadline = time.monotonic() + WAIT_SECONDS
+    acquired = _try_advisory_lock(lock_id)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(_LOCK_POLL_SECONDS)
+        acquired = _try_advisory_lock(lock_id)
+    try:
+        yield
+    finally:
+        if acquired:
+            _advisory_unlock(lock_id)
+
+
+def _shared_fetch(key, fetch):
+    if not ACROSS_WORKERS:
+        return fetch()
+    cached = cache.get(_cache_key(key))
+    if cached is not None:
+        return cached
+    with _advisory_lock(key):
+        # Whoever held the lock before us may have just answered the same lookup.
+        cached = cache.get(_cache_key(key))
+        if cached is not None:
+            return cached
+        result = fetch()
+        if result:
+            cache.set(_cache_key(key), result, SHARED_RESULT_SECONDS)
+        return result
+
+
+async def _ashared_fetch(key, fetch):
+    if not ACROSS_WORKERS:
+        return await fetch()
+    cached = await cache.aget(_cache_key(key))
+    if cached is not None:
+        return cached
+    lock_id = _lock_id(key) if connection.vendor == 'postgresql' else None
+    acquired = False
+    if lock_id is not None:
+        deadline = time.monotonic() + WAIT_SECONDS
+        acquired = await sync_to_async(_try_advisory_lock)(lock_id)
+        while not acquired and time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_SECONDS)
+            acquired = await sync_to_async(_try_advisory_lock)(lock_id)
+    try:
+        cached = await cache.aget(_cache_key(key))
+        if cached is not None:
+            return cached
+        result = await fetch()
+        if result:
+            await cache.aset(_cache_key(key), result, SHARED_RESULT_SECONDS)
+        return result
+    finally:
+        if acquired:
+            await sync_to_async(_advisory_unlock)(lock_id)
+
+
+# --- Coalescing ---
+def run(key, fetch):
+    """
+    Returns fetch() for `key`, sharing the call with any thread already fetching the same key.
+    Exceptions reach every caller of the shared call.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(WAIT_SECONDS):
+            return fetch()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _shared_fetch(key, fetch)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _forget(flights, key, task):
+    if flights.get(key) is task:
+        del flights[key]
+    if not task.cancelled():
+        # Marks the exception as retrieved when every caller has gone away.
+        task.exception()
+
+
+async def arun(key, fetch):
+    """
+    Async run(): `fetch` is a coroutine function. A caller that is cancelled (e.g. by a search
+    deadline) leaves the shared request running for the others.
+    """
+    flights = _async_flights.setdefault(asyncio.get_running_loop(), {})
+    task = flights.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_ashared_fetch(key, fetch))
+        flights[key] = task
+        task.add_done_callback(lambda done: _forget(flights, key, done))
+    return await asyncio.shield(task)
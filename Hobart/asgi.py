@@ -11,6 +11,13 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Hobart.settings')
+# Same default as wsgi.py: Hobart.settings itself is an empty package.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Hobart.settings.postgres')
 
 application = get_asgi_application()
+
+# Import the URLconf, and with it every view module, now rather than on the first request.
+# Under gunicorn --preload this runs once in the master and the workers fork warm.
+from django.urls import get_resolver  # noqa: E402
+
+get_resolver().url_patterns
@@ -0,0 +1,204 @@
+"""
+Read replicas for the read-only pages. Reads go to a replica only inside `replica_reads()`, which
+the `use_replica` decorator and ReplicaReadMixin open around GET requests of the list, search, map
+and dashboard views; everything else, and every write, uses 'default'.
+
+A replica is skipped while its replay lag exceeds REPLICA_MAX_LAG_SECONDS (checked at most every
+REPLICA_LAG_CHECK_SECONDS per process), and a browser that has just sent a POST reads from
+'default' for REPLICA_STICKY_SECONDS, so users see their own changes.
+
+Replicas are configured with DATABASE_URL_REPLICAS (comma-separated URLs). To try it locally,
+point it at a copy of the development database (two SQLite files will do): migrations and data
+migrations only ever write to 'default'.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'db_primary_until'
+# Models of these apps are always read from 'default' (sessions and permissions must never be stale).
+PRIMARY_ONLY_APPS = frozenset({'sessions', 'auth', 'contenttypes', 'admin'})
+
+_replica = contextvars.ContextVar('read_replica', default=None)
+_lag_lock = threading.Lock()
+# {alias: (lag in seconds or None when unreachable, checked at (monotonic))}
+_lag = {}
+
+_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replica_databases(urls, **options):
+    """Settings helper: {alias: config} for DATABASE_URL_REPLICAS, aliased 'replica', 'replica_2', ..."""
+    import dj_database_url
+
+    databases = {}
+    for index, url in enumerate(url.strip() for url in urls.split(',') if url.strip()):
+        alias = 'replica' if index == 0 else f'replica_{index + 1}'
+        config = dj_database_url.parse(url, **options)
+        # Test runs read the test copy of 'default' instead of creating a database per replica.
+        config['TEST'] = {'MIRROR': 'default'}
+        databases[alias] = config
+    return databases
+
+
+def _settings():
+    return (
+        getattr(settings, 'REPLICA_DATABASES', []),
+        getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30),
+        getattr(settings, 'REPLICA_LAG_CHECK_SECONDS', 5),
+        getattr(settings, 'REPLICA_STICKY_SECONDS', 15),
+    )
+
+
+# --- Lag ---
+def replica_lag(alias):
+    """Seconds the replica is behind, or None when it cannot be reached. Cached per process."""
+    _, _, check_seconds, _ = _settings()
+    now = time.monotonic()
+    with _lag_lock:
+        cached = _lag.get(alias)
+    if cached and now - cached[1] < check_seconds:
+        return cached[0]
+    lag = None
+    try:
+        connection = connections[alias]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(_LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        else:
+            connection.ensure_connection()
+            lag = 0.0
+    except DatabaseError as e:
+        logger.warning("Read replica %s is unreachable: %s", alias, e)
+    with _lag_lock:
+        _lag[alias] = (lag, now)
+    return lag
+
+
+def pick_replica():
+    """A replica within the lag limit, chosen at random, or None to read from 'default'."""
+    replicas, max_lag, _, _ = _settings()
+    healthy = [alias for alias in replicas if (lag := replica_lag(alias)) is not None and lag <= max_lag]
+    return random.choice(healthy) if healthy else None
+
+
+# --- Read scopes ---
+@contextlib.contextmanager
+def replica_reads(alias=None):
+    """Routes the reads made inside the block to a healthy replica (the given one, or any)."""
+    token = _replica.set(alias or pick_replica())
+    try:
+        yield _replica.get()
+    finally:
+        _replica.reset(token)
+
+
+def _is_sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _replica_allowed(request):
+    return request.method in ('GET', 'HEAD') and not _is_sticky(request)
+
+
+def use_replica(view_func):
+    """Function view decorator (sync or async): GET and HEAD requests read from a replica."""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            if not _replica_allowed(request):
+                return await view_func(request, *args, **kwargs)
+            token = _replica.set(await sync_to_async(pick_replica)())
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _replica.reset(token)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not _replica_allowed(request):
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+class ReplicaReadMixin:
+    """Class-based view mixin: GET and HEAD requests read from a replica, including the template rendering."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not _replica_allowed(request):
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            # Template responses query lazily: render while the replica is still selected.
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+
+
+class ReplicaStickinessMiddleware:
+    """After a write request, sends the browser back to 'default' for REPLICA_STICKY_SECONDS."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._mark_sticky(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._mark_sticky(request, await self.get_response(request))
+
+    @staticmethod
+    def _mark_sticky(request, response):
+        replicas, _, _, sticky_seconds = _settings()
+        if replicas and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + sticky_seconds:.0f}',
+                max_age=sticky_seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+# --- Router ---
+class ReplicaRouter:
+    """Sends reads to the replica selected by replica_reads(), if any. Writes always go to 'default'."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as 'default'.
+        return True
@@ -7,6 +7,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import json
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -22,6 +23,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # Ensure GOOGLE_MAPS_API_KEY is loaded from environment variables
 GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
 
+# Google API quotas in billable elements, as JSON, e.g.
+# {"route_matrix": {"period": "month", "soft": 800000, "hard": 1000000}, "geocode": {"period": "day", "hard": 5000}}
+# Past the soft quota commands and jobs run cache-only; past the hard quota every call is refused.
+GOOGLE_API_QUOTAS = json.loads(os.environ.get('GOOGLE_API_QUOTAS') or '{}')
+
+# Identical geocode and place lookups in flight at the same time share one request. Set to 1 to
+# also coordinate workers through a Postgres advisory lock and the cache (needs REDIS_URL).
+GOOGLE_MAPS_SINGLE_FLIGHT_ACROSS_WORKERS = os.environ.get('GOOGLE_MAPS_SINGLE_FLIGHT_ACROSS_WORKERS') == '1'
+
+# Under the ASGI server (SERVER_MODE=asgi, see entrypoint.sh) each worker runs one long-lived event
+# loop that can keep a pooled httpx client. Under WSGI every async view call gets a fresh loop, so
+# the async Google calls open and close a client per request instead.
+GOOGLE_MAPS_ASYNC_POOLED = os.environ.get('SERVER_MODE') == 'asgi'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -49,6 +64,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.permissions.AuthorizationMiddleware',
+    'core.api_usage.ApiCallerMiddleware',
+    'Hobart.db_routers.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,6 +85,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.permissions.authorization_context',
             ],
         },
     },
@@ -75,6 +94,25 @@ TEMPLATES = [
 WSGI_APPLICATION = 'Hobart.wsgi.application'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Set REDIS_URL to share cached data and invalidation stamps between gunicorn workers and
+# instances (requires the `redis` package). The local-memory fallback is per-process.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,5 +1,6 @@
 from .base import *
 import dj_database_url
+from Hobart.db_routers import replica_databases
 import os
 
 # Check if we are running in a Google Cloud Run environment
@@ -30,3 +31,9 @@ SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-postgres-devel
 DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL_POSTGRES'))
 }
+
+# Read replicas for the list, search and map pages (see Hobart.db_routers).
+DATABASES.update(replica_databases(os.environ.get('DATABASE_URL_REPLICAS', '')))
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['Hobart.db_routers.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 30))
@@ -1,5 +1,6 @@
 from .base import *
 import dj_database_url
+from Hobart.db_routers import replica_databases
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
@@ -15,3 +16,9 @@ ALLOWED_HOSTS = allowed_hosts_env.split(',') if allowed_hosts_env else []
 DATABASES = {
     'default': dj_database_url.config(conn_max_age=600)
 }
+
+# Read replicas for the list, search and map pages (see Hobart.db_routers).
+DATABASES.update(replica_databases(os.environ.get('DATABASE_URL_REPLICAS', ''), conn_max_age=600))
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['Hobart.db_routers.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 30))
@@ -15,3 +15,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Hobart.settings.postgres')
 
 application = get_wsgi_application()
+
+# Import the URLconf, and with it every view module, now rather than on the first request.
+# Under gunicorn --preload this runs once in the master and the workers fork warm.
+from django.urls import get_resolver  # noqa: E402
+
+get_resolver().url_patterns
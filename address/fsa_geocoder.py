@@ -0,0 +1,143 @@
+"""
+Offline geocoding fallback. When Google has nothing usable for an address, its FSA (the first three
+characters of the postal code) still places it within a few kilometres. Centroids and bounding
+boxes are computed from the Addresses Google already geocoded; no network call is involved.
+"""
+import re
+import statistics
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .models import FSA, Address
+from .normalization import normalize_postal_code
+
+COORDINATE_QUANTUM = Decimal('0.000001')
+_FSA_RE = re.compile(r'^[ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z]$')
+
+
+def fsa_code(postal_code):
+    """Returns the FSA of a postal code ('h2x1y4' -> 'H2X'), or '' when it has none."""
+    code = normalize_postal_code(postal_code)[:3]
+    return code if _FSA_RE.match(code) else ''
+
+
+def _to_decimal(value):
+    return Decimal(value).quantize(COORDINATE_QUANTUM)
+
+
+# --- Centroids ---
+def compute_fsa_centroids(chunk_size=2000):
+    """
+    Recomputes every FSA's centroid (median of its geocoded addresses, robust to the odd
+    misplaced result), bounding box and address count. FSAs seen in addresses but missing from
+    the table are created. Approximate Addresses are moved to the new centroids.
+    """
+    coordinates = defaultdict(lambda: ([], []))
+    geocoded = Address.objects.filter(
+        precision=Address.Precision.GEOCODED, latitude__isnull=False, longitude__isnull=False,
+    ).values_list('latitude', 'longitude', 'components')
+    for latitude, longitude, components in geocoded.iterator(chunk_size=chunk_size):
+        code = fsa_code(Address.standardized_components(components)['postal_code'])
+        if code:
+            latitudes, longitudes = coordinates[code]
+            latitudes.append(float(latitude))
+            longitudes.append(float(longitude))
+
+    now = timezone.now()
+    existing = {fsa.code: fsa for fsa in FSA.objects.all()}
+    to_create, to_update = [], []
+    for fsa in existing.values():
+        if fsa.code not in coordinates and fsa.address_count:
+            fsa.centroid_latitude = fsa.centroid_longitude = None
+            fsa.min_latitude = fsa.max_latitude = fsa.min_longitude = fsa.max_longitude = None
+            fsa.address_count = 0
+            fsa.centroid_updated_at = now
+            to_update.append(fsa)
+
+    for code, (latitudes, longitudes) in coordinates.items():
+        fsa = existing.get(code) or FSA(code=code)
+        fsa.centroid_latitude = _to_decimal(statistics.median(latitudes))
+        fsa.centroid_longitude = _to_decimal(statistics.median(longitudes))
+        fsa.min_latitude, fsa.max_latitude = _to_decimal(min(latitudes)), _to_decimal(max(latitudes))
+        fsa.min_longitude, fsa.max_longitude = _to_decimal(min(longitudes)), _to_decimal(max(longitudes))
+        fsa.address_count = len(latitudes)
+        fsa.centroid_updated_at = now
+        (to_update if fsa.pk else to_create).append(fsa)
+
+    centroid_fields = [
+        'centroid_latitude', 'centroid_longitude', 'min_latitude', 'max_latitude',
+        'min_longitude', 'max_longitude', 'address_count', 'centroid_updated_at',
+    ]
+    with transaction.atomic():
+        FSA.objects.bulk_create(to_create, batch_size=chunk_size)
+        FSA.objects.bulk_update(to_update, centroid_fields, batch_size=chunk_size)
+        moved = _move_approximate_addresses(load_fsa_centroids())
+
+    return {
+        'fsas': len(coordinates),
+        'created': len(to_create),
+        'addresses': sum(len(latitudes) for latitudes, _ in coordinates.values()),
+        'approximate_moved': moved,
+    }
+
+
+def _move_approximate_addresses(centroids):
+    approximate = list(Address.objects.filter(precision=Address.Precision.FSA_CENTROID))
+    changed = []
+    for address in approximate:
+        coords = centroids.get(_approximate_address_code(address))
+        if coords and (address.latitude, address.longitude) != coords:
+            address.latitude, address.longitude = coords
+            changed.append(address)
+    Address.objects.bulk_update(changed, ['latitude', 'longitude'])
+    return len(changed)
+
+
+def load_fsa_centroids():
+    """Returns {code: (latitude, longitude)} for every FSA with a centroid, in one query."""
+    return {
+        code: (latitude, longitude)
+        for code, latitude, longitude in FSA.objects.filter(centroid_latitude__isnull=False)
+        .values_list('code', 'centroid_latitude', 'centroid_longitude')
+    }
+
+
+# --- Fallback Geocoding ---
+def _approximate_address_label(code):
+    return f"{code} (FSA centroid)"
+
+
+def _approximate_address_code(address):
+    return (address.formatted or '')[:3]
+
+
+class FsaCentroidGeocoder:
+    """
+    Hands out one shared approximate Address per FSA. The centroids are loaded once, so an import
+    can call geocode() for every row without a query per miss.
+    """
+
+    def __init__(self, centroids=None):
+        self.centroids = load_fsa_centroids() if centroids is None else centroids
+        self._addresses = {}
+
+    def coordinates(self, postal_code):
+        """Returns (latitude, longitude) for the postal code's FSA, or None."""
+        return self.centroids.get(fsa_code(postal_code))
+
+    def geocode(self, postal_code):
+        """Returns the approximate Address for the postal code's FSA, or None when it has no centroid."""
+        code = fsa_code(postal_code)
+        coords = self.centroids.get(code)
+        if coords is None:
+            return None
+        if code not in self._addresses:
+            address, _ = Address.objects.update_or_create(
+                precision=Address.Precision.FSA_CENTROID,
+                formatted=_approximate_address_label(code),
+                defaults={'latitude': coords[0], 'longitude': coords[1]},
+            )
+            self._addresses[code] = address
+        return self._addresses[code]
+
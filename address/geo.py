@@ -0,0 +1,33 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres between two points given in degrees."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Returns (min_lat, max_lat, min_lng, max_lng) enclosing a circle of `radius_km` around a point.
+    Cheap to test against indexed latitude/longitude columns before computing exact distances.
+    """
+    lat, lng = float(lat), float(lng)
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    lng_delta = radius_km / (KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta
+
+
+def haversine_km_matrix(lats1, lngs1, lats2, lngs2):
+    """Vectorized haversine_km: an len(lats1) x len(lats2) array of distances between two point sets."""
+    import numpy as np  # Kept out of the module imports: the web request path only needs haversine_km.
+    lat1 = np.radians(np.asarray(lats1, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lngs1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=float))[None, :]
+    lng2 = np.radians(np.asarray(lngs2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from address.models import AddressHealthCounter
+from address.utils import find_address_health_drift, rebuild_address_health_counters
+
+class Command(BaseCommand):
+    help = 'Compares the live address health counters with the Client and EmployeeProfile tables, optionally repairing any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Rebuild the counters from the entity tables if any drift is found.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Checking address health counters against the entity tables...")
+        drift = find_address_health_drift()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters are consistent."))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Found {len(drift)} drifting counter buckets:"))
+        for (entity_type, status_id, territory_id, client_group_id), (stored, live) in sorted(drift.items(), key=str):
+            self.stdout.write(
+                f"  - {AddressHealthCounter.EntityType(entity_type).label} status={status_id} territory={territory_id} "
+                f"group={client_group_id}: stored {stored}, actual {live}"
+            )
+
+        if options['repair']:
+            rebuild_address_health_counters()
+            self.stdout.write(self.style.SUCCESS("Counters rebuilt from the entity tables."))
+        else:
+            self.stdout.write("Run again with --repair to rebuild the counters.")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from address.utils import compact_address_validation_logs, RAW_LOG_RETENTION_DAYS, DAILY_ROLLUP_RETENTION_DAYS
+
+class Command(BaseCommand):
+    help = 'Compacts old AddressValidationLog entries into daily rollups, and old daily rollups into weekly rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, default=RAW_LOG_RETENTION_DAYS,
+                            help=f'Days of individual validation logs to keep (default: {RAW_LOG_RETENTION_DAYS}).')
+        parser.add_argument('--daily-days', type=int, default=DAILY_ROLLUP_RETENTION_DAYS,
+                            help=f'Days of daily rollups to keep before folding them into weeks (default: {DAILY_ROLLUP_RETENTION_DAYS}).')
+
+    def handle(self, *args, **options):
+        raw_days, daily_days = options['raw_days'], options['daily_days']
+        if raw_days < 1 or daily_days < raw_days:
+            raise CommandError('--raw-days must be at least 1 and --daily-days must not be shorter than --raw-days.')
+
+        self.stdout.write(f"Compacting validation logs older than {raw_days} days and daily rollups older than {daily_days} days...")
+        results = compact_address_validation_logs(raw_retention_days=raw_days, daily_retention_days=daily_days)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {results['logs_compacted']} logs into {results['daily_periods_touched']} daily rollups "
+            f"and {results['daily_rollups_compacted']} daily rollups into {results['weekly_periods_touched']} weekly rollups."
+        ))
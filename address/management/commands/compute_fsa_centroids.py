@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from address.fsa_geocoder import compute_fsa_centroids
+
+class Command(BaseCommand):
+    help = 'Recomputes FSA centroids and bounding boxes from geocoded addresses, for the offline geocoding fallback.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Addresses fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Computing FSA centroids from geocoded addresses...")
+        results = compute_fsa_centroids(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {results['fsas']} FSAs ({results['created']} new) from {results['addresses']} addresses; "
+            f"moved {results['approximate_moved']} approximate addresses to their new centroid."
+        ))
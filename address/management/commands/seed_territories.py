@@ -1,4 +1,3 @@
-import json
 from django.core.management.base import BaseCommand
 from address.models import Address
 from organization.models import Territory
@@ -16,29 +15,13 @@ class Command(BaseCommand):
         client_count = 0
 
         with transaction.atomic():
-            for address in Address.objects.filter(raw_response__isnull=False).iterator():
+            for address in Address.objects.exclude(components={}).only('pk', 'components').iterator():
                 address_count += 1
-                
-                try:
-                    raw_data = address.raw_response
-                    # Corrected: address_components is directly under raw_data
-                    address_components = raw_data.get('address_components', [])
-                except AttributeError:
-                    self.stdout.write(self.style.WARNING(f"Skipping address {address.id} due to malformed raw_response structure (missing address_components)."))
-                    continue
-
-                province_name = None
-                region_name = None
-                city_name = None
+                components = address.components
 
-                for component in address_components:
-                    types = component.get('types', [])
-                    if 'administrative_area_level_1' in types: # Province
-                        province_name = component.get('long_name')
-                    elif 'administrative_area_level_2' in types: # Region/RCM
-                        region_name = component.get('long_name')
-                    elif 'locality' in types: # City
-                        city_name = component.get('long_name')
+                province_name = components.get('administrative_area_level_1') # Province
+                region_name = components.get('administrative_area_level_2') # Region/RCM
+                city_name = components.get('locality') # City
                 
                 territory_data = {
                     'PROVINCE': province_name,
@@ -3,6 +3,8 @@ from django.db.models import F
 from client.models import Client
 from employees.models import EmployeeProfile
 from address.models import Address, AddressStatus
+from address.utils import rebuild_address_health_counters
+from core import reference_data
 
 class Command(BaseCommand):
     help = 'One-time command to populate the address_status field for all existing Clients and Employees.'
@@ -11,9 +13,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("--- Starting Batch Address Status Update ---"))
 
         try:
-            complete_status = AddressStatus.objects.get(name='COMPLETE')
-            incomplete_status = AddressStatus.objects.get(name='INCOMPLETE')
-            missing_status = AddressStatus.objects.get(name='MISSING')
+            complete_status = reference_data.complete_status()
+            incomplete_status = reference_data.incomplete_status()
+            missing_status = reference_data.missing_status()
         except AddressStatus.DoesNotExist as e:
             self.stdout.write(self.style.ERROR(f"Critical Error: Could not find required AddressStatus objects. Please ensure they are created. Details: {e}"))
             return
@@ -60,4 +62,8 @@ class Command(BaseCommand):
         self.stdout.write(f"  - {complete_employees} employees set to COMPLETE.")
         self.stdout.write(f"  - {incomplete_employees} employees set to INCOMPLETE.")
 
+        # The bulk MISSING updates bypass the counter signals.
+        rebuild_address_health_counters()
+        self.stdout.write("\nAddress health counters rebuilt.")
+
         self.stdout.write(self.style.SUCCESS("\n--- Batch Update Complete ---"))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_health_counters(apps, schema_editor):
+    AddressHealthCounter = apps.get_model('address', 'AddressHealthCounter')
+    Client = apps.get_model('client', 'Client')
+    EmployeeProfile = apps.get_model('employees', 'EmployeeProfile')
+
+    counters = [
+        AddressHealthCounter(
+            entity_type='CLIENT',
+            address_status_id=row['address_status_id'],
+            territory_id=row['territory_id'],
+            client_group_id=row['client_group_id'],
+            count=row['total'],
+        )
+        for row in Client.objects.order_by().values('address_status_id', 'territory_id', 'client_group_id').annotate(total=Count('id'))
+    ]
+    counters.extend(
+        AddressHealthCounter(entity_type='EMPLOYEE', address_status_id=row['address_status_id'], count=row['total'])
+        for row in EmployeeProfile.objects.order_by().values('address_status_id').annotate(total=Count('id'))
+    )
+    AddressHealthCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0006_remove_address_administrative_area_level_1_and_more'),
+        ('client', '0005_client_territory'),
+        ('employees', '0002_employeeprofile_address_status'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressHealthCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('CLIENT', 'Client'), ('EMPLOYEE', 'Employee')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('address_status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='health_counters', to='address.addressstatus')),
+                ('client_group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='address_health_counters', to='client.clientgroup')),
+                ('territory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='address_health_counters', to='organization.territory')),
+            ],
+            options={
+                'verbose_name': 'Address Health Counter',
+                'verbose_name_plural': 'Address Health Counters',
+                'indexes': [models.Index(fields=['entity_type', 'address_status', 'territory', 'client_group'], name='address_add_entity__e8dff3_idx')],
+            },
+        ),
+        migrations.RunPython(seed_health_counters, migrations.RunPython.noop),
+    ]
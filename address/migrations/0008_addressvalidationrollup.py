@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0007_addresshealthcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressValidationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly')], max_length=10)),
+                ('period_start', models.DateField(help_text='First day of the period (Monday for weekly rollups).')),
+                ('last_timestamp', models.DateTimeField(help_text='Timestamp of the log the closing counts were taken from.')),
+                ('samples', models.PositiveIntegerField(default=0, help_text='Number of validation logs compacted into this period.')),
+                ('clients_complete', models.PositiveIntegerField(default=0)),
+                ('clients_incomplete', models.PositiveIntegerField(default=0)),
+                ('clients_missing', models.PositiveIntegerField(default=0)),
+                ('employees_complete', models.PositiveIntegerField(default=0)),
+                ('employees_incomplete', models.PositiveIntegerField(default=0)),
+                ('employees_missing', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Address Validation Rollup',
+                'verbose_name_plural': 'Address Validation Rollups',
+                'ordering': ['resolution', 'period_start'],
+                'unique_together': {('resolution', 'period_start')},
+            },
+        ),
+    ]
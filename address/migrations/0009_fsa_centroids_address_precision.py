@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0008_addressvalidationrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='precision',
+            field=models.CharField(choices=[('GEOCODED', 'Geocoded'), ('FSA_CENTROID', 'FSA centroid (approximate)')], default='GEOCODED', help_text='How the coordinates were obtained.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='address_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of geocoded addresses behind the centroid.'),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='centroid_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='centroid_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='centroid_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='max_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='max_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='min_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='fsa',
+            name='min_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='address',
+            constraint=models.UniqueConstraint(condition=models.Q(('precision', 'FSA_CENTROID')), fields=('formatted',), name='unique_fsa_centroid_address'),
+        ),
+    ]
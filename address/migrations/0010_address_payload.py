@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from address.payload import compact_components, compress_payload, decompress_payload
+
+BATCH_SIZE = 500
+
+
+def move_raw_responses_to_payloads(apps, schema_editor):
+    """Compacts every Address.raw_response into an AddressPayload row and the components column."""
+    Address = apps.get_model('address', 'Address')
+    AddressPayload = apps.get_model('address', 'AddressPayload')
+
+    payloads, addresses = [], []
+    rows = Address.objects.filter(raw_response__isnull=False).only('pk', 'raw_response', 'components')
+    for address in rows.iterator(chunk_size=BATCH_SIZE):
+        address.components = compact_components(address.raw_response)
+        addresses.append(address)
+        payloads.append(AddressPayload(address_id=address.pk, data=compress_payload(address.raw_response)))
+        if len(payloads) >= BATCH_SIZE:
+            AddressPayload.objects.bulk_create(payloads)
+            Address.objects.bulk_update(addresses, ['components'])
+            payloads, addresses = [], []
+    AddressPayload.objects.bulk_create(payloads)
+    Address.objects.bulk_update(addresses, ['components'])
+
+
+def restore_raw_responses(apps, schema_editor):
+    """Writes the (trimmed) payloads back into Address.raw_response."""
+    Address = apps.get_model('address', 'Address')
+    AddressPayload = apps.get_model('address', 'AddressPayload')
+
+    addresses = []
+    for payload in AddressPayload.objects.iterator(chunk_size=BATCH_SIZE):
+        addresses.append(Address(pk=payload.address_id, raw_response=decompress_payload(payload.data)))
+        if len(addresses) >= BATCH_SIZE:
+            Address.objects.bulk_update(addresses, ['raw_response'])
+            addresses = []
+    Address.objects.bulk_update(addresses, ['raw_response'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0009_fsa_centroids_address_precision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressPayload',
+            fields=[
+                ('address', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='address.address')),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='components',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(move_raw_responses_to_payloads, restore_raw_responses),
+        migrations.RemoveField(
+            model_name='address',
+            name='raw_response',
+        ),
+    ]
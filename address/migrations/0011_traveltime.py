@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0010_address_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_seconds', models.PositiveIntegerField()),
+                ('distance_meters', models.PositiveIntegerField()),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_times_to', to='address.address')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_times_from', to='address.address')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origin', 'destination'), name='unique_travel_time_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0011_traveltime'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(condition=models.Q(('latitude__isnull', False), ('longitude__isnull', False)), fields=['id', 'latitude', 'longitude'], name='address_geocoded_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:28
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """Concurrent first saves could insert a bucket twice; fold each duplicate set into one row."""
+    AddressHealthCounter = apps.get_model('address', 'AddressHealthCounter')
+    fields = ('entity_type', 'address_status_id', 'territory_id', 'client_group_id')
+    duplicates = (
+        AddressHealthCounter.objects.order_by().values(*fields)
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count')).filter(rows__gt=1)
+    )
+    for bucket in duplicates:
+        lookup = {field: bucket[field] for field in fields}
+        rows = AddressHealthCounter.objects.filter(**lookup)
+        rows.exclude(pk=bucket['keep']).delete()
+        rows.update(count=bucket['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0012_hot_query_indexes'),
+        ('client', '0009_hot_query_indexes'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='addresshealthcounter',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'address_status', 'territory', 'client_group'), name='unique_address_health_bucket', nulls_distinct=False),
+        ),
+    ]
@@ -1,12 +1,25 @@
 from django.db import models
 from django.conf import settings
 import decimal
+from .payload import compact_components, compress_payload, decompress_payload
+
+_UNSET = object()
 
 class FSA(models.Model):
     # ... (FSA model remains the same)
     code = models.CharField(max_length=50, unique=True, db_index=True, help_text="The unique code for this FSA.")
     description = models.CharField(max_length=255, blank=True, help_text="A description for this FSA (e.g., city/region).")
 
+    # --- Centroid (computed from geocoded Addresses by compute_fsa_centroids) ---
+    centroid_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    centroid_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    min_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    max_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    min_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    max_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    address_count = models.PositiveIntegerField(default=0, help_text="Number of geocoded addresses behind the centroid.")
+    centroid_updated_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         verbose_name = "FSA"
         verbose_name_plural = "FSAs"
@@ -47,6 +60,69 @@ class AddressValidationLog(models.Model):
     def __str__(self):
         return f"Validation run at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+class AddressValidationRollup(models.Model):
+    """
+    A compacted period of AddressValidationLog history. Keeps the closing counts of the period
+    (the last log recorded in it), so old history stays chartable without keeping every run.
+    """
+    class Resolution(models.TextChoices):
+        DAILY = 'DAILY', 'Daily'
+        WEEKLY = 'WEEKLY', 'Weekly'
+
+    resolution = models.CharField(max_length=10, choices=Resolution.choices)
+    period_start = models.DateField(help_text="First day of the period (Monday for weekly rollups).")
+    last_timestamp = models.DateTimeField(help_text="Timestamp of the log the closing counts were taken from.")
+    samples = models.PositiveIntegerField(default=0, help_text="Number of validation logs compacted into this period.")
+    clients_complete = models.PositiveIntegerField(default=0)
+    clients_incomplete = models.PositiveIntegerField(default=0)
+    clients_missing = models.PositiveIntegerField(default=0)
+    employees_complete = models.PositiveIntegerField(default=0)
+    employees_incomplete = models.PositiveIntegerField(default=0)
+    employees_missing = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['resolution', 'period_start']
+        unique_together = ('resolution', 'period_start')
+        verbose_name = "Address Validation Rollup"
+        verbose_name_plural = "Address Validation Rollups"
+
+    def __str__(self):
+        return f"{self.get_resolution_display()} rollup for {self.period_start}"
+
+class AddressHealthCounter(models.Model):
+    """
+    Live number of Clients or Employees in a given address status, broken down by territory and client group.
+    Maintained incrementally by signals (see address/signals.py) so the dashboard never has to scan the entity tables.
+    """
+    class EntityType(models.TextChoices):
+        CLIENT = 'CLIENT', 'Client'
+        EMPLOYEE = 'EMPLOYEE', 'Employee'
+
+    entity_type = models.CharField(max_length=20, choices=EntityType.choices)
+    address_status = models.ForeignKey(AddressStatus, on_delete=models.CASCADE, null=True, blank=True, related_name='health_counters')
+    territory = models.ForeignKey('organization.Territory', on_delete=models.CASCADE, null=True, blank=True, related_name='address_health_counters')
+    client_group = models.ForeignKey('client.ClientGroup', on_delete=models.CASCADE, null=True, blank=True, related_name='address_health_counters')
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Address Health Counter"
+        verbose_name_plural = "Address Health Counters"
+        indexes = [
+            models.Index(fields=['entity_type', 'address_status', 'territory', 'client_group']),
+        ]
+        constraints = [
+            # One row per bucket; NULL (unset status, territory or group) is a bucket of its own.
+            models.UniqueConstraint(
+                fields=['entity_type', 'address_status', 'territory', 'client_group'],
+                nulls_distinct=False,
+                name='unique_address_health_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entity_type_display()} / {self.address_status or 'UNVALIDATED'}: {self.count}"
+
 class Address(models.Model):
     """
     Stores a rich, structured address, abstracting Google's complexity.
@@ -56,26 +132,104 @@ class Address(models.Model):
     place_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
-    raw_response = models.JSONField(null=True, blank=True)
+    # Long names of the address components keyed by Google type; the full response lives in AddressPayload.
+    components = models.JSONField(default=dict, blank=True)
+
+    class Precision(models.TextChoices):
+        GEOCODED = 'GEOCODED', 'Geocoded'
+        FSA_CENTROID = 'FSA_CENTROID', 'FSA centroid (approximate)'
+
+    precision = models.CharField(max_length=20, choices=Precision.choices, default=Precision.GEOCODED, help_text="How the coordinates were obtained.")
+
+    class Meta:
+        constraints = [
+            # One shared approximate Address per FSA (see address.fsa_geocoder).
+            models.UniqueConstraint(fields=['formatted'], condition=models.Q(precision='FSA_CENTROID'), name='unique_fsa_centroid_address'),
+        ]
+        indexes = [
+            # The map, cost to serve and territory partitioning only read geocoded addresses.
+            models.Index(
+                fields=['id', 'latitude', 'longitude'],
+                condition=models.Q(latitude__isnull=False, longitude__isnull=False),
+                name='address_geocoded_idx',
+            ),
+        ]
+
+    # Component lookups behind the standardized properties, in priority order.
+    COMPONENT_LOOKUPS = {
+        'street_number': ['street_number'],
+        'route': ['route'],
+        'city': ['locality', 'administrative_area_level_3', 'sublocality'],
+        'province': ['administrative_area_level_1'],
+        'postal_code': ['postal_code'],
+    }
+
+    @classmethod
+    def standardized_components(cls, components):
+        """
+        Resolves every standardized property from a `components` dict in a single pass.
+        Useful for bulk reads that fetch components with values() instead of instances.
+        """
+        components = components or {}
+        resolved = dict.fromkeys(cls.COMPONENT_LOOKUPS)
+        for name, types_to_check in cls.COMPONENT_LOOKUPS.items():
+            for comp_type in types_to_check:
+                if comp_type in components:
+                    resolved[name] = components[comp_type]
+                    break
+        return resolved
+
+    # --- Raw Google Response (loaded on demand) ---
+    @property
+    def raw_response(self):
+        """The trimmed Google response, read and decompressed from AddressPayload on access."""
+        pending = self.__dict__.get('_pending_raw_response', _UNSET)
+        if pending is not _UNSET:
+            return pending
+        if self.pk is None:
+            return None
+        try:
+            return decompress_payload(self.payload.data)
+        except AddressPayload.DoesNotExist:
+            return None
+
+    @raw_response.setter
+    def raw_response(self, data):
+        # Written to AddressPayload by save(); components are refreshed right away.
+        self.__dict__['_pending_raw_response'] = data
+        self.components = compact_components(data)
+
+    def save(self, *args, **kwargs):
+        pending = self.__dict__.pop('_pending_raw_response', _UNSET)
+        if pending is not _UNSET and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'components'}
+        super().save(*args, **kwargs)
+        if pending is _UNSET:
+            return
+        if pending:
+            AddressPayload.objects.update_or_create(address=self, defaults={'data': compress_payload(pending)})
+        else:
+            AddressPayload.objects.filter(address=self).delete()
+        # Drop a payload cached by an earlier raw_response read.
+        self._state.fields_cache.pop('payload', None)
 
     # --- Standardized Properties (Abstraction Layer) ---
     def get_component(self, component_type, fallback_types=None):
         """
-        Intelligently searches for a component in the raw_response JSON.
+        Looks up a component's long name in `components`.
         `component_type` is the desired type (e.g., 'locality').
         `fallback_types` is an optional list of other types to try in order.
         """
-        if not self.raw_response or 'address_components' not in self.raw_response:
+        if not self.components:
             return None
-        
+
         types_to_check = [component_type]
         if fallback_types:
             types_to_check.extend(fallback_types)
 
         for comp_type in types_to_check:
-            for component in self.raw_response['address_components']:
-                if comp_type in component.get('types', []):
-                    return component.get('long_name')
+            if comp_type in self.components:
+                return self.components[comp_type]
         return None
 
     @property
@@ -120,7 +274,7 @@ class Address(models.Model):
             'formatted': data.get('formatted_address'),
             'latitude': decimal.Decimal(data['geometry']['location']['lat']),
             'longitude': decimal.Decimal(data['geometry']['location']['lng']),
-            'raw_response': data, # Store the entire response
+            'raw_response': data, # Trimmed and compressed into AddressPayload on save
         }
 
         address, created = cls.objects.update_or_create(place_id=data['place_id'], defaults=defaults)
@@ -128,3 +282,35 @@ class Address(models.Model):
 
     def __str__(self):
         return self.formatted or self.place_id or "Unresolved address"
+
+class AddressPayload(models.Model):
+    """
+    The trimmed Google response behind an Address, zlib-compressed and kept out of the address table
+    so that joins to Address (select_related in every list view) never carry it.
+    """
+    address = models.OneToOneField(Address, on_delete=models.CASCADE, primary_key=True, related_name='payload')
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Payload for {self.address_id}"
+
+
+class TravelTime(models.Model):
+    """
+    Cached driving time and distance from one Address to another (directional: A->B may differ
+    from B->A). Filled from Routes API matrix calls by services.travel_time_service.
+    """
+    origin = models.ForeignKey(Address, on_delete=models.CASCADE, related_name='travel_times_from')
+    destination = models.ForeignKey(Address, on_delete=models.CASCADE, related_name='travel_times_to')
+    duration_seconds = models.PositiveIntegerField()
+    distance_meters = models.PositiveIntegerField()
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'destination'], name='unique_travel_time_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_id} -> {self.destination_id}: {self.duration_seconds}s, {self.distance_meters}m"
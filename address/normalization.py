@@ -0,0 +1,107 @@
+"""
+Canonical keys for legacy address strings, so that clients sharing an address can be geocoded once.
+Two addresses get the same key when they differ only by case, accents, punctuation, street-type
+or direction spelling, or unit/suite numbers.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from unidecode import unidecode
+
+STREET_TYPE_ABBREVIATIONS = {
+    # English
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR', 'BOULEVARD': 'BLVD',
+    'BOUL': 'BLVD', 'BD': 'BLVD', 'CRESCENT': 'CRES', 'COURT': 'CRT', 'CT': 'CRT',
+    'PLACE': 'PL', 'LANE': 'LN', 'HIGHWAY': 'HWY', 'PARKWAY': 'PKY', 'TERRACE': 'TERR', 'SQUARE': 'SQ',
+    'CIRCLE': 'CIR', 'TRAIL': 'TRL', 'EXPRESSWAY': 'EXPY', 'CONCESSION': 'CONC',
+    # French
+    'CHEMIN': 'CH', 'MONTEE': 'MTEE', 'ROUTE': 'RTE', 'RANG': 'RG', 'AUTOROUTE': 'AUT',
+    'PROMENADE': 'PROM', 'CARRE': 'CAR', 'IMPASSE': 'IMP', 'RUELLE': 'RLE',
+}
+
+# Saints in street and city names
+NAME_ABBREVIATIONS = {'SAINT': 'ST', 'SAINTE': 'STE'}
+
+DIRECTION_ABBREVIATIONS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORD': 'N', 'SUD': 'S', 'EST': 'E', 'OUEST': 'O',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+}
+
+# 'STE' is deliberately absent: in Quebec it is far more often Sainte than Suite.
+UNIT_DESIGNATORS = frozenset({
+    'UNIT', 'SUITE', 'APT', 'APARTMENT', 'APP', 'APPARTEMENT', 'BUREAU', 'LOCAL', 'ROOM', 'RM', 'PH',
+})
+
+_PUNCTUATION_RE = re.compile(r"[^A-Z0-9#\- ]+")
+# "#12", "#B" -> unit marker glued to its value
+_HASH_UNIT_RE = re.compile(r'#\s*\w+')
+# "12-345 MAIN ST": Canadian unit-civic notation; keep the civic number
+_UNIT_CIVIC_RE = re.compile(r'^\s*\w{1,6}\s*-\s*(\d+\w?)\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+_POSTAL_CODE_RE = re.compile(r'^([A-Z]\d[A-Z])(\d[A-Z]\d)$')
+
+
+def normalize_postal_code(postal_code):
+    """Uppercases and strips spaces; valid codes are returned as 'A1A 1A1'."""
+    compact = re.sub(r'[^A-Z0-9]', '', unidecode(postal_code or '').upper())
+    match = _POSTAL_CODE_RE.match(compact)
+    return f'{match.group(1)} {match.group(2)}' if match else compact
+
+
+def normalize_address_line(line):
+    """Canonicalizes one legacy address line: accents, case, punctuation, abbreviations and units."""
+    text = unidecode(line or '').upper()
+    text = _UNIT_CIVIC_RE.sub(r'\1', text)
+    text = _HASH_UNIT_RE.sub(' ', text)
+    text = _PUNCTUATION_RE.sub(' ', text).replace('-', ' ')
+
+    tokens = []
+    skip_next = False
+    for token in text.split():
+        if skip_next:
+            skip_next = False
+            continue
+        if token in UNIT_DESIGNATORS:
+            # Drop the designator and the unit number that follows it.
+            skip_next = True
+            continue
+        token = STREET_TYPE_ABBREVIATIONS.get(token, token)
+        token = NAME_ABBREVIATIONS.get(token, token)
+        token = DIRECTION_ABBREVIATIONS.get(token, token)
+        tokens.append(token)
+    return ' '.join(tokens)
+
+
+def address_key(address1, address2='', postal_code=''):
+    """Returns the canonical grouping key for a legacy address, or '' when there is nothing to geocode."""
+    lines = [normalize_address_line(address1), normalize_address_line(address2)]
+    parts = [line for line in lines if line]
+    if not parts:
+        return ''
+    postal = normalize_postal_code(postal_code)
+    if postal:
+        parts.append(postal)
+    return _WHITESPACE_RE.sub(' ', '|'.join(parts)).strip()
+
+
+def address_fingerprint(address1, address2='', postal_code=''):
+    """
+    Digest of the canonical key, stored alongside a geocoded address to tell later whether the
+    legacy fields it came from have changed. Spelling-only edits keep the same fingerprint.
+    """
+    return hashlib.sha1(address_key(address1, address2, postal_code).encode('utf-8')).hexdigest()
+
+
+def group_by_address_key(items, fields):
+    """
+    Groups items by the canonical key of their legacy address. `fields` maps an item to its
+    (address1, address2, postal_code) tuple. Items with an empty key are left out.
+    Returns a dict of key -> list of items, in first-seen order.
+    """
+    groups = defaultdict(list)
+    for item in items:
+        key = address_key(*fields(item))
+        if key:
+            groups[key].append(item)
+    return dict(groups)
@@ -0,0 +1,236 @@
+"""
+Offline parser for the legacy Client address fields (address1, address2, postal_code).
+Splits English and French Canadian addresses into their parts without any API call, so that the
+geocoder receives canonical query strings and rows with nothing to geocode are caught up front.
+Everything is precompiled at import time; a parse is a handful of regex calls and dict lookups.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+from unidecode import unidecode
+from .normalization import STREET_TYPE_ABBREVIATIONS, DIRECTION_ABBREVIATIONS, NAME_ABBREVIATIONS, UNIT_DESIGNATORS
+
+PARSE_CACHE_SIZE = 65536
+
+PROVINCES = {
+    'AB': 'AB', 'ALBERTA': 'AB',
+    'BC': 'BC', 'BRITISH COLUMBIA': 'BC', 'COLOMBIE BRITANNIQUE': 'BC', 'CB': 'BC',
+    'MB': 'MB', 'MANITOBA': 'MB',
+    'NB': 'NB', 'NEW BRUNSWICK': 'NB', 'NOUVEAU BRUNSWICK': 'NB',
+    'NL': 'NL', 'NF': 'NL', 'NFLD': 'NL', 'NEWFOUNDLAND': 'NL', 'NEWFOUNDLAND AND LABRADOR': 'NL',
+    'TERRE NEUVE': 'NL', 'TERRE NEUVE ET LABRADOR': 'NL', 'TN': 'NL',
+    'NS': 'NS', 'NOVA SCOTIA': 'NS', 'NOUVELLE ECOSSE': 'NS',
+    'NT': 'NT', 'NWT': 'NT', 'NORTHWEST TERRITORIES': 'NT', 'TERRITOIRES DU NORD OUEST': 'NT',
+    'NU': 'NU', 'NUNAVUT': 'NU',
+    'ON': 'ON', 'ONT': 'ON', 'ONTARIO': 'ON',
+    'PE': 'PE', 'PEI': 'PE', 'PRINCE EDWARD ISLAND': 'PE', 'ILE DU PRINCE EDOUARD': 'PE', 'IPE': 'PE',
+    'QC': 'QC', 'PQ': 'QC', 'QUE': 'QC', 'QUEBEC': 'QC',
+    'SK': 'SK', 'SASK': 'SK', 'SASKATCHEWAN': 'SK',
+    'YT': 'YT', 'YUKON': 'YT',
+}
+# Full names double as city names (Quebec City): they only count as a province after a municipality.
+_PROVINCE_FULL_NAMES = frozenset(name for name in PROVINCES if len(name) > 4)
+
+# Types written before the name ("RUE ST DENIS", "BOUL ST LAURENT").
+FRENCH_STREET_TYPES = frozenset({
+    'RUE', 'BOULEVARD', 'BOUL', 'BLVD', 'BD', 'AVENUE', 'AVE', 'AV', 'CHEMIN', 'CH', 'MONTEE', 'MTEE',
+    'ROUTE', 'RTE', 'RANG', 'RG', 'PLACE', 'PL', 'PROMENADE', 'PROM', 'IMPASSE', 'IMP', 'ALLEE',
+    'CROISSANT', 'COTE', 'RUELLE', 'RLE', 'AUTOROUTE', 'AUT', 'CARRE', 'CAR', 'TERRASSE', 'PLATEAU',
+})
+# Types written after the name ("MAIN ST", "KING EDWARD AVE").
+ENGLISH_STREET_TYPES = frozenset(
+    {key for key in STREET_TYPE_ABBREVIATIONS if key not in FRENCH_STREET_TYPES}
+    | {value for value in STREET_TYPE_ABBREVIATIONS.values()}
+    | {'ST', 'AVE', 'BLVD', 'WAY', 'GATE', 'ROW', 'HEIGHTS', 'HTS', 'GROVE', 'GR', 'PARK', 'PK', 'LINE', 'SIDEROAD', 'SDRD'}
+) - {'CH', 'MTEE', 'RG', 'AUT', 'PROM', 'IMP', 'RLE', 'CAR'}
+
+_DIRECTIONS = frozenset(DIRECTION_ABBREVIATIONS) | frozenset(DIRECTION_ABBREVIATIONS.values())
+
+_POSTAL_CODE_RE = re.compile(r'\b([ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z])\s*-?\s*(\d[ABCEGHJ-NPRSTV-Z]\d)\b')
+_SEGMENT_SPLIT_RE = re.compile(r'[,;/]')
+_PUNCTUATION_RE = re.compile(r"[^A-Z0-9#\-,;/ ]+")
+_PO_BOX_RE = re.compile(r'\b(?:P\s*O\s*BOX|POST OFFICE BOX|BOX|C\s*P|CASE POSTALE)\s*#?\s*(\d+)\b')
+_UNIT_RE = re.compile(r'(?:\b(?:UNIT|SUITE|APT|APARTMENT|APP|APPARTEMENT|BUREAU|LOCAL|ROOM|RM)\b\s*#?|#)\s*([A-Z0-9]+(?:-[A-Z0-9]+)?)')
+_STREET_RE = re.compile(r'^(?:(?P<unit>[A-Z0-9]{1,6})\s*-\s*)?(?P<civic>\d+[A-Z]?)(?:\s+1/2)?\b\s*(?P<rest>.*)$')
+# Covers the accents of French addresses in one str.translate; unidecode handles anything else.
+_ACCENT_TABLE = str.maketrans(
+    'àâäáãåçèéêëìíîïñòóôöõùúûüýÿÀÂÄÁÃÅÇÈÉÊËÌÍÎÏÑÒÓÔÖÕÙÚÛÜÝ’«»–—',
+    'aaaaaaceeeeiiiinooooouuuuyyAAAAAACEEEEIIIINOOOOOUUUUY\'""--',
+)
+_CIVIC_ONLY_RE = re.compile(r'^\d+[A-Z]?$')
+_MAX_PROVINCE_WORDS = max(len(name.split()) for name in PROVINCES)
+
+
+class ParsedAddress(NamedTuple):
+    civic_number: str = ''
+    street_name: str = ''
+    street_type: str = ''
+    street_type_first: bool = False
+    direction: str = ''
+    unit: str = ''
+    po_box: str = ''
+    municipality: str = ''
+    province: str = ''
+    postal_code: str = ''
+
+    @property
+    def street(self):
+        """The street line without the civic number: type, name and direction in their natural order."""
+        if not self.street_name:
+            return ''
+        parts = [self.street_type, self.street_name] if self.street_type_first else [self.street_name, self.street_type]
+        parts.append(self.direction)
+        return ' '.join(part for part in parts if part)
+
+    @property
+    def has_street_address(self):
+        return bool(self.civic_number and self.street_name)
+
+    @property
+    def is_hopeless(self):
+        """True when there is nothing a geocoder could place: no street, no municipality and no postal code."""
+        return not (self.street_name or self.municipality or self.postal_code)
+
+    @property
+    def canonical_query(self):
+        """A normalized geocoder query; the unit is left out since it does not change the result."""
+        street_line = ' '.join(part for part in (self.civic_number, self.street) if part)
+        region = ' '.join(part for part in (self.province, self.postal_code) if part)
+        return ', '.join(part for part in (street_line, self.municipality, region) if part)
+
+
+def _split_street(rest):
+    """Splits what follows the civic number into (name, type, type_first, direction, trailing tokens)."""
+    tokens = [NAME_ABBREVIATIONS.get(token, token) for token in rest.replace('-', ' ').split()]
+    if not tokens:
+        return '', '', False, '', []
+
+    if len(tokens) > 1 and tokens[0] in FRENCH_STREET_TYPES:
+        street_type = STREET_TYPE_ABBREVIATIONS.get(tokens[0], tokens[0])
+        name_tokens = tokens[1:]
+        if len(name_tokens) > 1 and name_tokens[-1] in _DIRECTIONS:
+            return ' '.join(name_tokens[:-1]), street_type, True, DIRECTION_ABBREVIATIONS.get(name_tokens[-1], name_tokens[-1]), []
+        return ' '.join(name_tokens), street_type, True, '', []
+
+    # English order: the last street type after at least one name token ends the street; anything
+    # after it (and after an optional direction) belongs to the municipality.
+    for position in range(len(tokens) - 1, 0, -1):
+        if tokens[position] in ENGLISH_STREET_TYPES:
+            street_type = STREET_TYPE_ABBREVIATIONS.get(tokens[position], tokens[position])
+            trailing = tokens[position + 1:]
+            direction = ''
+            if trailing and trailing[0] in _DIRECTIONS:
+                direction = DIRECTION_ABBREVIATIONS.get(trailing[0], trailing[0])
+                trailing = trailing[1:]
+            return ' '.join(tokens[:position]), street_type, False, direction, trailing
+
+    direction = ''
+    if len(tokens) > 1 and tokens[-1] in _DIRECTIONS:
+        direction = DIRECTION_ABBREVIATIONS.get(tokens[-1], tokens[-1])
+        tokens = tokens[:-1]
+    return ' '.join(tokens), '', False, direction, []
+
+
+def _split_province(segment, has_municipality):
+    """Returns (remaining text, province code) for a segment that may end with a province."""
+    tokens = segment.split()
+    for size in range(min(len(tokens), _MAX_PROVINCE_WORDS), 0, -1):
+        name = ' '.join(tokens[-size:])
+        province = PROVINCES.get(name)
+        if province:
+            remaining = ' '.join(tokens[:-size])
+            if name in _PROVINCE_FULL_NAMES and not remaining and not has_municipality:
+                return segment, ''
+            return remaining, province
+    return segment, ''
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_address(address1, address2='', postal_code=''):
+    """
+    Parses the legacy address fields into a ParsedAddress. Results are memoized: imports repeat the
+    same addresses (chains, malls) many times and a ParsedAddress is immutable.
+    """
+    text = f'{address1 or ""},{address2 or ""}'
+    if not text.isascii():
+        text = text.translate(_ACCENT_TABLE)
+        if not text.isascii():
+            text = unidecode(text)
+    text = text.upper()
+
+    postal = ''
+    postal_source = (postal_code or '').upper()
+    match = _POSTAL_CODE_RE.search(postal_source) if postal_source else None
+    if match is None:
+        match = _POSTAL_CODE_RE.search(text)
+        if match:
+            text = text[:match.start()] + text[match.end():]
+    if match:
+        postal = f'{match.group(1)} {match.group(2)}'
+
+    civic = street_name = street_type = direction = unit = po_box = province = ''
+    type_first = False
+    # Segments seen before the street line are usually a site name (mall, building); they only
+    # stand in for the municipality when nothing follows the street.
+    municipality_parts = []
+    site_parts = []
+
+    pending_civic = ''
+
+    # Unit and PO box markers are stripped from the whole text once, before it is split into segments.
+    text = _PUNCTUATION_RE.sub(' ', text)
+    if 'BOX' in text or 'C P' in text or 'CASE' in text:
+        box = _PO_BOX_RE.search(text)
+        if box:
+            po_box = box.group(1)
+            text = text[:box.start()] + text[box.end():]
+    if '#' in text or not UNIT_DESIGNATORS.isdisjoint(text.replace(',', ' ').split()):
+        unit_match = _UNIT_RE.search(text)
+        if unit_match:
+            unit = unit_match.group(1)
+            text = text[:unit_match.start()] + text[unit_match.end():]
+
+    for raw_segment in _SEGMENT_SPLIT_RE.split(text):
+        segment = ' '.join(raw_segment.split())
+        if not segment:
+            continue
+
+        if not civic:
+            if _CIVIC_ONLY_RE.match(segment):
+                # "1234, rue Sainte-Catherine": the civic number got its own segment.
+                pending_civic = segment
+                continue
+            if pending_civic:
+                segment = f'{pending_civic} {segment}'
+                pending_civic = ''
+            street = _STREET_RE.match(segment)
+            if street and street.group('rest'):
+                civic = street.group('civic')
+                unit = unit or (street.group('unit') or '')
+                street_name, street_type, type_first, direction, trailing = _split_street(street.group('rest'))
+                segment = ' '.join(trailing)
+                if not segment:
+                    continue
+
+        remaining, found_province = _split_province(segment, bool(municipality_parts or site_parts))
+        if found_province:
+            province = province or found_province
+        if remaining and not remaining.isdigit():
+            name = ' '.join(NAME_ABBREVIATIONS.get(token, token) for token in remaining.replace('-', ' ').split())
+            (municipality_parts if civic else site_parts).append(name)
+
+    return ParsedAddress(
+        civic, street_name, street_type, type_first, direction, unit, po_box,
+        (municipality_parts or site_parts or [''])[0], province, postal,
+    )
+
+
+def geocode_query(address1, address2='', postal_code=''):
+    """
+    The string sent to the geocoder for legacy fields: the canonical form when a street line was
+    recognized, so equivalent spellings share cached results, and the joined raw fields otherwise.
+    """
+    parsed = parse_address(address1, address2, postal_code)
+    if parsed.has_street_address:
+        return parsed.canonical_query
+    return ", ".join(part.strip() for part in (address1, address2, postal_code) if part and part.strip())
@@ -0,0 +1,57 @@
+"""
+Compact storage for Google geocoding responses. Only the parts the app reads are kept, serialized
+without whitespace and zlib-compressed into AddressPayload.data; the component names needed by the
+standardized Address properties are copied into the small Address.components column.
+"""
+import json
+import zlib
+
+COMPRESSION_LEVEL = 6
+KEPT_TOP_LEVEL_KEYS = ('formatted_address', 'place_id', 'types', 'partial_match', 'plus_code')
+# 'political' is attached to most components and tells us nothing.
+IGNORED_COMPONENT_TYPES = frozenset({'political'})
+
+
+def trim_payload(data):
+    """Drops viewports, bounds, navigation points and duplicate short names from a Google result."""
+    if not data:
+        return data
+    trimmed = {key: data[key] for key in KEPT_TOP_LEVEL_KEYS if key in data}
+
+    components = []
+    for component in data.get('address_components', []):
+        compact = {
+            'long_name': component.get('long_name'),
+            'types': [t for t in component.get('types', []) if t not in IGNORED_COMPONENT_TYPES],
+        }
+        if component.get('short_name') not in (None, component.get('long_name')):
+            compact['short_name'] = component['short_name']
+        components.append(compact)
+    trimmed['address_components'] = components
+
+    geometry = data.get('geometry') or {}
+    trimmed['geometry'] = {key: geometry[key] for key in ('location', 'location_type') if key in geometry}
+    return trimmed
+
+
+def compress_payload(data):
+    return zlib.compress(json.dumps(trim_payload(data), separators=(',', ':')).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_payload(blob):
+    data = json.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+    for component in data.get('address_components', []):
+        component.setdefault('short_name', component.get('long_name'))
+    return data
+
+
+def compact_components(data):
+    """Returns {google_type: long_name}, keeping the first component of each type."""
+    components = {}
+    if not data:
+        return components
+    for component in data.get('address_components', []):
+        for comp_type in component.get('types', []):
+            if comp_type not in IGNORED_COMPONENT_TYPES:
+                components.setdefault(comp_type, component.get('long_name'))
+    return components
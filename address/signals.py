@@ -1,35 +1,22 @@
-import json
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Address
-from organization.models import Territory
-from client.models import Client
 
-@receiver(post_save, sender=Address)
+# Senders are lazy 'app_label.ModelName' references and the other apps' models are imported in
+# the handlers, so loading this module (from AddressConfig.ready) does not import them.
+
+@receiver(post_save, sender='address.Address')
 def create_and_assign_territories(sender, instance, created, **kwargs):
     """Signal to create territories from address data and assign them to clients."""
-    if not instance.raw_response: 
+    components = instance.components
+    if not components:
         return
 
-    try:
-        raw_data = instance.raw_response
-        address_components = raw_data.get('address_components', [])
-    except AttributeError:
-        # Log this error in production, for now just return
-        return
+    from organization.models import Territory
+    from client.models import Client
 
-    province_name = None
-    region_name = None
-    city_name = None
-
-    for component in address_components:
-        types = component.get('types', [])
-        if 'administrative_area_level_1' in types: # Province
-            province_name = component.get('long_name')
-        elif 'administrative_area_level_2' in types: # Region/RCM
-            region_name = component.get('long_name')
-        elif 'locality' in types: # City
-            city_name = component.get('long_name')
+    province_name = components.get('administrative_area_level_1')
+    region_name = components.get('administrative_area_level_2')
+    city_name = components.get('locality')
     
     territory_data = {
         'PROVINCE': province_name,
@@ -57,3 +44,97 @@ def create_and_assign_territories(sender, instance, created, **kwargs):
             if client.territory != primary_territory:
                 client.territory = primary_territory
                 client.save() # Note: This will re-trigger signals, be mindful of loops if any
+
+
+# --- Address Health Counters ---
+# Each Client/EmployeeProfile remembers the counter bucket it was loaded with, so a save only
+# has to move one unit between two counter rows instead of recounting the whole table.
+HEALTH_TRACKED_FIELDS = {
+    'client.Client': {'address_status', 'address_status_id', 'territory', 'territory_id', 'client_group', 'client_group_id'},
+    'employees.EmployeeProfile': {'address_status', 'address_status_id'},
+}
+
+@receiver(post_init, sender='client.Client')
+@receiver(post_init, sender='employees.EmployeeProfile')
+def remember_health_bucket(sender, instance, **kwargs):
+    from .utils import get_health_bucket
+    instance._health_bucket = get_health_bucket(instance) if instance.pk else None
+
+@receiver(pre_save, sender='client.Client')
+@receiver(pre_save, sender='employees.EmployeeProfile')
+def load_deferred_health_bucket(sender, instance, update_fields=None, **kwargs):
+    """Instances loaded with .only()/.defer() don't know their stored bucket; fetch it before it is overwritten."""
+    if instance.pk is None or getattr(instance, '_health_bucket', None) is not None:
+        return
+    if update_fields is not None and not HEALTH_TRACKED_FIELDS[sender._meta.label].intersection(update_fields):
+        return
+    from .utils import get_health_bucket
+    stored = sender.objects.filter(pk=instance.pk).first()
+    instance._health_bucket = get_health_bucket(stored) if stored else None
+
+@receiver(post_save, sender='client.Client')
+@receiver(post_save, sender='employees.EmployeeProfile')
+def update_health_counters_on_save(sender, instance, created, update_fields=None, **kwargs):
+    old_bucket = None if created else getattr(instance, '_health_bucket', None)
+    if update_fields is not None and not HEALTH_TRACKED_FIELDS[sender._meta.label].intersection(update_fields):
+        return
+
+    from .utils import get_health_bucket, apply_health_delta
+    new_bucket = get_health_bucket(instance, stored_bucket=old_bucket, saved_fields=update_fields)
+    if new_bucket is None or new_bucket == old_bucket:
+        return
+    if old_bucket is not None:
+        apply_health_delta(old_bucket, -1)
+    apply_health_delta(new_bucket, 1)
+    instance._health_bucket = new_bucket
+
+@receiver(post_delete, sender='client.Client')
+@receiver(post_delete, sender='employees.EmployeeProfile')
+def update_health_counters_on_delete(sender, instance, **kwargs):
+    from .utils import get_health_bucket, apply_health_delta
+    bucket = getattr(instance, '_health_bucket', None) or get_health_bucket(instance)
+    if bucket is not None:
+        apply_health_delta(bucket, -1)
+
+@receiver(pre_delete, sender='organization.Territory')
+@receiver(pre_delete, sender='address.AddressStatus')
+def fold_health_counters_on_delete(sender, instance, **kwargs):
+    """
+    Deleting a territory or status nulls it on the clients with a queryset update, which fires no
+    signals, and cascades to its counter rows; move those counts to the matching unset bucket first.
+    """
+    from .models import AddressHealthCounter
+    from .utils import apply_health_delta
+    is_territory = sender._meta.label == 'organization.Territory'
+    counters = AddressHealthCounter.objects.filter(**{'territory' if is_territory else 'address_status': instance})
+    for counter in counters.exclude(count=0):
+        apply_health_delta((
+            counter.entity_type,
+            counter.address_status_id if is_territory else None,
+            None if is_territory else counter.territory_id,
+            counter.client_group_id,
+        ), counter.count)
+
+
+# --- Cost Simulation Groupings ---
+@receiver(post_save, sender='client.Client')
+@receiver(post_delete, sender='client.Client')
+def invalidate_cost_simulation_groupings(sender, instance, update_fields=None, **kwargs):
+    """The what-if totals are grouped by the clients' territory and group."""
+    if update_fields is not None and not {'territory', 'territory_id', 'client_group', 'client_group_id'} & set(update_fields):
+        return
+    from core.version_stamps import COST_SIMULATION_GROUPINGS, bump
+    bump(COST_SIMULATION_GROUPINGS)
+
+
+# --- Isochrone Cache ---
+@receiver(post_save, sender='address.Address')
+@receiver(post_delete, sender='address.Address')
+@receiver(post_save, sender='client.Client')
+@receiver(post_delete, sender='client.Client')
+def invalidate_isochrones_on_change(sender, instance, update_fields=None, **kwargs):
+    """A moved, added or removed client (or a re-geocoded address) can change any isochrone."""
+    if sender._meta.label == 'client.Client' and update_fields is not None and not {'address', 'address_id'} & set(update_fields):
+        return
+    from core.version_stamps import ISOCHRONES, bump
+    bump(ISOCHRONES)
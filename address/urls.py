@@ -8,6 +8,8 @@ urlpatterns = [
     path('health-dashboard/', views.AddressHealthDashboardView.as_view(), name='health_dashboard'),
 
     # APIs
+    path('api/health-series/', views.health_series_api, name='health_series_api'),
+    path('api/google-usage/', views.google_api_usage_api, name='google_api_usage_api'),
     path('api/search/', views.search_address_api, name='search_address_api'),
     path('api/set-employee-address/', views.set_employee_address_api, name='set_employee_address_api'),
     path('api/set-client-address/', views.set_client_address_api, name='set_client_address_api'),
@@ -1,6 +1,12 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
 from client.models import Client
+from core import reference_data
 from employees.models import EmployeeProfile
-from .models import Address, AddressStatus
+from .models import Address, AddressStatus, AddressHealthCounter, AddressValidationLog, AddressValidationRollup
 
 def run_address_validation_batch():
     """
@@ -8,9 +14,9 @@ def run_address_validation_batch():
     Returns a dictionary with the final counts.
     """
     try:
-        complete_status = AddressStatus.objects.get(name='COMPLETE')
-        incomplete_status = AddressStatus.objects.get(name='INCOMPLETE')
-        missing_status = AddressStatus.objects.get(name='MISSING')
+        complete_status = reference_data.complete_status()
+        incomplete_status = reference_data.incomplete_status()
+        missing_status = reference_data.missing_status()
     except AddressStatus.DoesNotExist:
         # This is a critical failure, so we raise an exception
         raise Exception("Required AddressStatus objects (COMPLETE, INCOMPLETE, MISSING) do not exist in the database.")
@@ -45,6 +51,9 @@ def run_address_validation_batch():
             employees_complete_count += 1
         employee.save(update_fields=['address_status'])
 
+    # The MISSING updates above bypass the counter signals, so realign the counters with the new statuses.
+    rebuild_address_health_counters()
+
     # Return a dictionary with the results
     return {
         "clients_complete": clients_complete_count,
@@ -54,3 +63,270 @@ def run_address_validation_batch():
         "employees_incomplete": employees_incomplete_count,
         "employees_missing": employees_missing_count,
     }
+
+
+# --- Address Health Counters ---
+CLIENT_HEALTH_FIELDS = ('address_status_id', 'territory_id', 'client_group_id')
+EMPLOYEE_HEALTH_FIELDS = ('address_status_id',)
+
+def get_health_bucket(instance, stored_bucket=None, saved_fields=None):
+    """
+    Returns the (entity_type, address_status_id, territory_id, client_group_id) counter bucket of a
+    Client or EmployeeProfile.
+
+    When `saved_fields` is given (a save with update_fields), fields outside it are taken from
+    `stored_bucket` since their database value did not change. Returns None if a field is deferred
+    and no stored value is available.
+    """
+    if isinstance(instance, Client):
+        entity_type, fields = AddressHealthCounter.EntityType.CLIENT, CLIENT_HEALTH_FIELDS
+    else:
+        entity_type, fields = AddressHealthCounter.EntityType.EMPLOYEE, EMPLOYEE_HEALTH_FIELDS
+    values = []
+    for position, field in enumerate(fields, start=1):
+        is_saved = saved_fields is None or field in saved_fields or field[:-3] in saved_fields
+        if is_saved and field in instance.__dict__:
+            values.append(instance.__dict__[field])
+        elif stored_bucket is not None:
+            values.append(stored_bucket[position])
+        else:
+            return None
+    values.extend([None] * (3 - len(values)))
+    return (entity_type, *values)
+
+def apply_health_delta(bucket, delta):
+    """Adds `delta` to a single counter row, creating it on first use."""
+    entity_type, status_id, territory_id, client_group_id = bucket
+    lookup = {
+        'entity_type': entity_type,
+        'address_status_id': status_id,
+        'territory_id': territory_id,
+        'client_group_id': client_group_id,
+    }
+    counter = AddressHealthCounter.objects.filter(**lookup)
+    if counter.update(count=F('count') + delta, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            AddressHealthCounter.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Another save created the bucket first.
+        counter.update(count=F('count') + delta, updated_at=timezone.now())
+
+def count_live_address_health():
+    """
+    Aggregates the real per-bucket counts straight from the Client and EmployeeProfile tables.
+    This is the expensive path, used only by the consistency check and full rebuilds.
+    """
+    live = Counter()
+    for row in Client.objects.order_by().values(*CLIENT_HEALTH_FIELDS).annotate(total=Count('id')):
+        live[(AddressHealthCounter.EntityType.CLIENT, row['address_status_id'], row['territory_id'], row['client_group_id'])] += row['total']
+    for row in EmployeeProfile.objects.order_by().values(*EMPLOYEE_HEALTH_FIELDS).annotate(total=Count('id')):
+        live[(AddressHealthCounter.EntityType.EMPLOYEE, row['address_status_id'], None, None)] += row['total']
+    return live
+
+def count_stored_address_health():
+    """Returns the per-bucket totals currently held in the counter table."""
+    stored = Counter()
+    rows = AddressHealthCounter.objects.order_by().values(
+        'entity_type', 'address_status_id', 'territory_id', 'client_group_id'
+    ).annotate(total=Sum('count'))
+    for row in rows:
+        stored[(row['entity_type'], row['address_status_id'], row['territory_id'], row['client_group_id'])] += row['total']
+    return stored
+
+def find_address_health_drift():
+    """Returns {bucket: (stored, live)} for every bucket where the counters disagree with the tables."""
+    live = count_live_address_health()
+    stored = count_stored_address_health()
+    return {
+        bucket: (stored.get(bucket, 0), live.get(bucket, 0))
+        for bucket in set(live) | set(stored)
+        if stored.get(bucket, 0) != live.get(bucket, 0)
+    }
+
+def rebuild_address_health_counters():
+    """Replaces the counter table with a fresh aggregate of the entity tables."""
+    live = count_live_address_health()
+    with transaction.atomic():
+        AddressHealthCounter.objects.all().delete()
+        AddressHealthCounter.objects.bulk_create([
+            AddressHealthCounter(
+                entity_type=entity_type,
+                address_status_id=status_id,
+                territory_id=territory_id,
+                client_group_id=client_group_id,
+                count=total,
+            )
+            for (entity_type, status_id, territory_id, client_group_id), total in live.items()
+        ])
+    return live
+
+def get_address_health_totals():
+    """
+    Returns the current COMPLETE/INCOMPLETE/MISSING totals from the counter table, keyed like
+    the AddressValidationLog fields so a log entry can be created straight from the result.
+    """
+    totals = {
+        f"{prefix}_{status}": 0
+        for prefix in ('clients', 'employees')
+        for status in ('complete', 'incomplete', 'missing')
+    }
+    rows = AddressHealthCounter.objects.filter(address_status__isnull=False).order_by().values(
+        'entity_type', 'address_status__name'
+    ).annotate(total=Sum('count'))
+    for row in rows:
+        prefix = 'clients' if row['entity_type'] == AddressHealthCounter.EntityType.CLIENT else 'employees'
+        key = f"{prefix}_{row['address_status__name'].lower()}"
+        if key in totals:
+            totals[key] = row['total']
+    return totals
+
+def get_client_health_breakdown(dimension):
+    """
+    Returns the client counters grouped by 'territory' or 'client_group', one dict per
+    dimension value with its complete, incomplete and missing counts.
+    """
+    if dimension not in ('territory', 'client_group'):
+        raise ValueError(f"Unknown health breakdown dimension '{dimension}'.")
+    rows = AddressHealthCounter.objects.filter(
+        entity_type=AddressHealthCounter.EntityType.CLIENT, address_status__isnull=False
+    ).order_by().values(f'{dimension}__name', 'address_status__name').annotate(total=Sum('count'))
+
+    breakdown = {}
+    for row in rows:
+        if not row['total']:
+            continue
+        name = row[f'{dimension}__name'] or 'Unassigned'
+        entry = breakdown.setdefault(name, {'name': name, 'complete': 0, 'incomplete': 0, 'missing': 0})
+        status_key = row['address_status__name'].lower()
+        if status_key in entry:
+            entry[status_key] += row['total']
+    return sorted(breakdown.values(), key=lambda entry: (-entry['incomplete'] - entry['missing'], entry['name']))
+
+
+# --- Validation Log Retention ---
+HEALTH_COUNT_FIELDS = (
+    'clients_complete', 'clients_incomplete', 'clients_missing',
+    'employees_complete', 'employees_incomplete', 'employees_missing',
+)
+RAW_LOG_RETENTION_DAYS = 30
+DAILY_ROLLUP_RETENTION_DAYS = 365
+SERIES_RESOLUTIONS = ('auto', 'raw', 'daily', 'weekly')
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _period_start(timestamp, resolution):
+    day = timezone.localtime(timestamp).date()
+    if resolution == AddressValidationRollup.Resolution.WEEKLY:
+        return day - timedelta(days=day.weekday())
+    return day
+
+def _bucket_health_points(points, resolution):
+    """
+    Groups points (dicts with 'timestamp', 'samples' and the count fields) into daily or weekly
+    periods. Counts are levels rather than events, so each period keeps its closing values.
+    """
+    periods = {}
+    for point in points:
+        start = _period_start(point['timestamp'], resolution)
+        period = periods.get(start)
+        if period is None:
+            periods[start] = dict(point)
+            continue
+        period['samples'] += point['samples']
+        if point['timestamp'] > period['timestamp']:
+            period['timestamp'] = point['timestamp']
+            period.update((field, point[field]) for field in HEALTH_COUNT_FIELDS)
+    return periods
+
+def _merge_into_rollups(points, resolution):
+    """Folds points into the rollups of the given resolution, merging with periods already compacted."""
+    periods = _bucket_health_points(points, resolution)
+    existing = {
+        rollup.period_start: rollup
+        for rollup in AddressValidationRollup.objects.filter(resolution=resolution, period_start__in=list(periods))
+    }
+    to_create, to_update = [], []
+    for start, period in periods.items():
+        rollup = existing.get(start)
+        if rollup is None:
+            rollup = AddressValidationRollup(resolution=resolution, period_start=start, last_timestamp=period['timestamp'], samples=0)
+            to_create.append(rollup)
+        else:
+            to_update.append(rollup)
+        rollup.samples += period['samples']
+        if period['timestamp'] >= rollup.last_timestamp:
+            rollup.last_timestamp = period['timestamp']
+            for field in HEALTH_COUNT_FIELDS:
+                setattr(rollup, field, period[field])
+    AddressValidationRollup.objects.bulk_create(to_create)
+    AddressValidationRollup.objects.bulk_update(to_update, ['samples', 'last_timestamp', *HEALTH_COUNT_FIELDS])
+    return len(periods)
+
+def compact_address_validation_logs(raw_retention_days=RAW_LOG_RETENTION_DAYS, daily_retention_days=DAILY_ROLLUP_RETENTION_DAYS):
+    """
+    Compacts validation logs older than `raw_retention_days` into daily rollups, and daily rollups
+    older than `daily_retention_days` into weekly rollups. Only whole days and whole weeks are
+    compacted, so running it repeatedly is safe.
+    """
+    today = timezone.localdate()
+    raw_cutoff = today - timedelta(days=raw_retention_days)
+    daily_cutoff = today - timedelta(days=daily_retention_days)
+    daily_cutoff -= timedelta(days=daily_cutoff.weekday())
+
+    with transaction.atomic():
+        old_logs = AddressValidationLog.objects.filter(timestamp__lt=_start_of_day(raw_cutoff))
+        log_points = [
+            dict(row, samples=1)
+            for row in old_logs.values('timestamp', *HEALTH_COUNT_FIELDS).iterator()
+        ]
+        daily_periods = _merge_into_rollups(log_points, AddressValidationRollup.Resolution.DAILY)
+        old_logs.delete()
+
+        old_dailies = AddressValidationRollup.objects.filter(
+            resolution=AddressValidationRollup.Resolution.DAILY, period_start__lt=daily_cutoff
+        )
+        daily_points = [
+            dict(row, timestamp=row.pop('last_timestamp'))
+            for row in old_dailies.values('last_timestamp', 'samples', *HEALTH_COUNT_FIELDS)
+        ]
+        weekly_periods = _merge_into_rollups(daily_points, AddressValidationRollup.Resolution.WEEKLY)
+        old_dailies.delete()
+
+    return {
+        'logs_compacted': len(log_points),
+        'daily_periods_touched': daily_periods,
+        'daily_rollups_compacted': len(daily_points),
+        'weekly_periods_touched': weekly_periods,
+    }
+
+def get_health_series(start, end, resolution='auto'):
+    """
+    Returns the chart points between the `start` and `end` dates (inclusive) across raw logs and
+    rollups. 'auto' picks raw, daily or weekly from the span so the payload stays small whatever
+    the length of the history.
+    """
+    if resolution not in SERIES_RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'.")
+    if resolution == 'auto':
+        span = (end - start).days
+        resolution = 'raw' if span <= 31 else 'daily' if span <= 366 else 'weekly'
+
+    start_dt, end_dt = _start_of_day(start), _start_of_day(end + timedelta(days=1))
+    points = [
+        dict(row, samples=1)
+        for row in AddressValidationLog.objects.filter(timestamp__gte=start_dt, timestamp__lt=end_dt)
+        .order_by().values('timestamp', *HEALTH_COUNT_FIELDS)
+    ]
+    points.extend(
+        dict(row, timestamp=row.pop('last_timestamp'))
+        for row in AddressValidationRollup.objects.filter(last_timestamp__gte=start_dt, last_timestamp__lt=end_dt)
+        .order_by().values('last_timestamp', 'samples', *HEALTH_COUNT_FIELDS)
+    )
+
+    if resolution != 'raw':
+        points = list(_bucket_health_points(points, resolution.upper()).values())
+    points.sort(key=lambda point: point['timestamp'])
+    return resolution, points
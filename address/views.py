@@ -1,42 +1,54 @@
+import asyncio
 import sys
 import json
+from asgiref.sync import sync_to_async
+from datetime import date, timedelta
+from django.conf import settings
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, redirect
 from django.views.generic import ListView
 from django.contrib import messages
-from django.db.models import Q
-from .models import Address, AddressValidationLog, AddressStatus
-from .utils import run_address_validation_batch
+from django.utils import timezone
+from .models import Address, AddressValidationLog
+from .utils import run_address_validation_batch, get_address_health_totals, get_client_health_breakdown, get_health_series
 from employees.models import EmployeeProfile
 from client.models import Client
 from DAO.adresses_DAO import GoogleMapsClient
+from users.permissions import AdminOrDirectorRequiredMixin, admin_or_director_required
+from core.reference_data import complete_status, incomplete_status
+from core.api_usage import GoogleApiQuotaExceeded, usage_report
+from Hobart.db_routers import ReplicaReadMixin, use_replica
 
-# --- Permissions ---
-def is_admin_or_director(user):
-    return user.is_superuser or user.groups.filter(name='Directors').exists()
+# Overall budget for the Google lookups of one address search; slower answers are dropped.
+SEARCH_DEADLINE_SECONDS = getattr(settings, 'ADDRESS_SEARCH_DEADLINE_SECONDS', 4.0)
 
 # --- Dashboard View ---
-class AddressHealthDashboardView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class AddressHealthDashboardView(AdminOrDirectorRequiredMixin, ReplicaReadMixin, ListView):
     model = AddressValidationLog
     template_name = 'address/health_dashboard.html'
     context_object_name = 'logs'
     ordering = ['-timestamp']
+    paginate_by = 25
 
-    def test_func(self):
-        return is_admin_or_director(self.request.user)
+    def get_queryset(self):
+        return super().get_queryset().select_related('run_by')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        logs_data = list(self.get_queryset().values(
-            'timestamp', 'clients_complete', 'clients_incomplete', 'clients_missing',
-            'employees_complete', 'employees_incomplete', 'employees_missing'
-        ).order_by('timestamp'))
-        context['logs_json'] = json.dumps(logs_data, default=str)
+        # The chart data is fetched from health_series_api so the page size doesn't grow with the history.
+        context['current_totals'] = get_address_health_totals()
+        context['territory_breakdown'] = get_client_health_breakdown('territory')[:10]
+        context['client_group_breakdown'] = get_client_health_breakdown('client_group')[:10]
         return context
 
     def post(self, request, *args, **kwargs):
+        if request.POST.get('action') == 'snapshot':
+            # Cheap path: the live counters already hold the current numbers.
+            AddressValidationLog.objects.create(run_by=request.user, **get_address_health_totals())
+            messages.success(request, "Recorded a snapshot of the current address health counters.")
+            return redirect('address:health_dashboard')
+
         try:
             results = run_address_validation_batch()
             AddressValidationLog.objects.create(run_by=request.user, **results)
@@ -47,7 +59,54 @@ class AddressHealthDashboardView(LoginRequiredMixin, UserPassesTestMixin, ListVi
 
 # --- API Views ---
 @login_required
-def search_address_api(request):
+@admin_or_director_required
+@use_replica
+def health_series_api(request):
+    """Returns the address health chart points for a date range at the requested resolution."""
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=90)
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be ISO dates (YYYY-MM-DD).'}, status=400)
+    if start > end:
+        return JsonResponse({'error': 'start must be on or before end.'}, status=400)
+
+    try:
+        resolution, points = get_health_series(start, end, request.GET.get('resolution', 'auto'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    for point in points:
+        point['timestamp'] = point['timestamp'].isoformat()
+    return JsonResponse({'start': start.isoformat(), 'end': end.isoformat(), 'resolution': resolution, 'points': points})
+
+@login_required
+@admin_or_director_required
+def google_api_usage_api(request):
+    """Google API usage per day (or ?hourly=1 per hour), API and caller over ?days= days, with quota states."""
+    try:
+        days = min(int(request.GET.get('days', 7)), 93)
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer.'}, status=400)
+    return JsonResponse(usage_report(days=days, hourly=request.GET.get('hourly') in ('1', 'true')))
+
+def _google_suggestions(results, source, seen_place_ids):
+    suggestions = []
+    for result in results:
+        place_id = result.get('place_id')
+        if place_id not in seen_place_ids:
+            seen_place_ids.add(place_id)
+            suggestions.append({'formatted_address': result.get('formatted_address'), 'place_id': place_id, 'source': source})
+    return suggestions
+
+@login_required
+@use_replica
+async def search_address_api(request):
+    """
+    Address suggestions from the database, Google place search (biased by the client's business
+    name) and Google geocoding. Both Google calls run concurrently; whatever has not answered
+    within ADDRESS_SEARCH_DEADLINE_SECONDS is dropped.
+    """
     try:
         query = request.GET.get('query', '')
         client_pk = request.GET.get('client_pk')
@@ -55,58 +114,86 @@ def search_address_api(request):
         if not query:
             return JsonResponse({'error': 'A query parameter is required.'}, status=400)
 
-        suggestions = []
-        gmaps_client = GoogleMapsClient()
-
-        # CORRECTED: Only query on the 'formatted' field as others are now properties
-        local_results = Address.objects.filter(
-            Q(formatted__icontains=query)
-        )[:5]
-
-        suggestions.extend([
+        suggestions = [
             {'formatted_address': addr.formatted, 'place_id': addr.place_id, 'source': 'database'}
-            for addr in local_results
-        ])
+            async for addr in Address.objects.filter(formatted__icontains=query).only('formatted', 'place_id')[:5]
+        ]
+        if len(suggestions) >= 5:
+            return JsonResponse({'suggestions': suggestions})
 
-        if client_pk and len(suggestions) < 5:
+        gmaps_client = GoogleMapsClient()
+        lookups = {'google_geocode': asyncio.ensure_future(gmaps_client.ageocode(query))}
+        if client_pk:
             try:
-                client_instance = Client.objects.select_related('client_group').get(pk=client_pk)
+                client_instance = await Client.objects.select_related('client_group').aget(pk=client_pk)
                 business_name = client_instance.client_group.name if client_instance.client_group else client_instance.name
-                
                 if business_name:
-                    place_search_results = gmaps_client.place_search(business_name, query)
-                    existing_place_ids = {s['place_id'] for s in suggestions}
-                    for result in place_search_results:
-                        place_id = result.get('place_id')
-                        if place_id not in existing_place_ids:
-                            suggestions.append({
-                                'formatted_address': result.get('formatted_address'),
-                                'place_id': place_id,
-                                'source': 'google_place'
-                            })
-            except Client.DoesNotExist:
+                    lookups['google_place'] = asyncio.ensure_future(gmaps_client.aplace_search(business_name, query))
+            except (Client.DoesNotExist, ValueError):
                 pass
 
-        if len(suggestions) < 5:
-            api_results = gmaps_client.geocode(query)
-            existing_place_ids = {s['place_id'] for s in suggestions}
-            for result in api_results:
-                place_id = result.get('place_id')
-                if place_id not in existing_place_ids:
-                    suggestions.append({
-                        'formatted_address': result.get('formatted_address'),
-                        'place_id': place_id,
-                        'source': 'google_geocode'
-                    })
-        
-        return JsonResponse({'suggestions': suggestions[:5]})
+        _, pending = await asyncio.wait(lookups.values(), timeout=SEARCH_DEADLINE_SECONDS)
+        for task in pending:
+            task.cancel()
+
+        # Place results rank above plain geocoding, as in the original sequential lookup.
+        seen_place_ids = {s['place_id'] for s in suggestions}
+        quota_exceeded = False
+        for source in ('google_place', 'google_geocode'):
+            task = lookups.get(source)
+            if task is not None and task.done() and not task.cancelled():
+                if isinstance(task.exception(), GoogleApiQuotaExceeded):
+                    # Database suggestions still help when the Google budget is spent.
+                    quota_exceeded = True
+                    continue
+                suggestions.extend(_google_suggestions(task.result(), source, seen_place_ids))
+
+        return JsonResponse({'suggestions': suggestions[:5], 'timed_out': bool(pending), 'quota_exceeded': quota_exceeded})
 
     except Exception as e:
         print(f"--- ERROR IN search_address_api: {e} ---", file=sys.stderr)
         return JsonResponse({'error': str(e)}, status=500)
 
+def _save_google_address(result):
+    """Saves a Google result and works out its status. Returns (address, status, reasons), address None on failure."""
+    address_obj, created = Address.save_from_google_maps_data(result)
+    if not address_obj:
+        return None, None, []
+    if address_obj.is_degenerate():
+        return address_obj, incomplete_status(), address_obj.get_degeneracy_reasons()
+    return address_obj, complete_status(), []
+
+async def _set_address_from_place_id(instance, place_id):
+    """Geocodes a place_id and assigns the resulting Address and status to a Client or EmployeeProfile."""
+    results = await GoogleMapsClient().ageocode_by_place_id(place_id)
+    if not results:
+        return JsonResponse({'error': 'Could not retrieve details for the selected address.'}, status=500)
+
+    address_obj, status_obj, reasons = await sync_to_async(_save_google_address)(results[0])
+    if not address_obj:
+        return JsonResponse({'error': 'Failed to save address data.'}, status=500)
+
+    instance.address = address_obj
+    instance.address_status = status_obj
+    update_fields = ['address', 'address_status']
+    if isinstance(instance, Client):
+        # A hand-picked address stands until the legacy fields change; imports leave it alone.
+        instance.legacy_address_fingerprint = instance.current_legacy_address_fingerprint()
+        update_fields.append('legacy_address_fingerprint')
+    await instance.asave(update_fields=update_fields)
+
+    return JsonResponse({
+        'success': True,
+        'formatted_address': address_obj.formatted,
+        'status': {
+            'name': status_obj.name,
+            'badge_class': status_obj.badge_class,
+            'reasons': reasons
+        }
+    })
+
 @login_required
-def set_employee_address_api(request):
+async def set_employee_address_api(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required.'}, status=405)
 
@@ -118,45 +205,14 @@ def set_employee_address_api(request):
         if not employee_pk or not place_id:
             return JsonResponse({'error': 'employee_pk and place_id are required.'}, status=400)
 
-        employee_profile = get_object_or_404(EmployeeProfile, pk=employee_pk)
-        gmaps_client = GoogleMapsClient()
-        results = gmaps_client.geocode_by_place_id(place_id)
-        
-        if not results:
-            return JsonResponse({'error': 'Could not retrieve details for the selected address.'}, status=500)
-        
-        address_obj, created = Address.save_from_google_maps_data(results[0])
-
-        if not address_obj:
-            return JsonResponse({'error': 'Failed to save address data.'}, status=500)
-
-        reasons = []
-        if address_obj.is_degenerate():
-            status_obj = AddressStatus.objects.get(name='INCOMPLETE')
-            reasons = address_obj.get_degeneracy_reasons()
-        else:
-            status_obj = AddressStatus.objects.get(name='COMPLETE')
-
-        employee_profile.address = address_obj
-        employee_profile.address_status = status_obj
-        employee_profile.save(update_fields=['address', 'address_status'])
-
-        response_data = {
-            'success': True,
-            'formatted_address': address_obj.formatted,
-            'status': {
-                'name': status_obj.name,
-                'badge_class': status_obj.badge_class,
-                'reasons': reasons
-            }
-        }
-        return JsonResponse(response_data)
+        employee_profile = await aget_object_or_404(EmployeeProfile, pk=employee_pk)
+        return await _set_address_from_place_id(employee_profile, place_id)
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
-def set_client_address_api(request):
+async def set_client_address_api(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required.'}, status=405)
 
@@ -168,39 +224,8 @@ def set_client_address_api(request):
         if not client_pk or not place_id:
             return JsonResponse({'error': 'client_pk and place_id are required.'}, status=400)
 
-        client_instance = get_object_or_404(Client, pk=client_pk)
-        gmaps_client = GoogleMapsClient()
-        results = gmaps_client.geocode_by_place_id(place_id)
-        
-        if not results:
-            return JsonResponse({'error': 'Could not retrieve details for the selected address.'}, status=500)
-        
-        address_obj, created = Address.save_from_google_maps_data(results[0])
-
-        if not address_obj:
-            return JsonResponse({'error': 'Failed to save address data.'}, status=500)
-
-        reasons = []
-        if address_obj.is_degenerate():
-            status_obj = AddressStatus.objects.get(name='INCOMPLETE')
-            reasons = address_obj.get_degeneracy_reasons()
-        else:
-            status_obj = AddressStatus.objects.get(name='COMPLETE')
-
-        client_instance.address = address_obj
-        client_instance.address_status = status_obj
-        client_instance.save(update_fields=['address', 'address_status'])
-
-        response_data = {
-            'success': True,
-            'formatted_address': address_obj.formatted,
-            'status': {
-                'name': status_obj.name,
-                'badge_class': status_obj.badge_class,
-                'reasons': reasons
-            }
-        }
-        return JsonResponse(response_data)
+        client_instance = await aget_object_or_404(Client, pk=client_pk)
+        return await _set_address_from_place_id(client_instance, place_id)
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,96 @@
+import csv
+import json
+import zlib
+from address.models import Address
+from .models import Client
+
+EXPORT_CHUNK_SIZE = 2000
+# Output is buffered into blocks of about this size before being yielded to the response.
+STREAM_BLOCK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = [
+    'account_number', 'name', 'client_group_code', 'client_group_name',
+    'territory', 'territory_type', 'address_status',
+    'address1', 'address2', 'legacy_postal_code',
+    'formatted_address', 'street_number', 'route', 'city', 'province', 'postal_code',
+    'latitude', 'longitude', 'place_id',
+]
+
+def iter_client_export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one flat dict per Client with its group, territory, status and parsed address components.
+    Rows come from a lean values() query read with a server-side cursor, so memory stays constant.
+    """
+    queryset = Client.objects.order_by('pk').values(
+        'account_number', 'name', 'client_group__code', 'client_group__name',
+        'territory__name', 'territory__type', 'address_status__name',
+        'address1', 'address2', 'postal_code',
+        'address__formatted', 'address__place_id', 'address__latitude', 'address__longitude',
+        'address__components',
+    )
+    for row in queryset.iterator(chunk_size=chunk_size):
+        components = Address.standardized_components(row['address__components'])
+        latitude, longitude = row['address__latitude'], row['address__longitude']
+        yield {
+            'account_number': row['account_number'],
+            'name': row['name'],
+            'client_group_code': row['client_group__code'],
+            'client_group_name': row['client_group__name'],
+            'territory': row['territory__name'],
+            'territory_type': row['territory__type'],
+            'address_status': row['address_status__name'],
+            'address1': row['address1'],
+            'address2': row['address2'],
+            'legacy_postal_code': row['postal_code'],
+            'formatted_address': row['address__formatted'],
+            **components,
+            'latitude': float(latitude) if latitude is not None else None,
+            'longitude': float(longitude) if longitude is not None else None,
+            'place_id': row['address__place_id'],
+        }
+
+class _Echo:
+    """File-like object whose write() hands back the line so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+def iter_csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(['' if row[column] is None else row[column] for column in EXPORT_COLUMNS])
+
+def iter_jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+def iter_encoded_blocks(lines, compress=False):
+    """Encodes lines to UTF-8, optionally gzips them, and yields blocks of about STREAM_BLOCK_SIZE bytes."""
+    compressor = zlib.compressobj(wbits=31) if compress else None # wbits=31 writes a gzip header
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= STREAM_BLOCK_SIZE:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+def iter_client_export(export_format='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Returns an iterator of byte blocks for the full client export in 'csv' or 'jsonl' format."""
+    rows = iter_client_export_rows(chunk_size=chunk_size)
+    if export_format == 'csv':
+        lines = iter_csv_lines(rows)
+    elif export_format == 'jsonl':
+        lines = iter_jsonl_lines(rows)
+    else:
+        raise ValueError(f"Unknown export format '{export_format}'.")
+    return iter_encoded_blocks(lines, compress=compress)
@@ -0,0 +1,42 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from services.coverage_service import coverage_grid, DEFAULT_CELL_KM, DEFAULT_THRESHOLD_KM
+
+class Command(BaseCommand):
+    help = 'Reports the map cells whose clients are furthest from every technician home (straight-line distance).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cell-km', type=float, default=DEFAULT_CELL_KM, help='Grid cell size in kilometres.')
+        parser.add_argument('--threshold-km', type=float, default=DEFAULT_THRESHOLD_KM, help='Flag cells whose clients are on average further than this from their nearest technician.')
+        parser.add_argument('--top', type=int, default=20, help='Worst cells listed.')
+        parser.add_argument('--json', action='store_true', help='Print the whole grid as JSON.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            grid = coverage_grid(cell_km=options['cell_km'], threshold_km=options['threshold_km'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['json']:
+            self.stdout.write(json.dumps(grid, indent=2))
+            return
+
+        self.stdout.write(
+            f"{grid['clients']} geocoded clients in {len(grid['cells'])} cells of {grid['cell_km']:g} km, "
+            f"{grid['technicians']} technicians, computed in {time.monotonic() - started:.1f}s."
+        )
+        if grid['cells']:
+            self.stdout.write(f"{'centroid':<22} {'clients':>7} {'mean km':>8} {'max km':>7} {'~min':>5}  nearest technician")
+            for cell in grid['cells'][:options['top']]:
+                line = (
+                    f"{cell['lat']:>10.4f},{cell['lng']:<11.4f} {cell['clients']:>7} {cell['mean_km']:>8} "
+                    f"{cell['max_km']:>7} {cell['estimated_minutes']:>5}  {cell['technician']['name']}"
+                )
+                self.stdout.write(self.style.WARNING(line) if cell['flagged'] else line)
+
+        summary = (
+            f"{grid['flagged_cells']} cells ({grid['flagged_clients']} clients) are on average more than "
+            f"{grid['threshold_km']:g} km from the nearest technician."
+        )
+        self.stdout.write(self.style.WARNING(summary) if grid['flagged_cells'] else self.style.SUCCESS(summary))
@@ -0,0 +1,30 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from client.exports import iter_client_export, EXPORT_CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Exports every client with its group, territory, status and parsed address components as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv', help='Output format (default: csv).')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+        parser.add_argument('--output', '-o', type=str, help='File to write to. Defaults to standard output.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per database round-trip.')
+
+    def handle(self, *args, **options):
+        blocks = iter_client_export(options['format'], compress=options['gzip'], chunk_size=options['chunk_size'])
+        output_path = options['output']
+
+        if not output_path:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+            return
+
+        try:
+            with open(output_path, 'wb') as output:
+                for block in blocks:
+                    output.write(block)
+        except OSError as e:
+            raise CommandError(f'Could not write to {output_path}: {e}')
+        self.stderr.write(self.style.SUCCESS(f'Client export written to {output_path}'))
@@ -3,59 +3,107 @@ from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from client.models import Client
 from DAO.adresses_DAO import GoogleMapsClient
+from address.normalization import group_by_address_key
+from address.parser import parse_address, geocode_query
+from address.fsa_geocoder import FsaCentroidGeocoder
+from core.api_usage import GoogleApiQuotaExceeded
+from core.version_stamps import ISOCHRONES, bump
 
 class Command(BaseCommand):
     help = 'Geocodes legacy address fields and links clients to standardized Address objects.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed-only',
+            action='store_true',
+            help='Also re-geocode linked clients whose legacy address fields changed since their address was resolved.',
+        )
+
     def handle(self, *args, **options):
         if not settings.GOOGLE_MAPS_API_KEY:
             raise CommandError('GOOGLE_MAPS_API_KEY is not configured in your settings.')
 
         gmaps_client = GoogleMapsClient()
-        clients_to_process = Client.objects.filter(address__isnull=True).exclude(address1='', address2='')
-
-        total_clients = clients_to_process.count()
+        fsa_geocoder = FsaCentroidGeocoder()
+        fields = ('pk', 'account_number', 'address1', 'address2', 'postal_code', 'address', 'legacy_address_fingerprint')
+        if options['changed_only']:
+            # The fingerprint is a digest of the canonical key, so the comparison happens here rather than in SQL.
+            candidates = Client.objects.exclude(address1='', address2='').select_related('address').only(*fields, 'address__precision')
+            clients = [client for client in candidates.iterator(chunk_size=2000) if client.needs_geocoding()]
+        else:
+            clients_to_process = Client.objects.filter(address__isnull=True).exclude(address1='', address2='')
+            clients = list(clients_to_process.only(*fields))
+        total_clients = len(clients)
         if total_clients == 0:
-            self.stdout.write(self.style.SUCCESS('No clients to process. All clients already have a standardized address or no legacy address data.'))
+            self.stdout.write(self.style.SUCCESS('No clients to process. All clients already have an up-to-date standardized address or no legacy address data.'))
             return
 
-        self.stdout.write(f'Found {total_clients} clients to geocode.')
+        # Clients whose legacy addresses only differ by case, accents, abbreviations or unit
+        # numbers share a key and are geocoded with a single request.
+        groups = group_by_address_key(clients, lambda c: (c.address1, c.address2, c.postal_code))
+        skipped = total_clients - sum(len(members) for members in groups.values())
+        self.stdout.write(f'Found {total_clients} clients to geocode, sharing {len(groups)} distinct addresses.')
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipping {skipped} clients due to empty legacy address fields.'))
 
         success_count = 0
         fail_count = 0
+        hopeless_count = 0
+        approximate_count = 0
 
-        for i, client in enumerate(clients_to_process):
-            # Construct a full address string for geocoding
-            address_parts = [client.address1, client.address2, client.postal_code]
-            full_address = ", ".join(part.strip() for part in address_parts if part and part.strip())
+        for i, members in enumerate(groups.values()):
+            representative = members[0]
+            legacy_fields = (representative.address1, representative.address2, representative.postal_code)
+            full_address = geocode_query(*legacy_fields)
+            self.stdout.write(f'({i+1}/{len(groups)}) Processing {len(members)} client(s): {full_address}')
 
-            if not full_address:
-                self.stdout.write(self.style.WARNING(f'Skipping client {client.account_number} due to empty legacy address fields.'))
+            if parse_address(*legacy_fields).is_hopeless:
+                self.stdout.write(self.style.WARNING('  -> Skipped: no street, municipality or postal code to geocode.'))
+                fail_count += len(members)
+                hopeless_count += 1
                 continue
 
-            self.stdout.write(f'({i+1}/{total_clients}) Processing client: {client.account_number} - {full_address}')
-
             try:
                 # Geocode the address and save the new Address object
                 address_obj = gmaps_client.geocode_and_save(full_address)
+                approximate = not address_obj
+                if approximate:
+                    # Offline fallback: approximate coordinates from the postal code's FSA centroid.
+                    address_obj = fsa_geocoder.geocode(representative.postal_code)
+                    if address_obj:
+                        approximate_count += len(members)
 
                 if address_obj:
-                    # Link the new Address object to the client
-                    client.address = address_obj
-                    client.save(update_fields=['address'])
+                    # Link every client of the group with a bulk update, which fires no Client
+                    # signals. The health counters and cost simulation groupings don't track the
+                    # address column; the isochrone stamp does and is bumped once the run ends.
+                    # Members share a canonical key, hence a fingerprint. FSA approximations are
+                    # left unstamped so the next --changed-only run tries Google again.
+                    linked = {'address': address_obj}
+                    if not approximate:
+                        linked['legacy_address_fingerprint'] = representative.current_legacy_address_fingerprint()
+                    Client.objects.filter(pk__in=[c.pk for c in members]).update(**linked)
                     self.stdout.write(self.style.SUCCESS(f'  -> Successfully linked to Address: {address_obj.place_id}'))
-                    success_count += 1
+                    success_count += len(members)
                 else:
                     self.stdout.write(self.style.ERROR(f'  -> Geocoding failed for address: {full_address}'))
-                    fail_count += 1
+                    fail_count += len(members)
                 
                 # Google Maps API has a rate limit (e.g., 50 QPS). A small delay prevents hitting it.
                 time.sleep(0.05) # 50ms delay
 
+            except GoogleApiQuotaExceeded as e:
+                if success_count:
+                    bump(ISOCHRONES)
+                raise CommandError(f'{e} Stopped after {success_count} clients linked.')
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'  -> An unexpected error occurred: {e}'))
-                fail_count += 1
+                fail_count += len(members)
 
+        if success_count:
+            # An FSA approximation reuses an already saved Address, so no Address save bumps it either.
+            bump(ISOCHRONES)
         self.stdout.write(self.style.SUCCESS('\nGeocoding process complete!'))
-        self.stdout.write(f'Successfully processed: {success_count}')
+        self.stdout.write(f'Geocoding requests sent: {len(groups) - hopeless_count} for {total_clients - skipped} clients')
+        self.stdout.write(f'Successfully processed: {success_count} ({approximate_count} approximated from FSA centroids)')
         self.stdout.write(f'Failed to process: {fail_count}')
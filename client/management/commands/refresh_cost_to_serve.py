@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.api_usage import GoogleApiQuotaExceeded
+from services.cost_to_serve_service import refresh_cost_to_serve, CANDIDATE_TECHNICIANS, DEFAULT_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Refreshes the materialized cost to serve of every geocoded client. Meant to run nightly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Reroute every client, not only those whose inputs changed.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Clients processed per batch.')
+        parser.add_argument('--candidates', type=int, default=CANDIDATE_TECHNICIANS, help='Closest technicians (straight line) whose driving time is compared.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            stats = refresh_cost_to_serve(full=options['full'], batch_size=options['batch_size'], candidates=options['candidates'])
+        except (ValueError, GoogleApiQuotaExceeded) as e:
+            raise CommandError(str(e))
+
+        if stats['estimated']:
+            self.stdout.write(self.style.WARNING(f"{stats['estimated']} clients have no route and use a straight-line estimate."))
+        if stats['unroutable']:
+            self.stdout.write(self.style.WARNING(f"{stats['unroutable']} clients could not be costed."))
+        self.stdout.write(self.style.SUCCESS(
+            f"Routed {stats['routed']}, repriced {stats['repriced']}, unchanged {stats['unchanged']}, "
+            f"removed {stats['removed']} in {time.monotonic() - started:.1f}s."
+        ))
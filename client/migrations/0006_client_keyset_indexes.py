@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0008_addressvalidationrollup'),
+        ('client', '0005_client_territory'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_group', 'name', 'id'], name='client_group_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['address_status', 'name', 'account_number'], name='client_status_name_acct_idx'),
+        ),
+    ]
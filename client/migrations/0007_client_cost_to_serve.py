@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0011_traveltime'),
+        ('client', '0006_client_keyset_indexes'),
+        ('employees', '0002_employeeprofile_address_status'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientCostToServe',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cost_to_serve', serialize=False, to='client.client')),
+                ('technicians_signature', models.CharField(blank=True, help_text='Digest of the technician roster and home addresses the nearest technician was chosen from.', max_length=40)),
+                ('duration_seconds', models.PositiveIntegerField()),
+                ('distance_meters', models.PositiveIntegerField()),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_estimate', models.BooleanField(default=False, help_text='True when no route was available and the figures come from the straight-line distance.')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('client_address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='address.address')),
+                ('parameters', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.travelcostparameters')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='employees.employeeprofile')),
+            ],
+            options={
+                'verbose_name': 'Client Cost to Serve',
+                'verbose_name_plural': 'Client Costs to Serve',
+                'indexes': [models.Index(fields=['total_cost', 'client'], name='cost_to_serve_total_idx')],
+            },
+        ),
+    ]
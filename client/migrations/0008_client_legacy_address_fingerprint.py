@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:05
+
+from django.db import migrations, models
+from address.normalization import address_fingerprint
+
+BATCH_SIZE = 1000
+
+
+def fingerprint_linked_clients(apps, schema_editor):
+    """
+    Clients already linked to an address are taken to have been resolved from their current
+    legacy fields, so the next import does not geocode them all again. FSA-centroid stand-ins
+    are approximations and stay unstamped.
+    """
+    Client = apps.get_model('client', 'Client')
+
+    clients = []
+    rows = Client.objects.filter(address__isnull=False).exclude(address__precision='FSA_CENTROID').only('pk', 'address1', 'address2', 'postal_code')
+    for client in rows.iterator(chunk_size=BATCH_SIZE):
+        client.legacy_address_fingerprint = address_fingerprint(client.address1, client.address2, client.postal_code)
+        clients.append(client)
+        if len(clients) >= BATCH_SIZE:
+            Client.objects.bulk_update(clients, ['legacy_address_fingerprint'])
+            clients = []
+    Client.objects.bulk_update(clients, ['legacy_address_fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0009_fsa_centroids_address_precision'),
+        ('client', '0007_client_cost_to_serve'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='legacy_address_fingerprint',
+            field=models.CharField(blank=True, help_text='Fingerprint of the legacy address fields the standardized address was last resolved from.', max_length=40),
+        ),
+        migrations.RunPython(fingerprint_linked_clients, migrations.RunPython.noop),
+    ]
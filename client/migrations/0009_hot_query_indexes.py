@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0012_hot_query_indexes'),
+        ('client', '0008_client_legacy_address_fingerprint'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['name', 'account_number'], name='client_name_acct_idx'),
+        ),
+    ]
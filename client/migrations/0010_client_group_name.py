@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+def copy_client_group_names(apps, schema_editor):
+    Client = apps.get_model('client', 'Client')
+    ClientGroup = apps.get_model('client', 'ClientGroup')
+    name = ClientGroup.objects.filter(pk=models.OuterRef('client_group_id')).values('name')[:1]
+    Client.objects.update(client_group_name=models.Subquery(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0013_unique_address_health_bucket'),
+        ('client', '0009_hot_query_indexes'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='client',
+            name='client_group_name_id_idx',
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='client_group_name',
+            field=models.CharField(blank=True, editable=False, help_text="Copy of the group's name, kept in sync on save, so the client list can seek on an index.", max_length=255),
+        ),
+        migrations.RunPython(copy_client_group_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_group_name', 'name', 'id'], name='client_groupname_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0013_unique_address_health_bucket'),
+        ('client', '0010_client_group_name'),
+        ('organization', '0004_territory_boundary_geojson'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_group', 'name', 'id'], name='client_group_name_id_idx'),
+        ),
+    ]
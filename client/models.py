@@ -1,6 +1,7 @@
 from django.db import models
 from address.models import Address, AddressStatus # Import AddressStatus
-from organization.models import Territory, CodeDimension
+from address.normalization import address_fingerprint
+from organization.models import Territory, CodeDimension, TravelCostParameters
 
 # --- Dimension Models ---
 
@@ -26,7 +27,18 @@ class ClientGroup(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'name' in update_fields:
+            Client.objects.filter(client_group=self).exclude(client_group_name=self.name).update(client_group_name=self.name)
+
 class ClientManager(models.Manager):
+    def sync_client_group_names(self):
+        """Copies group names onto their clients after bulk writes that bypassed ClientGroup.save()."""
+        name = ClientGroup.objects.filter(pk=models.OuterRef('client_group_id')).values('name')[:1]
+        return self.get_queryset().exclude(client_group_name=models.Subquery(name)).update(client_group_name=models.Subquery(name))
+
     def for_manager(self, manager_profile):
         """Returns a queryset of clients that fall within a manager's assigned territories."""
         # Get all FSAs from all territories assigned to the manager
@@ -47,7 +59,11 @@ class Client(models.Model):
     address1 = models.CharField(max_length=255, blank=True)
     address2 = models.CharField(max_length=255, blank=True)
     postal_code = models.CharField(max_length=20, blank=True)
-    
+    legacy_address_fingerprint = models.CharField(
+        max_length=40, blank=True,
+        help_text="Fingerprint of the legacy address fields the standardized address was last resolved from.",
+    )
+
     # --- Standardized Address (the goal) ---
     address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, blank=True, related_name='clients')
     address_status = models.ForeignKey(
@@ -60,6 +76,7 @@ class Client(models.Model):
 
     # --- Relationships ---
     client_group = models.ForeignKey(ClientGroup, on_delete=models.PROTECT, related_name='clients', help_text="The parent company for this client.")
+    client_group_name = models.CharField(max_length=255, blank=True, editable=False, help_text="Copy of the group's name, kept in sync on save, so the client list can seek on an index.")
     territory = models.ForeignKey(Territory, on_delete=models.SET_NULL, null=True, blank=True, related_name='clients')
     industry_code = models.ForeignKey(IndustryCode, on_delete=models.SET_NULL, null=True, blank=True, related_name='clients')
     customer_type_code = models.ForeignKey(CustomerTypeCode, on_delete=models.SET_NULL, null=True, blank=True, related_name='clients')
@@ -70,6 +87,69 @@ class Client(models.Model):
 
     class Meta:
         ordering = ['name', 'account_number']
+        indexes = [
+            # Keyset pagination: the client list seeks on (group name, name, pk), the validation
+            # queue on (name, account_number) within one status.
+            models.Index(fields=['client_group_name', 'name', 'id'], name='client_groupname_name_id_idx'),
+            # One group's clients by name (group detail page).
+            models.Index(fields=['client_group', 'name', 'id'], name='client_group_name_id_idx'),
+            models.Index(fields=['address_status', 'name', 'account_number'], name='client_status_name_acct_idx'),
+            # Default ordering, for every unfiltered listing and export.
+            models.Index(fields=['name', 'account_number'], name='client_name_acct_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if self.client_group_id is not None and (update_fields is None or {'client_group', 'client_group_id'} & set(update_fields)):
+            self.client_group_name = self.client_group.name
+            if update_fields is not None:
+                update_fields = {*update_fields, 'client_group_name'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def current_legacy_address_fingerprint(self):
+        return address_fingerprint(self.address1, self.address2, self.postal_code)
+
+    def needs_geocoding(self):
+        """
+        True when the client has no address yet, its legacy fields changed since it was resolved, or
+        it only has an FSA-centroid approximation (loads the address unless it is already loaded).
+        """
+        return (
+            self.address_id is None
+            or self.legacy_address_fingerprint != self.current_legacy_address_fingerprint()
+            or self.address.precision == Address.Precision.FSA_CENTROID
+        )
+
+class ClientCostToServe(models.Model):
+    """
+    Materialized cost of sending the nearest technician to a client, maintained by the
+    refresh_cost_to_serve command. The address and parameter references record what the figures
+    were computed from, so a refresh only redoes the clients whose inputs changed.
+    """
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='cost_to_serve')
+    technician = models.ForeignKey('employees.EmployeeProfile', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    # --- Inputs (used to detect stale rows) ---
+    client_address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    technicians_signature = models.CharField(max_length=40, blank=True, help_text="Digest of the technician roster and home addresses the nearest technician was chosen from.")
+    parameters = models.ForeignKey(TravelCostParameters, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    # --- Figures ---
+    duration_seconds = models.PositiveIntegerField()
+    distance_meters = models.PositiveIntegerField()
+    total_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    is_estimate = models.BooleanField(default=False, help_text="True when no route was available and the figures come from the straight-line distance.")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Client Cost to Serve"
+        verbose_name_plural = "Client Costs to Serve"
+        indexes = [
+            # Keyset pagination of the client list sorted by cost.
+            models.Index(fields=['total_cost', 'client'], name='cost_to_serve_total_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id}: {self.total_cost} $"
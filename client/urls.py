@@ -8,6 +8,10 @@ urlpatterns = [
     path('list/', views.ClientListView.as_view(), name='client_list'),
     path('detail/<int:pk>/', views.ClientDetailView.as_view(), name='client_detail'),
     path('api/client-search-filter/', views.client_search_and_filter_api, name='client_search_filter_api'),
+    path('export/', views.export_clients_view, name='export_clients'),
+    path('api/cost-simulation/', views.cost_simulation_api, name='cost_simulation_api'),
+    path('api/isochrone/', views.isochrone_api, name='isochrone_api'),
+    path('api/coverage/', views.coverage_api, name='coverage_api'),
 
     # Address Validation
     path('address-validation/', views.ClientAddressValidationListView.as_view(), name='address_validation_list'),
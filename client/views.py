@@ -1,50 +1,92 @@
 import csv
 import io
 import json
+import math
 import os # Added this line
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required, user_passes_test
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView, CreateView, View
 from django.urls import reverse_lazy
-from django.http import JsonResponse
-from django.db.models import Q, Func, F, Value
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Q, Func, F, Value, Prefetch, prefetch_related_objects
 from django.db.models.functions import Length
 from django.template.loader import render_to_string # Import render_to_string
 from .models import Client, ClientGroup, IndustryCode, CustomerTypeCode, IndustrySubCode, Territory
+from .exports import iter_client_export
 from .forms import CsvUploadForm, DimensionUploadForm, ClientUploadForm, ClientGroupForm, ClientAddressEditForm
 from employees.models import EmployeeProfile
-from address.models import Address, AddressStatus
+from address.models import Address
 from address.forms import AddressSearchForm # Import the AddressSearchForm
 from DAO.adresses_DAO import GoogleMapsClient # Import GoogleMapsClient for re-geocoding
-
-# --- Permissions --- 
-def is_admin_or_director(user):
-    return user.is_superuser or user.groups.filter(name='Directors').exists()
+from services.bulk_upsert_service import iter_csv_rows, bulk_upsert_by_code
+from users.permissions import AdminOrDirectorRequiredMixin, admin_or_director_required
+from core.reference_data import complete_status, incomplete_status, missing_status
+from core.pagination import KeysetPaginationMixin
+from Hobart.db_routers import ReplicaReadMixin, use_replica
+from address.normalization import group_by_address_key
+from address.parser import parse_address, geocode_query
+from address.fsa_geocoder import FsaCentroidGeocoder
+from services.travel_cost_service import price_travel
+from core.api_usage import GoogleApiQuotaExceeded
 
 # --- Client Views ---
-class ClientListView(ListView):
+class ClientListView(ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = Client
     template_name = 'client/client_list.html'
     context_object_name = 'clients'
     paginate_by = 25
+    keyset_fields = ('client_group_name', 'name', 'pk')
+    # ?sort= values ordering by the materialized cost to serve (see refresh_cost_to_serve).
+    COST_SORTS = {
+        'cost': ('cost_to_serve__total_cost', 'pk'),
+        '-cost': ('-cost_to_serve__total_cost', '-pk'),
+    }
+
+    def _cost_bound(self, name):
+        try:
+            return Decimal(self.request.GET[name])
+        except (KeyError, InvalidOperation):
+            return None
+
+    def get_keyset_fields(self):
+        return self.COST_SORTS.get(self.request.GET.get('sort'), self.keyset_fields)
+
     def get_queryset(self):
-        return Client.objects.select_related('client_group', 'territory', 'address_status').order_by('client_group__name', 'name')
+        # The rows only show the formatted address; its components stay unloaded.
+        queryset = Client.objects.select_related('client_group', 'territory', 'address_status', 'address', 'cost_to_serve').defer('address__components')
+        min_cost, max_cost = self._cost_bound('min_cost'), self._cost_bound('max_cost')
+        if min_cost is not None:
+            queryset = queryset.filter(cost_to_serve__total_cost__gte=min_cost)
+        if max_cost is not None:
+            queryset = queryset.filter(cost_to_serve__total_cost__lte=max_cost)
+        if self.request.GET.get('sort') in self.COST_SORTS:
+            # Keyset columns cannot hold NULLs: clients without a cost are left out of this ordering.
+            queryset = queryset.filter(cost_to_serve__isnull=False)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['sort'] = self.request.GET.get('sort', '')
+        context['min_cost'] = self.request.GET.get('min_cost', '')
+        context['max_cost'] = self.request.GET.get('max_cost', '')
+        return context
 
-class ClientDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class ClientDetailView(AdminOrDirectorRequiredMixin, DetailView):
     model = Client
     template_name = 'client/client_detail.html'
     context_object_name = 'client'
 
-    def test_func(self):
-        return is_admin_or_director(self.request.user)
-
     def get_queryset(self):
-        return super().get_queryset().select_related('client_group', 'territory', 'industry_code', 'customer_type_code', 'industry_sub_code', 'address', 'address_status')
+        return super().get_queryset().select_related('client_group', 'territory', 'industry_code', 'customer_type_code', 'industry_sub_code', 'address', 'address_status', 'cost_to_serve__technician__user', 'cost_to_serve__parameters')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        cost = getattr(self.object, 'cost_to_serve', None)
+        if cost and cost.parameters:
+            context['cost_to_serve'] = cost
+            context['cost_breakdown'] = price_travel(cost.duration_seconds, cost.distance_meters, cost.parameters)
         context['address_search_form'] = AddressSearchForm() # For the Google Maps autocomplete
         context['client_address_edit_form'] = ClientAddressEditForm(instance=self.object) # For manual address editing
         return context
@@ -55,33 +97,43 @@ class ClientDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
         if form.is_valid():
             form.save()
             messages.success(request, "Client's original address fields updated successfully!")
-            
+
+            if not self.object.needs_geocoding():
+                # Same address as the one already resolved (at most a spelling change): no API call.
+                messages.info(request, "The address itself did not change, so it was not geocoded again.")
+                return redirect(self.object.get_absolute_url())
+
             gmaps_client = GoogleMapsClient()
             full_address_string = f"{self.object.address1}, {self.object.address2}, {self.object.postal_code}"
             
             business_name = self.object.client_group.name if self.object.client_group else self.object.name
-            results = gmaps_client.place_search(business_name, full_address_string)
+            try:
+                results = gmaps_client.place_search(business_name, full_address_string)
+                if not results:
+                    results = gmaps_client.geocode(full_address_string)
+            except GoogleApiQuotaExceeded as e:
+                # The fields are saved but not resolved: the fingerprint still differs, so the next edit retries.
+                messages.error(request, f"The address could not be geocoded: {e}")
+                return redirect(self.object.get_absolute_url())
 
-            if not results:
-                results = gmaps_client.geocode(full_address_string)
-            
             if results:
                 address_obj, created = Address.save_from_google_maps_data(results[0])
                 self.object.address = address_obj
                 
                 # Re-evaluate and set the address status
                 if address_obj.is_degenerate():
-                    status_obj = AddressStatus.objects.get(name='INCOMPLETE')
+                    status_obj = incomplete_status()
                 else:
-                    status_obj = AddressStatus.objects.get(name='COMPLETE')
+                    status_obj = complete_status()
                 self.object.address_status = status_obj
-                
-                self.object.save(update_fields=['address', 'address_status'])
+                self.object.legacy_address_fingerprint = self.object.current_legacy_address_fingerprint()
+
+                self.object.save(update_fields=['address', 'address_status', 'legacy_address_fingerprint'])
                 messages.success(request, "Client's geocoded address updated based on new original fields.")
             else:
                 # If geocoding fails, set status to MISSING
                 self.object.address = None
-                self.object.address_status = AddressStatus.objects.get(name='MISSING')
+                self.object.address_status = missing_status()
                 self.object.save(update_fields=['address', 'address_status'])
                 messages.warning(request, "Could not re-geocode address based on updated original fields. The address has been marked as MISSING.")
 
@@ -91,27 +143,25 @@ class ClientDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
             context = self.get_context_data(form=form) # Pass the invalid form back to the template
             return self.render_to_response(context)
 
-class ClientAddressValidationListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ClientAddressValidationListView(AdminOrDirectorRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
     """A view to list clients with degenerate addresses that need manual correction."""
     model = Client
     template_name = 'client/address_validation_list.html'
     context_object_name = 'clients'
     paginate_by = 50
-
-    def test_func(self):
-        return is_admin_or_director(self.request.user)
+    keyset_fields = ('name', 'account_number')
 
     def get_queryset(self):
-        return Client.objects.filter(address_status__name='INCOMPLETE').select_related('address', 'address_status')
+        return Client.objects.filter(address_status__name='INCOMPLETE').select_related('address', 'address_status').defer('address__components')
 
 # --- ClientGroup Views ---
-class ClientGroupListView(ListView):
+class ClientGroupListView(ReplicaReadMixin, ListView):
     model = ClientGroup
     template_name = 'client/clientgroup_list.html'
     context_object_name = 'client_groups'
     queryset = ClientGroup.objects.order_by('name')
 
-class ClientGroupDetailView(DetailView):
+class ClientGroupDetailView(ReplicaReadMixin, DetailView):
     model = ClientGroup
     template_name = 'client/clientgroup_detail.html'
     context_object_name = 'client_group'
@@ -130,25 +180,24 @@ class ClientGroupCreateView(CreateView):
         return super().form_valid(form)
 
 # --- Map View ---
-class ClientMapView(LoginRequiredMixin, UserPassesTestMixin, View):
+class ClientMapView(AdminOrDirectorRequiredMixin, ReplicaReadMixin, View):
     template_name = 'client/client_map.html'
 
-    def test_func(self):
-        return is_admin_or_director(self.request.user)
-
     def get(self, request, *args, **kwargs):
         # Fetch clients that have a geocoded address with latitude and longitude
         clients_with_coords = Client.objects.filter(
             address__latitude__isnull=False,
             address__longitude__isnull=False
-        ).select_related('address').values('name', 'address__latitude', 'address__longitude')
+        ).select_related('address').values('id', 'name', 'address__latitude', 'address__longitude', 'address__precision')
 
         # Prepare data for JavaScript
         client_locations = [
             {
+                'id': client['id'],
                 'name': client['name'],
                 'lat': float(client['address__latitude']),
                 'lng': float(client['address__longitude']),
+                'approximate': client['address__precision'] == Address.Precision.FSA_CENTROID,
             }
             for client in clients_with_coords
         ]
@@ -156,22 +205,30 @@ class ClientMapView(LoginRequiredMixin, UserPassesTestMixin, View):
         # Pass Google Maps API Key to the template
         google_maps_api_key = os.environ.get('GOOGLE_MAPS_API_KEY')
 
+        # Technicians with a geocoded home, for the drive-time layer.
+        technicians = EmployeeProfile.objects.filter(
+            role=EmployeeProfile.Role.TECHNICIAN, address__latitude__isnull=False, address__longitude__isnull=False,
+        ).select_related('user').order_by('user__first_name', 'user__last_name')
+
         context = {
             'client_locations_json': json.dumps(client_locations),
             'google_maps_api_key': google_maps_api_key,
+            'technicians': technicians,
         }
         return render(request, self.template_name, context)
 
 # --- APIs ---
 @login_required
+@use_replica
 def client_search_and_filter_api(request):
     query = request.GET.get('q', '')
-    queryset = Client.objects.select_related('client_group', 'address_status').order_by('name')
+    queryset = Client.objects.select_related('client_group', 'address_status', 'address', 'cost_to_serve').defer('address__components').order_by('name')
     if query: queryset = queryset.filter(Q(name__icontains=query) | Q(account_number__icontains=query) | Q(address1__icontains=query) | Q(client_group__name__icontains=query))
     html = render_to_string('client/_client_table_rows.html', {'clients': queryset})
     return JsonResponse({'html': html})
 
 @login_required
+@use_replica
 def client_group_search_and_filter_api(request):
     query = request.GET.get('q', '')
     queryset = ClientGroup.objects.order_by('name')
@@ -197,9 +254,108 @@ def update_client_group_field_api(request):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
 
+# --- Cost Simulation ---
+@login_required
+@admin_or_director_required
+def cost_simulation_api(request):
+    """
+    POST {"scenarios": [{"name": ..., "cost_per_minute": ..., "cost_per_km": ...,
+    "truck_depreciation_fixed_cost": ..., "supply_charge_fixed_cost": ...}], "group_by": "territory"}.
+    Reprices every client's cost to serve under each scenario without saving anything.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
+    # NumPy is only needed here; importing it lazily keeps it out of every worker's startup.
+    from services.cost_simulation_service import simulate_costs
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("The request body must be a JSON object.")
+        scenarios = data.get('scenarios') or []
+        if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+            raise ValueError("'scenarios' must be a list of objects.")
+        results = simulate_costs(scenarios, group_by=data.get('group_by', 'territory'))
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', **results})
+
+# --- Isochrones ---
+@login_required
+@admin_or_director_required
+def isochrone_api(request):
+    """
+    GET ?technician=<pk> or ?address=<pk>, &minutes=45. Returns the clients within that many
+    minutes of driving from the technician's home (or the address), nearest first.
+    """
+    from services.isochrone_service import clients_within
+    try:
+        minutes = int(request.GET.get('minutes', 45))
+        technician_pk = int(request.GET['technician']) if request.GET.get('technician') else None
+        address_pk = int(request.GET['address']) if request.GET.get('address') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': "'minutes', 'technician' and 'address' must be whole numbers."}, status=400)
+    if technician_pk is not None:
+        technician = get_object_or_404(EmployeeProfile.objects.select_related('address'), pk=technician_pk)
+        origin = technician.address
+    elif address_pk is not None:
+        origin = get_object_or_404(Address, pk=address_pk)
+    else:
+        return JsonResponse({'status': 'error', 'message': "Provide 'technician' or 'address'."}, status=400)
+
+    try:
+        result = clients_within(origin, minutes)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except GoogleApiQuotaExceeded as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=429)
+    return JsonResponse({'status': 'success', **result})
+
+# --- Coverage ---
+@login_required
+@admin_or_director_required
+@use_replica
+def coverage_api(request):
+    """GET ?cell_km=5&threshold_km=60. Returns the coverage grid (services.coverage_service) for the map heatmap."""
+    # NumPy is only needed here; importing it lazily keeps it out of every worker's startup.
+    from services.coverage_service import coverage_grid, DEFAULT_CELL_KM, DEFAULT_THRESHOLD_KM
+    try:
+        cell_km = float(request.GET.get('cell_km', DEFAULT_CELL_KM))
+        threshold_km = float(request.GET.get('threshold_km', DEFAULT_THRESHOLD_KM))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': "'cell_km' and 'threshold_km' must be numbers."}, status=400)
+    # float() accepts 'nan' and 'inf', which max() and every comparison would pass through.
+    if not (math.isfinite(cell_km) and math.isfinite(threshold_km)):
+        return JsonResponse({'status': 'error', 'message': "'cell_km' and 'threshold_km' must be finite numbers."}, status=400)
+    try:
+        # Cells under a kilometre would only multiply the response size.
+        grid = coverage_grid(cell_km=max(cell_km, 1.0), threshold_km=threshold_km)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', **grid})
+
+# --- Export Views ---
+@login_required
+@admin_or_director_required
+def export_clients_view(request):
+    """Streams every client with its resolved address components as CSV or JSON Lines, optionally gzipped."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return JsonResponse({'error': "format must be 'csv' or 'jsonl'."}, status=400)
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    filename = f"clients.{export_format}" + ('.gz' if compress else '')
+    if compress:
+        content_type = 'application/gzip'
+    else:
+        content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+
+    response = StreamingHttpResponse(iter_client_export(export_format, compress=compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 # --- Upload Views ---
 @login_required
-@user_passes_test(is_admin_or_director)
+@admin_or_director_required
 def upload_client_view(request):
     form = ClientUploadForm(request.POST or None, request.FILES or None)
     if request.method == 'POST' and form.is_valid():
@@ -214,7 +370,7 @@ def upload_client_view(request):
     return render(request, 'client/upload_client.html', {'form': form})
 
 @login_required
-@user_passes_test(is_admin_or_director)
+@admin_or_director_required
 def upload_dimension_view(request):
     form = DimensionUploadForm(request.POST or None, request.FILES or None)
     if request.method == 'POST' and form.is_valid():
@@ -222,29 +378,32 @@ def upload_dimension_view(request):
         dimension_type = form.cleaned_data['dimension_type']
         if not csv_file.name.endswith('.csv'): messages.error(request, 'This is not a CSV file.'); return redirect('client:upload_dimension')
         try:
-            process_dimension_csv(csv_file, dimension_type)
-            messages.success(request, f'{dimension_type.replace("_", " ").title()} data imported successfully!')
+            counts = process_dimension_csv(csv_file, dimension_type)
+            messages.success(request, f'{dimension_type.replace("_", " ").title()} data imported successfully! {format_upsert_counts(counts)}')
         except Exception as e:
             messages.error(request, f'An error occurred: {e}')
         return redirect('client:upload_dimension')
     return render(request, 'client/upload_dimension.html', {'form': form})
 
 @login_required
-@user_passes_test(is_admin_or_director)
+@admin_or_director_required
 def upload_client_group_view(request):
     form = CsvUploadForm(request.POST or None, request.FILES or None)
     if request.method == 'POST' and form.is_valid():
         csv_file = request.FILES['csv_file']
         if not csv_file.name.endswith('.csv'): messages.error(request, 'This is not a CSV file.'); return redirect('client:upload_group_csv')
         try:
-            process_client_group_csv(csv_file)
-            messages.success(request, 'Client Group data imported successfully!')
+            counts = process_client_group_csv(csv_file)
+            messages.success(request, f'Client Group data imported successfully! {format_upsert_counts(counts)}')
         except Exception as e:
             messages.error(request, f'An error occurred: {e}')
         return redirect('client:upload_group_csv')
     return render(request, 'client/upload_csv.html', {'form': form})
 
 # --- CSV Processing Logic ---
+def format_upsert_counts(counts):
+    return f"({counts['inserted']} added, {counts['updated']} updated, {counts['unchanged']} unchanged)"
+
 def process_client_csv(file):
     decoded_file = file.read().decode('utf-8-sig')
     io_string = io.StringIO(decoded_file)
@@ -256,6 +415,7 @@ def process_client_csv(file):
     client_groups = {cg.code: cg for cg in ClientGroup.objects.all()}
     gmaps_client = GoogleMapsClient()
 
+    imported_clients = []
     for i, row in enumerate(reader):
         line_num = i + 1
         if not row or len(row) != 10: raise ValueError(f"Row {line_num} is malformed.")
@@ -272,45 +432,94 @@ def process_client_csv(file):
                 'industry_code': industry_codes.get(ind_code), 'customer_type_code': customer_type_codes.get(cust_type_code),
                 'industry_sub_code': industry_sub_codes.get(ind_sub_code),
             })
-
-        # --- Automated Geocoding Logic ---
-        full_address_string = f"{addr1}, {addr2}, {postal}"
+        imported_clients.append(client)
+
+    # --- Automated Geocoding Logic ---
+    # Only new clients and those whose legacy address changed since it was resolved are geocoded,
+    # so re-importing the same file makes no API calls.
+    prefetch_related_objects(imported_clients, Prefetch('address', queryset=Address.objects.only('precision')))
+    to_geocode = [client for client in imported_clients if client.needs_geocoding()]
+    # Clients sharing a legacy address (same mall, same street with different spelling) are
+    # geocoded once per canonical key; the place search fallback is shared per key and group name.
+    groups = group_by_address_key(to_geocode, lambda c: (c.address1, c.address2, c.postal_code))
+    grouped_pks = {client.pk for members in groups.values() for client in members}
+    place_search_cache = {}
+    fsa_geocoder = FsaCentroidGeocoder()
+
+    for key, members in groups.items():
+        representative = members[0]
+        legacy_fields = (representative.address1, representative.address2, representative.postal_code)
+        if parse_address(*legacy_fields).is_hopeless:
+            # Nothing a geocoder could place: mark the clients MISSING without spending a request.
+            grouped_pks.difference_update(client.pk for client in members)
+            continue
+        full_address_string = geocode_query(*legacy_fields)
         results = gmaps_client.geocode(full_address_string)
-        address_obj = None
+        geocoded_address = None
         if results:
-            address_obj, _ = Address.save_from_google_maps_data(results[0])
+            geocoded_address, _ = Address.save_from_google_maps_data(results[0])
+
+        for client in members:
+            address_obj = geocoded_address
+            if not address_obj or address_obj.is_degenerate():
+                cache_key = (key, client.client_group.name)
+                if cache_key not in place_search_cache:
+                    place_search_results = gmaps_client.place_search(client.client_group.name, full_address_string)
+                    place_search_cache[cache_key] = Address.save_from_google_maps_data(place_search_results[0])[0] if place_search_results else None
+                address_obj = place_search_cache[cache_key] or address_obj
+            # FSA approximations are not fingerprinted, so the next import tries Google again.
+            resolved = address_obj is not None
+            if not address_obj:
+                # Offline fallback: approximate coordinates from the FSA centroid keep the client on the map.
+                address_obj = fsa_geocoder.geocode(client.postal_code)
+            _assign_imported_address(client, address_obj, resolved=resolved)
+
+    for client in to_geocode:
+        if client.pk not in grouped_pks:
+            _assign_imported_address(client, fsa_geocoder.geocode(client.postal_code))
+
+def _assign_imported_address(client, address_obj, resolved=False):
+    """Links an imported client to its address; `resolved` records the legacy fields it came from."""
+    if address_obj:
+        client.address = address_obj
+        client.address_status = incomplete_status() if address_obj.is_degenerate() else complete_status()
+    elif client.address is None:
+        client.address_status = missing_status()
+    if resolved:
+        client.legacy_address_fingerprint = client.current_legacy_address_fingerprint()
+    client.save(update_fields=['address', 'address_status', 'legacy_address_fingerprint'])
+
+DIMENSION_MODELS = {
+    'industry_code': IndustryCode,
+    'customer_type_code': CustomerTypeCode,
+    'industry_sub_code': IndustrySubCode,
+}
 
-        is_degenerate = not address_obj or address_obj.is_degenerate()
-        if is_degenerate:
-            place_search_results = gmaps_client.place_search(client_group_obj.name, full_address_string)
-            if place_search_results:
-                address_obj, _ = Address.save_from_google_maps_data(place_search_results[0])
+def process_dimension_csv(file, dimension_type):
+    target_model = DIMENSION_MODELS.get(dimension_type)
+    if target_model is None: raise ValueError(f"Dimension type ''{dimension_type}'' cannot be imported from a code/description file.")
 
-        if address_obj:
-            client.address = address_obj
-            client.save(update_fields=['address'])
+    def parse_rows():
+        for line_num, row in enumerate(iter_csv_rows(file), start=1):
+            if not row: continue
+            if len(row) > 2: raise ValueError(f"Row {line_num} has too many columns.")
+            code = row[0].strip()
+            description = row[1].strip() if len(row) > 1 else ''
+            if len(code) > 50: raise ValueError(f"Error in row {line_num}: Code ''{code}'' is too long.")
+            yield {'code': code, 'description': description}
 
-def process_dimension_csv(file, dimension_type):
-    decoded_file = file.read().decode('utf-8-sig')
-    io_string = io.StringIO(decoded_file)
-    reader = csv.reader(io_string, delimiter=',')
-    for i, row in enumerate(reader):
-        line_num = i + 1
-        if not row: continue
-        if len(row) > 2: raise ValueError(f"Row {line_num} has too many columns.")
-        code = row[0].strip()
-        description = row[1].strip() if len(row) > 1 else ''
-        if len(code) > 50: raise ValueError(f"Error in row {line_num}: Code ''{code}'' is too long.")
-        TargetModel.objects.update_or_create(code=code, defaults={'description': description})
+    return bulk_upsert_by_code(target_model, parse_rows(), update_fields=['description'])
 
 def process_client_group_csv(file):
-    decoded_file = file.read().decode('utf-8-sig')
-    io_string = io.StringIO(decoded_file)
-    reader = csv.reader(io_string, delimiter=',')
-    for i, row in enumerate(reader):
-        line_num = i + 1
-        if not row: continue
-        if len(row) != 2: raise ValueError(f"Row {line_num} is malformed.")
-        code, name = [item.strip() for item in row]
-        if len(code) > 10: raise ValueError(f"Error in row {line_num}: Code ''{code}'' is too long.")
-        ClientGroup.objects.update_or_create(code=code, defaults={'name': name})
+    def parse_rows():
+        for line_num, row in enumerate(iter_csv_rows(file), start=1):
+            if not row: continue
+            if len(row) != 2: raise ValueError(f"Row {line_num} is malformed.")
+            code, name = [item.strip() for item in row]
+            if len(code) > 10: raise ValueError(f"Error in row {line_num}: Code ''{code}'' is too long.")
+            yield {'code': code, 'name': name}
+
+    counts = bulk_upsert_by_code(ClientGroup, parse_rows(), update_fields=['name'])
+    # The bulk upsert bypasses ClientGroup.save(); renamed groups still have to reach their clients.
+    Client.objects.sync_client_group_names()
+    return counts
@@ -0,0 +1,270 @@
+"""
+Usage ledger and quotas for the Google Maps Platform APIs. GoogleMapsClient asks `admit()` before
+every request and reports it to `record()` afterwards. Calls are counted in billable elements
+(one per geocode or place search, origins x destinations for a matrix) and summed per hour, API
+and caller into GoogleApiUsage. Requests flush their usage when they finish (ApiCallerMiddleware);
+commands and jobs buffer it for up to FLUSH_SECONDS between calls and flush at exit.
+
+Quotas come from settings.GOOGLE_API_QUOTAS, e.g.
+    {'route_matrix': {'period': 'month', 'soft': 800000, 'hard': 1000000}}
+Past the soft quota, commands and jobs run cache-only: requests are skipped, so callers fall back
+on cached travel times, estimates and FSA centroids. Views keep going until the hard quota, past
+which every request raises GoogleApiQuotaExceeded.
+"""
+import atexit
+import contextlib
+import contextvars
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+from core.models import GoogleApiUsage
+
+logger = logging.getLogger(__name__)
+
+APIS = ('geocode', 'place_search', 'distance_matrix', 'route_matrix')
+QUOTAS = getattr(settings, 'GOOGLE_API_QUOTAS', {})
+FLUSH_SECONDS = getattr(settings, 'GOOGLE_API_USAGE_FLUSH_SECONDS', 10)
+# How long a process trusts its last reading of the ledger when checking quotas.
+RECHECK_SECONDS = getattr(settings, 'GOOGLE_API_QUOTA_RECHECK_SECONDS', 30)
+
+_caller = contextvars.ContextVar('google_api_caller', default=None)
+_lock = threading.Lock()
+# {(hour, api, caller): [calls, elements, errors, total_latency_ms, max_latency_ms]}
+_pending = defaultdict(lambda: [0, 0, 0, 0, 0])
+_state = {'flushed_at': time.monotonic()}
+# {api: (period start, elements in the ledger, read at (monotonic), elements recorded here since)}
+_usage = {}
+
+
+class GoogleApiQuotaExceeded(Exception):
+    """Raised instead of sending a request once an API's hard quota is used up."""
+
+
+# --- Callers ---
+def _default_caller():
+    """Management commands are identified by name; anything else unlabelled is 'other'."""
+    if len(sys.argv) > 1 and sys.argv[0].endswith('manage.py') and sys.argv[1] not in ('runserver', 'shell'):
+        return f'command:{sys.argv[1]}'
+    return 'other'
+
+
+def current_caller():
+    return _caller.get() or _default_caller()
+
+
+@contextlib.contextmanager
+def api_caller(name):
+    """Attributes the Google calls made inside the block to `name` (e.g. 'job:nightly-refresh')."""
+    token = _caller.set(name)
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def is_interactive(caller):
+    return caller.startswith('view:')
+
+
+class ApiCallerMiddleware:
+    """Attributes the Google calls made while serving a request to its view ('view:<url name>')."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # A worker thread serves many requests: start each one unlabelled.
+        _caller.set(None)
+        response = self.get_response(request)
+        # Written now rather than on the next call: an idle worker would keep it from the other
+        # processes' quota checks indefinitely.
+        if _pending:
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        _caller.set(None)
+        response = await self.get_response(request)
+        if _pending:
+            await sync_to_async(flush)()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        name = match.view_name if match and match.url_name else f'{view_func.__module__}.{view_func.__name__}'
+        _caller.set(f'view:{name}')
+
+
+# --- Ledger ---
+def _hour(now):
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def _write_bucket(hour, api, caller, calls, elements, errors, total_latency_ms, max_latency_ms):
+    bucket = GoogleApiUsage.objects.filter(hour=hour, api=api, caller=caller)
+    increments = {
+        'calls': F('calls') + calls,
+        'elements': F('elements') + elements,
+        'errors': F('errors') + errors,
+        'total_latency_ms': F('total_latency_ms') + total_latency_ms,
+        'max_latency_ms': Greatest(F('max_latency_ms'), max_latency_ms),
+    }
+    if bucket.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            GoogleApiUsage.objects.create(
+                hour=hour, api=api, caller=caller, calls=calls, elements=elements, errors=errors,
+                total_latency_ms=total_latency_ms, max_latency_ms=max_latency_ms,
+            )
+    except IntegrityError:
+        # Another process created the bucket first.
+        bucket.update(**increments)
+
+
+def flush():
+    """Writes the buffered totals to GoogleApiUsage. Buckets that fail to save stay buffered."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _state['flushed_at'] = time.monotonic()
+    for key, totals in pending.items():
+        try:
+            _write_bucket(*key, *totals)
+        except Exception as e:
+            logger.warning("Could not save Google API usage for %s: %s", key[1], e)
+            with _lock:
+                merged = _pending[key]
+                for index in range(4):
+                    merged[index] += totals[index]
+                merged[4] = max(merged[4], totals[4])
+
+
+atexit.register(flush)
+
+
+def record(api, elements, latency_seconds, error=False):
+    """Adds one request to the ledger."""
+    latency_ms = int(latency_seconds * 1000)
+    with _lock:
+        totals = _pending[(_hour(timezone.now()), api, current_caller())]
+        totals[0] += 1
+        totals[1] += elements
+        totals[2] += int(error)
+        totals[3] += latency_ms
+        totals[4] = max(totals[4], latency_ms)
+        if api in _usage:
+            start, used, read_at, since = _usage[api]
+            _usage[api] = (start, used, read_at, since + elements)
+        due = time.monotonic() - _state['flushed_at'] >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+# --- Quotas ---
+def period_start(period, now=None):
+    now = timezone.now() if now is None else now
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day.replace(day=1) if period == 'month' else day
+
+
+def _used(api, period):
+    """Elements used by `api` in the current period, as last read from the ledger plus what this process recorded since."""
+    start = period_start(period)
+    with _lock:
+        cached = _usage.get(api)
+    if cached and cached[0] == start and time.monotonic() - cached[2] < RECHECK_SECONDS:
+        return cached[1] + cached[3]
+    used = GoogleApiUsage.objects.filter(api=api, hour__gte=start).aggregate(total=Sum('elements'))['total'] or 0
+    with _lock:
+        unflushed = sum(totals[1] for (hour, key_api, _), totals in _pending.items() if key_api == api and hour >= start)
+        _usage[api] = (start, used, time.monotonic(), unflushed)
+    return used + unflushed
+
+
+def quota_status(api):
+    """{'period', 'used', 'soft', 'hard', 'state'} for an API, or None when it has no quota."""
+    quota = QUOTAS.get(api)
+    if not quota:
+        return None
+    period = quota.get('period', 'month')
+    used = _used(api, period)
+    soft, hard = quota.get('soft'), quota.get('hard')
+    state = 'ok'
+    if hard is not None and used >= hard:
+        state = 'refusing'
+    elif soft is not None and used >= soft:
+        state = 'cache-only'
+    return {'period': period, 'used': used, 'soft': soft, 'hard': hard, 'state': state}
+
+
+def admit(api, elements=1):
+    """
+    Returns True when a request of `elements` may be sent, False when the caller should make do
+    with cached data (soft quota, non-interactive caller). Raises GoogleApiQuotaExceeded past the
+    hard quota.
+    """
+    quota = QUOTAS.get(api)
+    if not quota:
+        return True
+    used = _used(api, quota.get('period', 'month'))
+    hard, soft = quota.get('hard'), quota.get('soft')
+    if hard is not None and used + elements > hard:
+        raise GoogleApiQuotaExceeded(f"The {api} quota of {hard} elements per {quota.get('period', 'month')} is used up ({used} used).")
+    caller = current_caller()
+    if soft is not None and used + elements > soft and not is_interactive(caller):
+        logger.warning("Google %s soft quota reached (%s of %s elements): %s runs cache-only.", api, used, soft, caller)
+        return False
+    return True
+
+
+# --- Reporting ---
+def usage_report(days=7, hourly=False):
+    """
+    Totals per day (or hour when `hourly`), API and caller over the last `days` days, newest first,
+    plus the quota status of every API that has one.
+    """
+    flush()
+    since = period_start('day') - timedelta(days=max(days, 1) - 1)
+    rows = GoogleApiUsage.objects.filter(hour__gte=since)
+    period = F('hour') if hourly else TruncDate('hour')
+    totals = (
+        rows.annotate(period=period).values('period', 'api', 'caller')
+        .annotate(
+            calls=Sum('calls'), elements=Sum('elements'), errors=Sum('errors'),
+            total_latency_ms=Sum('total_latency_ms'), max_latency_ms=Max('max_latency_ms'),
+        )
+        .order_by('-period', 'api', '-elements')
+    )
+    return {
+        'since': since.isoformat(),
+        'rows': [
+            {
+                'period': row['period'].isoformat(),
+                'api': row['api'],
+                'caller': row['caller'],
+                'calls': row['calls'],
+                'elements': row['elements'],
+                'errors': row['errors'],
+                'mean_latency_ms': round(row['total_latency_ms'] / row['calls']) if row['calls'] else None,
+                'max_latency_ms': row['max_latency_ms'],
+            }
+            for row in totals
+        ],
+        'quotas': {api: quota_status(api) for api in APIS if QUOTAS.get(api)},
+    }
@@ -0,0 +1,84 @@
+"""
+Registry of the query shapes behind the busiest pages, as the views build them (first page only).
+`manage.py explain_hot_queries` runs EXPLAIN on each and flags the sequential scans, so a new
+index, or a view change that loses one, shows up in its plan.
+"""
+from django.db.models import Q
+from address.models import Address
+from client.models import Client, ClientGroup
+from employees.models import EmployeeProfile
+
+HOT_QUERIES = {}
+
+
+def hot_query(name, description):
+    """Registers a function returning the queryset of a hot query under `name`."""
+    def register(build):
+        HOT_QUERIES[name] = (description, build)
+        return build
+    return register
+
+
+def _first_pk(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first() or 0
+
+
+# --- Clients ---
+@hot_query('client_list', 'Client list, first page (keyset on group name, name, pk)')
+def client_list():
+    return (
+        Client.objects.select_related('client_group', 'territory', 'address_status', 'address', 'cost_to_serve')
+        .defer('address__components').order_by('client_group_name', 'name', 'pk')[:26]
+    )
+
+
+@hot_query('client_list_by_cost', 'Client list sorted by cost to serve')
+def client_list_by_cost():
+    return (
+        Client.objects.filter(cost_to_serve__isnull=False).select_related('client_group', 'cost_to_serve')
+        .order_by('cost_to_serve__total_cost', 'pk')[:26]
+    )
+
+
+@hot_query('client_default_order', 'Clients in their default (name, account number) order')
+def client_default_order():
+    return Client.objects.order_by('name', 'account_number')[:50]
+
+
+@hot_query('client_group_clients', "A client group's clients, by name")
+def client_group_clients():
+    return Client.objects.filter(client_group_id=_first_pk(ClientGroup)).order_by('name')[:50]
+
+
+@hot_query('address_validation_queue', 'Clients with an INCOMPLETE address (validation queue)')
+def address_validation_queue():
+    return (
+        Client.objects.filter(address_status__name='INCOMPLETE').select_related('address', 'address_status')
+        .defer('address__components').order_by('name', 'account_number')[:51]
+    )
+
+
+@hot_query('client_map', 'Geocoded clients for the map')
+def client_map():
+    return Client.objects.filter(
+        address__latitude__isnull=False, address__longitude__isnull=False,
+    ).values('name', 'address__latitude', 'address__longitude', 'address__precision')
+
+
+@hot_query('geocoded_addresses', 'Geocoded addresses (cost to serve, partitioning)')
+def geocoded_addresses():
+    return Address.objects.filter(Q(latitude__isnull=False) & Q(longitude__isnull=False)).values_list('id', 'latitude', 'longitude')
+
+
+# --- Employees ---
+@hot_query('technician_list', 'Technicians by first name')
+def technician_list():
+    return (
+        EmployeeProfile.objects.filter(role=EmployeeProfile.Role.TECHNICIAN).select_related('user', 'address')
+        .defer('address__components').order_by('user__first_name')
+    )
+
+
+@hot_query('employee_list', 'All employees by name')
+def employee_list():
+    return EmployeeProfile.objects.select_related('user').order_by('user__first_name', 'user__last_name')
@@ -0,0 +1,53 @@
+import hashlib
+import time
+from pathlib import Path
+import django
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from core.models import SchemaFingerprint
+
+
+def schema_fingerprint():
+    """SHA-256 over the Django version and every installed app's migration files (names and contents)."""
+    digest = hashlib.sha256(django.get_version().encode())
+    for app_config in sorted(apps.get_app_configs(), key=lambda config: config.label):
+        migrations_dir = Path(app_config.path) / 'migrations'
+        for path in sorted(migrations_dir.glob('*.py')):
+            digest.update(f'{app_config.label}/{path.name}'.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Container boot step: runs system checks and migrations, unless the database was already '
+        'prepared for exactly these migration files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Run checks and migrations even if the fingerprint matches.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        fingerprint = schema_fingerprint()
+
+        if not options['force']:
+            try:
+                applied = SchemaFingerprint.objects.filter(fingerprint=fingerprint).exists()
+            except DatabaseError:
+                # Fresh database: the table does not exist until the first migrate.
+                applied = False
+            if applied:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Schema fingerprint {fingerprint[:12]} already applied; skipped checks and migrations "
+                    f"({time.monotonic() - started:.2f}s)."
+                ))
+                return
+
+        self.stdout.write(f"Schema fingerprint {fingerprint[:12]} is new; running checks and migrations.")
+        call_command('check')
+        call_command('migrate', interactive=False)
+        SchemaFingerprint.objects.get_or_create(fingerprint=fingerprint)
+        self.stdout.write(self.style.SUCCESS(f"Database ready ({time.monotonic() - started:.2f}s)."))
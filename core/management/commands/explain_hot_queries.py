@@ -0,0 +1,100 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.hot_queries import HOT_QUERIES
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def _postgres_plan(queryset, analyze, min_rows):
+    """
+    Returns (summary, sequential scans, sorts) from a JSON plan; scans of tables and sorts of
+    inputs under `min_rows` rows are ignored.
+    """
+    options = {'format': 'json'}
+    if analyze:
+        options.update(analyze=True, buffers=True)
+    plan = json.loads(queryset.explain(**options))[0]
+    root = plan['Plan']
+    summary = f"cost {root['Total Cost']:.0f}, {root['Plan Rows']} rows"
+    if analyze:
+        summary += f", {plan['Execution Time']:.1f} ms"
+    seq_scans, sorts = [], []
+    for node in _walk(root):
+        rows = node.get('Actual Rows', node['Plan Rows']) if analyze else node['Plan Rows']
+        if rows < min_rows:
+            continue
+        if node['Node Type'] == 'Seq Scan':
+            seq_scans.append(f"{node['Relation Name']} (~{rows} rows)")
+        elif node['Node Type'] == 'Sort':
+            sorts.append(f"{', '.join(node.get('Sort Key', []))} (~{rows} rows)")
+    return summary, seq_scans, sorts
+
+
+def _sqlite_plan(queryset):
+    """
+    EXPLAIN QUERY PLAN lines. Every SCAN reads the whole table (or a whole index, in its order)
+    and every TEMP B-TREE is a sort; without row estimates none of them can be dismissed as small.
+    """
+    lines = queryset.explain().splitlines()
+    seq_scans = []
+    for line in lines:
+        detail = line.split(' ', 3)[-1]
+        if detail.startswith('SCAN '):
+            seq_scans.append(detail[len('SCAN '):])
+    sorts = [line.split(' ', 3)[-1] for line in lines if 'TEMP B-TREE' in line]
+    return f"{len(lines)} plan steps", seq_scans, sorts
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on every registered hot query (core.hot_queries) and flags sequential scans and sorts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only these queries (default: all).')
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE: run the queries and report actual rows and times (PostgreSQL).')
+        parser.add_argument('--min-rows', type=int, default=1000, help='Ignore sequential scans and sorts estimated under this many rows (PostgreSQL).')
+        parser.add_argument('--verbose-plan', action='store_true', help='Print each full plan.')
+        parser.add_argument(
+            '--fail-on-flagged', '--fail-on-seq-scan', dest='fail_on_flagged', action='store_true',
+            help='Exit with an error if any query has a flagged sequential scan or sort.',
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(HOT_QUERIES)
+        unknown = [name for name in names if name not in HOT_QUERIES]
+        if unknown:
+            raise CommandError(f"Unknown hot queries: {', '.join(unknown)}. Known: {', '.join(HOT_QUERIES)}.")
+
+        postgres = connection.vendor == 'postgresql'
+        if not postgres:
+            self.stdout.write(self.style.WARNING(f'{connection.vendor}: plans have no row estimates; run against PostgreSQL for a meaningful audit.'))
+
+        flagged = 0
+        for name in names:
+            description, build = HOT_QUERIES[name]
+            queryset = build()
+            if postgres:
+                summary, seq_scans, sorts = _postgres_plan(queryset, options['analyze'], options['min_rows'])
+            else:
+                summary, seq_scans, sorts = _sqlite_plan(queryset)
+
+            problems = []
+            if seq_scans:
+                problems.append(f"full scan of {', '.join(seq_scans)}")
+            if sorts:
+                problems.append(f"sort for {', '.join(sorts)}")
+            if problems:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f"{name}: {summary}; {'; '.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: {summary}; index access only"))
+            self.stdout.write(f"    {description}")
+            if options['verbose_plan']:
+                self.stdout.write(queryset.explain())
+
+        if flagged and options['fail_on_flagged']:
+            raise CommandError(f'{flagged} of {len(names)} hot queries use a sequential scan or a sort.')
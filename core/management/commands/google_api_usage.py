@@ -0,0 +1,33 @@
+import json
+from django.core.management.base import BaseCommand
+from core.api_usage import usage_report
+
+
+class Command(BaseCommand):
+    help = 'Reports Google Maps Platform usage per day (or hour), API and caller, and where each quota stands.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Days to report, today included.')
+        parser.add_argument('--hourly', action='store_true', help='One line per hour instead of per day.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        report = usage_report(days=options['days'], hourly=options['hourly'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if not report['rows']:
+            self.stdout.write(self.style.WARNING(f"No Google API calls recorded since {report['since']}."))
+        else:
+            self.stdout.write(f"{'period':<25} {'api':<16} {'caller':<40} {'calls':>8} {'elements':>10} {'errors':>7} {'mean ms':>8} {'max ms':>8}")
+            for row in report['rows']:
+                self.stdout.write(
+                    f"{row['period']:<25} {row['api']:<16} {row['caller'][:40]:<40} {row['calls']:>8} {row['elements']:>10} "
+                    f"{row['errors']:>7} {row['mean_latency_ms'] or 0:>8} {row['max_latency_ms']:>8}"
+                )
+
+        for api, quota in report['quotas'].items():
+            line = f"{api}: {quota['used']} elements this {quota['period']} (soft {quota['soft'] or '-'}, hard {quota['hard'] or '-'})"
+            style = {'ok': self.style.SUCCESS, 'cache-only': self.style.WARNING, 'refusing': self.style.ERROR}[quota['state']]
+            self.stdout.write(style(f"{line}: {quota['state']}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.snapshot_service import load_snapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes a memory-mappable columnar snapshot of clients, addresses, territories and employees (services.snapshot_service).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory receiving snapshot-<timestamp>/ and the `latest` link.')
+        parser.add_argument('--keep', type=int, default=None, help='Keep only this many most recent snapshots.')
+
+    def handle(self, *args, **options):
+        if options['keep'] is not None and options['keep'] < 1:
+            raise CommandError('--keep must be at least 1.')
+        path, manifest = write_snapshot(options['output_dir'], keep=options['keep'])
+
+        snapshot = load_snapshot(path)
+        total_bytes = sum(file.stat().st_size for file in path.rglob('*.npy'))
+        for table, described in manifest['tables'].items():
+            columns = snapshot[table]
+            if any(len(column) != described['rows'] for column in columns.values()):
+                raise CommandError(f'{table}: column lengths do not match its {described["rows"]} rows.')
+            self.stdout.write(f"{table:<22} {described['rows']:>8} rows  {len(columns)} columns")
+        self.stdout.write(self.style.SUCCESS(f'Snapshot written to {path} ({total_bytes / 1024:.0f} KiB).'))
@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime, so nothing is already imported.
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+timings = {'django.setup': setup_done - started, 'urlconf': urls_done - setup_done}
+path = sys.argv[1]
+if path:
+    from django.conf import settings
+    from django.test import Client
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost')
+    response = Client(SERVER_NAME=host).get(path)
+    timings['first_request'] = time.perf_counter() - urls_done
+    timings['status'] = response.status_code
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(stderr):
+    """Parses `-X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Reports the time spent importing each module while the project starts, and the time to the first request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Modules to list.')
+        parser.add_argument('--path', default='', help='Also time a first GET to this path, e.g. /login/.')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON.')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, options['path']],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in modules:
+            by_package[name.split('.')[0]] += self_us
+        slowest = sorted(modules, key=lambda module: module[1], reverse=True)[:options['limit']]
+        packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'timings': timings,
+                'packages_us': dict(packages),
+                'modules': [{'module': name, 'self_us': s, 'cumulative_us': c} for name, s, c, _ in slowest],
+            }, indent=2))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Startup phases'))
+        for phase in ('django.setup', 'urlconf', 'first_request'):
+            if phase in timings:
+                self.stdout.write(f"  {phase:<16} {timings[phase] * 1000:8.1f} ms")
+        if 'status' in timings:
+            self.stdout.write(f"  (first request answered {timings['status']})")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Import time by top-level package (self)'))
+        for package, self_us in packages:
+            self.stdout.write(f"  {package:<32} {self_us / 1000:8.1f} ms")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest modules (self / cumulative)'))
+        for name, self_us, cumulative_us, _ in slowest:
+            self.stdout.write(f"  {name:<48} {self_us / 1000:8.1f} ms {cumulative_us / 1000:8.1f} ms")
+
+        total = sum(self_us for _, self_us, _, _ in modules)
+        self.stdout.write(self.style.SUCCESS(f"{len(modules)} modules imported in {total / 1000:.1f} ms."))
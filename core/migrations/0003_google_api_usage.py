@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_schema_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleApiUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('api', models.CharField(max_length=32)),
+                ('caller', models.CharField(help_text='The view, command or job that sent the requests.', max_length=150)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('elements', models.PositiveBigIntegerField(default=0, help_text='Billable elements: one per geocode or place search, origins x destinations per matrix.')),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('total_latency_ms', models.PositiveBigIntegerField(default=0)),
+                ('max_latency_ms', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Google API Usage',
+                'verbose_name_plural': 'Google API Usage',
+                'ordering': ['-hour', 'api', 'caller'],
+                'indexes': [models.Index(fields=['api', 'hour'], name='google_api_usage_api_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'api', 'caller'), name='google_api_usage_bucket_unique')],
+            },
+        ),
+    ]
@@ -13,3 +13,56 @@ class FAQ(models.Model):
 
     def __str__(self):
         return self.question
+
+class SchemaFingerprint(models.Model):
+    """
+    A digest of every installed app's migration files, recorded once `manage.py boot` has checked
+    and migrated the database for that code. A container booting the same code again can skip both.
+    """
+    fingerprint = models.CharField(max_length=64, unique=True)
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-applied_at']
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ({self.applied_at:%Y-%m-%d %H:%M})"
+
+class GoogleApiUsage(models.Model):
+    """Hourly totals of the Google Maps Platform requests sent, per API and caller (see core.api_usage)."""
+    hour = models.DateTimeField()
+    api = models.CharField(max_length=32)
+    caller = models.CharField(max_length=150, help_text="The view, command or job that sent the requests.")
+    calls = models.PositiveIntegerField(default=0)
+    elements = models.PositiveBigIntegerField(default=0, help_text="Billable elements: one per geocode or place search, origins x destinations per matrix.")
+    errors = models.PositiveIntegerField(default=0)
+    total_latency_ms = models.PositiveBigIntegerField(default=0)
+    max_latency_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hour', 'api', 'caller']
+        verbose_name = "Google API Usage"
+        verbose_name_plural = "Google API Usage"
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'api', 'caller'], name='google_api_usage_bucket_unique'),
+        ]
+        indexes = [
+            # Quota checks sum one API's elements since the start of the day or month.
+            models.Index(fields=['api', 'hour'], name='google_api_usage_api_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.api} {self.caller} {self.hour:%Y-%m-%d %H:00}: {self.elements}"
+
+class VersionStamp(models.Model):
+    """
+    A counter bumped whenever the data behind a process-local or session cache changes (see
+    core.version_stamps). Kept in the database so every worker and command sees the same stamp,
+    whether or not the cache backend is shared.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
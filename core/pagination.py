@@ -0,0 +1,212 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough to run.
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset, exact_threshold=EXACT_COUNT_THRESHOLD):
+    """
+    Returns (count, is_estimate) for a queryset. On PostgreSQL the planner's row estimate is read
+    from EXPLAIN instead of running COUNT(*); small results still get an exact count.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count(), False
+    plan = json.loads(queryset.explain(format='json'))
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < exact_threshold:
+        return queryset.count(), False
+    return estimate, True
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over a queryset ordered by `keyset_fields`, which must end with a unique field
+    (usually 'pk') and hold no NULLs. Each page is fetched with a WHERE on the previous page's
+    boundary instead of an OFFSET, so deep pages cost the same as the first one.
+    Prefix a field with '-' to sort it descending.
+    """
+
+    def __init__(self, queryset, keyset_fields, per_page, count_mode='estimate'):
+        self.keyset_fields = [field.lstrip('-') for field in keyset_fields]
+        self.descending = [field.startswith('-') for field in keyset_fields]
+        self.per_page = per_page
+        self.count_mode = count_mode
+        self.queryset = queryset.annotate(**{
+            self._alias(position): F(field) for position, field in enumerate(self.keyset_fields)
+        })
+        self._count = None
+
+    @staticmethod
+    def _alias(position):
+        return f'keyset_{position}'
+
+    def _model_field(self, path):
+        """The model field at the end of a keyset path such as 'pk' or 'cost_to_serve__total_cost'."""
+        model = self.queryset.model
+        for name in path.split(LOOKUP_SEP):
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            model = field.related_model or model
+        return field
+
+    # --- Counting ---
+    def _resolve_count(self):
+        if self._count is None:
+            if self.count_mode == 'exact':
+                self._count = (self.queryset.order_by().count(), False)
+            elif self.count_mode == 'estimate':
+                self._count = estimate_count(self.queryset)
+            else:
+                self._count = (None, False)
+        return self._count
+
+    @property
+    def count(self):
+        return self._resolve_count()[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._resolve_count()[1]
+
+    # --- Cursors ---
+    def encode_cursor(self, obj):
+        values = [getattr(obj, self._alias(position)) for position in range(len(self.keyset_fields))]
+        raw = json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (ValueError, UnicodeError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.keyset_fields):
+            raise InvalidCursor(cursor)
+        # A tampered cursor must not reach the WHERE clause: keyset columns hold no NULLs, and
+        # every value has to convert to its column's type.
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        try:
+            return [self._model_field(field).to_python(value) for field, value in zip(self.keyset_fields, values)]
+        except (ValidationError, TypeError):
+            raise InvalidCursor(cursor)
+
+    def _seek_filter(self, values, forward):
+        """
+        Builds `(f1, f2, ...) > (v1, v2, ...)` (or `<` when paging backwards) as nested ORs,
+        with a redundant bound on the first field so the database can use a range scan.
+        """
+        condition = Q()
+        for position in reversed(range(len(self.keyset_fields))):
+            field, value = self.keyset_fields[position], values[position]
+            ascending = forward != self.descending[position]
+            strict = Q(**{f'{field}__{"gt" if ascending else "lt"}': value})
+            if position == len(self.keyset_fields) - 1:
+                condition = strict
+            else:
+                condition = strict | (Q(**{field: value}) & condition)
+        first_ascending = forward != self.descending[0]
+        leading_bound = Q(**{f'{self.keyset_fields[0]}__{"gte" if first_ascending else "lte"}': values[0]})
+        return leading_bound & condition
+
+    def _ordering(self, forward):
+        return [
+            field if forward != descending else f'-{field}'
+            for field, descending in zip(self.keyset_fields, self.descending)
+        ]
+
+    # --- Pages ---
+    def page(self, after=None, before=None):
+        forward = before is None
+        queryset = self.queryset
+        cursor = after if forward else before
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(self.decode_cursor(cursor), forward))
+
+        rows = list(queryset.order_by(*self._ordering(forward))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        return KeysetPage(
+            rows,
+            self,
+            has_next=has_more if forward else True,
+            has_previous=bool(after) if forward else has_more,
+        )
+
+
+class KeysetPage:
+    """A page of a KeysetPaginator, shaped enough like Django's Page for the list templates."""
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+        self.next_cursor = paginator.encode_cursor(object_list[-1]) if object_list else None
+        self.previous_cursor = paginator.encode_cursor(object_list[0]) if object_list else None
+        self.first_query = self.next_query = self.previous_query = ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def build_queries(self, query_dict):
+        """Builds the first/next/previous query strings, keeping the request's other parameters."""
+        base = query_dict.copy()
+        for key in ('after', 'before', 'page'):
+            base.pop(key, None)
+        self.first_query = base.urlencode()
+        if self._has_next:
+            params = base.copy()
+            params['after'] = self.next_cursor
+            self.next_query = params.urlencode()
+        if self._has_previous:
+            params = base.copy()
+            params['before'] = self.previous_cursor
+            self.previous_query = params.urlencode()
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing OFFSET pagination with a KeysetPaginator.
+    Set `keyset_fields` to the sort columns followed by a unique tie-breaker.
+    """
+    keyset_fields = ('pk',)
+    count_mode = 'estimate'
+
+    def get_keyset_fields(self):
+        return self.keyset_fields
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.get_keyset_fields(), page_size, count_mode=self.count_mode)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except InvalidCursor:
+            page = paginator.page()
+        page.build_queries(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,89 @@
+"""
+Process-local cache for near-static reference tables (AddressStatus, TravelCostParameters).
+Saves and deletes bump a database version stamp (core.version_stamps), which each process checks
+at most every RECHECK_SECONDS. Returned instances are shared by the whole process: treat them as read-only.
+"""
+import threading
+import time
+from django.conf import settings
+from address.models import AddressStatus
+from organization.models import TravelCostParameters
+from .version_stamps import REFERENCE_DATA, bump, get_version
+
+RECHECK_SECONDS = getattr(settings, 'REFERENCE_DATA_RECHECK_SECONDS', 5)
+MAX_AGE_SECONDS = getattr(settings, 'REFERENCE_DATA_MAX_AGE_SECONDS', 300)
+
+_lock = threading.Lock()
+_state = {
+    'version': None,
+    'loaded_at': 0.0,
+    'checked_at': 0.0,
+    'address_statuses': None,
+    'travel_cost_parameters': None,
+    'travel_cost_parameters_loaded': False,
+}
+
+
+def _ensure_fresh():
+    now = time.monotonic()
+    if now - _state['checked_at'] < RECHECK_SECONDS and now - _state['loaded_at'] < MAX_AGE_SECONDS:
+        return
+    version = get_version(REFERENCE_DATA)
+    with _lock:
+        if version != _state['version'] or now - _state['loaded_at'] >= MAX_AGE_SECONDS:
+            _state.update(
+                version=version,
+                loaded_at=now,
+                address_statuses=None,
+                travel_cost_parameters=None,
+                travel_cost_parameters_loaded=False,
+            )
+        _state['checked_at'] = now
+
+
+def invalidate_reference_data():
+    """Drops this process's copy and tells every other process to reload on its next check."""
+    bump(REFERENCE_DATA)
+    with _lock:
+        _state.update(checked_at=0.0, loaded_at=0.0)
+
+
+# --- Address Statuses ---
+def get_address_statuses():
+    """Returns every AddressStatus keyed by name."""
+    _ensure_fresh()
+    statuses = _state['address_statuses']
+    if statuses is None:
+        statuses = {status.name: status for status in AddressStatus.objects.all()}
+        _state['address_statuses'] = statuses
+    return statuses
+
+
+def get_address_status(name: str) -> AddressStatus:
+    """Returns the AddressStatus with this name, raising AddressStatus.DoesNotExist like .get() would."""
+    try:
+        return get_address_statuses()[name]
+    except KeyError:
+        raise AddressStatus.DoesNotExist(f"AddressStatus '{name}' does not exist.")
+
+
+def complete_status() -> AddressStatus:
+    return get_address_status('COMPLETE')
+
+
+def incomplete_status() -> AddressStatus:
+    return get_address_status('INCOMPLETE')
+
+
+def missing_status() -> AddressStatus:
+    return get_address_status('MISSING')
+
+
+# --- Travel Cost Parameters ---
+def get_latest_travel_cost_parameters() -> TravelCostParameters | None:
+    """Returns the most recent TravelCostParameters, or None if none are configured."""
+    _ensure_fresh()
+    if not _state['travel_cost_parameters_loaded']:
+        _state['travel_cost_parameters'] = TravelCostParameters.objects.order_by('-created_at').first()
+        _state['travel_cost_parameters_loaded'] = True
+    return _state['travel_cost_parameters']
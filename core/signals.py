@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from address.models import AddressStatus
+from organization.models import TravelCostParameters
+from .reference_data import invalidate_reference_data
+
+@receiver(post_save, sender=AddressStatus)
+@receiver(post_delete, sender=AddressStatus)
+@receiver(post_save, sender=TravelCostParameters)
+@receiver(post_delete, sender=TravelCostParameters)
+def invalidate_reference_data_on_change(sender, **kwargs):
+    invalidate_reference_data()
@@ -0,0 +1,29 @@
+"""
+Invalidation stamps shared by every process through the VersionStamp table. A cache entry records
+the stamp it was built under and is stale once the stamp has moved; a missing row reads as 0.
+Stamps are always read from 'default': a lagging replica would hand out an old stamp.
+"""
+from django.db.models import F
+from django.utils import timezone
+from core.models import VersionStamp
+
+# Stamps bumped from signal handlers are named here, so the handlers do not import the services
+# (and NumPy) that read them.
+COST_SIMULATION_GROUPINGS = 'cost-simulation:client-groupings'
+ISOCHRONES = 'isochrones'
+REFERENCE_DATA = 'reference-data'
+
+
+def get_version(key):
+    """The current stamp of `key`."""
+    version = VersionStamp.objects.using('default').filter(key=key).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump(*keys):
+    """Moves the stamps of `keys`, making everything cached under them stale."""
+    if not keys:
+        return
+    # Create the missing rows first so the increment below always lands, even when racing another bump.
+    VersionStamp.objects.bulk_create([VersionStamp(key=key) for key in keys], ignore_conflicts=True)
+    VersionStamp.objects.filter(key__in=keys).update(version=F('version') + 1, updated_at=timezone.now())
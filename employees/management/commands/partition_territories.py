@@ -0,0 +1,58 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from employees.models import EmployeeProfile
+from services.territory_partition_service import partition_territories, DEFAULT_TOLERANCE, DEFAULT_MAX_ITERATIONS
+
+class Command(BaseCommand):
+    help = 'Proposes FSA-to-manager reassignments that balance the geocoded clients between managers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--managers', nargs='+', help='Employee codes of the managers to balance between (default: all managers).')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed excess over the average client count, e.g. 0.1 for 10%%.')
+        parser.add_argument('--iterations', type=int, default=DEFAULT_MAX_ITERATIONS, help='Maximum k-means iterations.')
+        parser.add_argument('--csv', dest='csv_path', help='Write the proposed reassignments to this CSV file.')
+
+    def _write_summary(self, title, summary):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for row in summary['managers']:
+            spread = f"{row['spread_km']:7.1f} km avg {row['max_km']:7.1f} km max" if row['clients'] else f"{'-':>10} {'-':>17}"
+            cost = f"{row['travel_cost']:12.2f} $" if row['travel_cost'] is not None else ''
+            self.stdout.write(f"  {str(row['manager']):<12} {row['clients']:>8} clients  {spread}  {cost}")
+        imbalance = summary['imbalance'] if summary['imbalance'] is not None else '-'
+        self.stdout.write(f"  Unassigned: {summary['unassigned_clients']}  Imbalance (CV): {imbalance}  Travel cost: {summary['travel_cost'] or '-'}")
+
+    def handle(self, *args, **options):
+        managers = EmployeeProfile.objects.filter(role=EmployeeProfile.Role.MANAGER).select_related('user').order_by('code')
+        if options['managers']:
+            managers = managers.filter(code__in=options['managers'])
+            unknown = set(options['managers']) - set(managers.values_list('code', flat=True))
+            if unknown:
+                raise CommandError(f"Unknown manager codes: {', '.join(sorted(unknown))}")
+
+        try:
+            result = partition_territories(managers, tolerance=options['tolerance'], max_iterations=options['iterations'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{result['fsas']} FSAs, converged in {result['iterations']} iterations.")
+        if result['clients_without_fsa']:
+            self.stdout.write(self.style.WARNING(f"{result['clients_without_fsa']} geocoded clients have no valid postal code and were left out."))
+        self._write_summary('Current assignment', result['current'])
+        self._write_summary('Proposed assignment', result['proposed'])
+
+        if options['csv_path']:
+            with open(options['csv_path'], 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['fsa', 'clients', 'current_manager', 'proposed_manager'])
+                for move in result['reassignments']:
+                    writer.writerow([move['fsa'], move['clients'], move['from'] or '', move['to']])
+            self.stdout.write(f"Reassignments written to {options['csv_path']}.")
+        else:
+            for move in result['reassignments'][:20]:
+                self.stdout.write(f"  {move['fsa']}: {move['from'] or '(none)'} -> {move['to']} ({move['clients']} clients)")
+            if len(result['reassignments']) > 20:
+                self.stdout.write(f"  ... and {len(result['reassignments']) - 20} more (use --csv for the full list).")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Proposed {len(result['reassignments'])} FSA reassignments moving {result['moved_clients']} clients."
+        ))
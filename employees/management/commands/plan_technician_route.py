@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.api_usage import GoogleApiQuotaExceeded
+from django.db.models import Q
+from client.models import Client
+from employees.models import EmployeeProfile
+from services.route_optimizer_service import plan_technician_route, DEFAULT_TIME_BUDGET_SECONDS
+
+class Command(BaseCommand):
+    help = "Plans the visit order of a list of clients for a technician, leaving from the technician's home."
+
+    def add_arguments(self, parser):
+        parser.add_argument('technician', help='Technician code or primary key.')
+        parser.add_argument('accounts', nargs='+', help='Account numbers of the clients to visit.')
+        parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET_SECONDS, help='CPU seconds allowed for the local search.')
+        parser.add_argument('--no-return', action='store_true', help='End the route at the last client instead of driving home.')
+
+    def handle(self, *args, **options):
+        lookup = Q(code=options['technician'])
+        if options['technician'].isdigit():
+            lookup |= Q(pk=int(options['technician']))
+        technician = EmployeeProfile.objects.select_related('address', 'user').filter(lookup).first()
+        if technician is None:
+            raise CommandError(f"No employee matches '{options['technician']}'.")
+
+        clients = list(Client.objects.select_related('address').filter(account_number__in=options['accounts']))
+        missing = set(options['accounts']) - {client.account_number for client in clients}
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Unknown account numbers: {', '.join(sorted(missing))}"))
+
+        try:
+            plan = plan_technician_route(
+                technician, clients, time_budget=options['time_budget'], return_to_start=not options['no_return'],
+            )
+        except (ValueError, GoogleApiQuotaExceeded) as e:
+            raise CommandError(str(e))
+
+        for leg in plan['legs']:
+            self.stdout.write(f"{leg['from']:>12} -> {leg['to']:<12} {leg['duration_seconds'] / 60:6.1f} min {leg['distance_meters'] / 1000:7.1f} km")
+        if plan['unrouted']:
+            self.stdout.write(self.style.WARNING(f"Not routed (no geocoded address): {', '.join(plan['unrouted'])}"))
+        if plan['estimated_pairs']:
+            self.stdout.write(self.style.WARNING(f"{plan['estimated_pairs']} pairs had no route and use a straight-line estimate."))
+
+        saved = plan['initial_duration_seconds'] - plan['duration_seconds']
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(plan['stops'])} stops, {plan['duration_seconds'] / 60:.0f} min, {plan['distance_meters'] / 1000:.1f} km "
+            f"({saved / 60:.0f} min saved over nearest neighbour, solved in {plan['solve_cpu_seconds']}s CPU)."
+        ))
+        if plan['cost']:
+            self.stdout.write(self.style.SUCCESS(f"Estimated cost: {plan['cost']['total_cost']:.2f} $"))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0012_hot_query_indexes'),
+        ('employees', '0002_employeeprofile_address_status'),
+        ('organization', '0004_territory_boundary_geojson'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['role', 'user'], name='employee_role_user_idx'),
+        ),
+        # Employee lists sort by the user's name; auth_user belongs to django.contrib.auth, so its
+        # index is created here.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS employees_auth_user_name_idx ON auth_user (first_name, last_name)',
+            'DROP INDEX IF EXISTS employees_auth_user_name_idx',
+        ),
+    ]
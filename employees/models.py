@@ -48,6 +48,12 @@ class EmployeeProfile(models.Model):
         related_name='employee_profiles'
     )
 
+    class Meta:
+        indexes = [
+            # Per-role employee lists and supervisor pickers.
+            models.Index(fields=['role', 'user'], name='employee_role_user_idx'),
+        ]
+
     def __str__(self):
         full_name = self.user.get_full_name()
         return f"{full_name or self.user.username} ({self.get_role_display()})"
@@ -20,4 +20,5 @@ urlpatterns = [
     # API endpoints
     path('api/update-field/', views.update_employee_field_api, name='update_employee_field_api'),
     path('api/search-filter/', views.employee_search_and_filter_api, name='employee_search_filter_api'),
+    path('api/route-plan/', views.route_plan_api, name='route_plan_api'),
 ]
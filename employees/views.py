@@ -17,13 +17,14 @@ from .forms import TerritoryAssignmentForm
 from client.forms import CsvUploadForm # Corrected import
 from .utils import create_employee
 from address.forms import AddressSearchForm
-
-# --- Permissions --- 
-def is_admin_or_director(user):
-    return user.is_superuser or user.groups.filter(name='Directors').exists()
+from users.permissions import admin_or_director_required
+from client.models import Client
+from services.route_optimizer_service import plan_technician_route, DEFAULT_TIME_BUDGET_SECONDS, MAX_STOPS
+from core.api_usage import GoogleApiQuotaExceeded
+from Hobart.db_routers import ReplicaReadMixin, use_replica
 
 # --- Generic Employee List View --- #
-class BaseEmployeeListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class BaseEmployeeListView(LoginRequiredMixin, UserPassesTestMixin, ReplicaReadMixin, ListView):
     model = EmployeeProfile
     template_name = 'employees/employee_list_generic.html'
     context_object_name = 'object_list'
@@ -36,7 +37,7 @@ class BaseEmployeeListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def get_queryset(self):
         # Fetch related user and address in a single query
-        return EmployeeProfile.objects.filter(role=self.role).select_related('user', 'address').order_by('user__first_name')
+        return EmployeeProfile.objects.filter(role=self.role).select_related('user', 'address').defer('address__components').order_by('user__first_name')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -74,12 +75,12 @@ class TechnicianListView(BaseEmployeeListView):
     page_title = "Technician List"
 
 # --- Employee List View (All Employees) ---
-class EmployeeListView(ListView):
+class EmployeeListView(ReplicaReadMixin, ListView):
     model = EmployeeProfile
     template_name = 'employees/employee_list.html'
     context_object_name = 'employees'
     # Fetch related user and address in a single query
-    queryset = EmployeeProfile.objects.select_related('user', 'address').order_by('user__first_name', 'user__last_name')
+    queryset = EmployeeProfile.objects.select_related('user', 'address').defer('address__components').order_by('user__first_name', 'user__last_name')
 
 # --- Edit and Detail Views ---
 @login_required
@@ -127,7 +128,7 @@ class EmployeeDetailView(DetailView):
 
 # --- CSV Upload Views ---
 @login_required
-@user_passes_test(is_admin_or_director)
+@admin_or_director_required
 def upload_csv_view(request):
     form = CsvUploadForm(request.POST or None, request.FILES or None)
     if request.method == 'POST' and form.is_valid():
@@ -252,6 +253,7 @@ def process_employee_csv(file):
 
 # --- APIs for AJAX functionality ---
 @login_required
+@use_replica
 def employee_search_and_filter_api(request):
     query = request.GET.get('q', '')
     queryset = EmployeeProfile.objects.select_related('user').order_by('user__first_name', 'user__last_name')
@@ -289,3 +291,50 @@ def update_employee_field_api(request):
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
+
+@login_required
+@admin_or_director_required
+def route_plan_api(request):
+    """
+    POST {"technician": pk, "clients": [client pks] or "accounts": [account numbers],
+    "return_to_start": bool, "time_budget": seconds}. Returns the optimized visit order.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError
+        time_budget = min(float(data.get('time_budget', DEFAULT_TIME_BUDGET_SECONDS)), 5.0)
+    except (ValueError, TypeError):
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+
+    try:
+        technician_pk = int(data.get('technician'))
+        client_pks = [int(pk) for pk in data.get('clients') or []]
+    except (ValueError, TypeError):
+        return JsonResponse({'status': 'error', 'message': "'technician' and 'clients' must be ids."}, status=400)
+    accounts = data.get('accounts') or []
+    if not isinstance(accounts, list):
+        return JsonResponse({'status': 'error', 'message': "'accounts' must be a list."}, status=400)
+    if len(client_pks or accounts) > MAX_STOPS:
+        return JsonResponse({'status': 'error', 'message': f"A route plan takes at most {MAX_STOPS} clients."}, status=400)
+
+    technician = get_object_or_404(EmployeeProfile.objects.select_related('address', 'user'), pk=technician_pk)
+    clients = Client.objects.select_related('address')
+    if client_pks:
+        clients = clients.filter(pk__in=client_pks)
+    elif accounts:
+        clients = clients.filter(account_number__in=[str(account) for account in accounts])
+    else:
+        return JsonResponse({'status': 'error', 'message': "Provide 'clients' or 'accounts'."}, status=400)
+
+    try:
+        plan = plan_technician_route(
+            technician, list(clients), time_budget=time_budget, return_to_start=data.get('return_to_start', True),
+        )
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except GoogleApiQuotaExceeded as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=429)
+    return JsonResponse({'status': 'success', 'plan': plan})
@@ -1,37 +1,29 @@
 #!/bin/sh
 
-# --- TEMPORARY AGGRESSIVE DEBUG STEP ---
-# This will run `manage.py check` and capture its output to a file,
-# then print that file to stderr, and exit.
-# This is to force a traceback into Cloud Run logs.
-
-DEBUG_LOG_FILE="/tmp/django_debug_output.log"
-
-echo "--- DEBUG: Running manage.py check ---" >&2
-python manage.py check --settings=Hobart.settings.postgres > "$DEBUG_LOG_FILE" 2>&1
-CHECK_EXIT_CODE=$?
-
-if [ $CHECK_EXIT_CODE -ne 0 ]; then
-  echo "--- DEBUG: manage.py check FAILED! Output below: ---" >&2
-  cat "$DEBUG_LOG_FILE" >&2
-  echo "--- DEBUG: manage.py check FAILED! (End of output) ---" >&2
-  exit 1
+# System checks and migrations only run when this image's migration files differ from the
+# ones the database was last prepared for (see core/management/commands/boot.py).
+# Set BOOT_FORCE=1 to run them regardless.
+echo "Preparing the database..." >&2
+if [ "$BOOT_FORCE" = "1" ]; then
+  python manage.py boot --force >&2
 else
-  echo "--- DEBUG: manage.py check PASSED. Proceeding to migrations. ---" >&2
+  python manage.py boot >&2
 fi
-
-# --- END TEMPORARY AGGRESSIVE DEBUG STEP ---
-
-# Apply database migrations
-echo "Applying database migrations..." >&2
-python manage.py migrate >&2
-# Check if migrate command was successful
 if [ $? -ne 0 ]; then
-  echo "Database migrations failed! Exiting." >&2
+  echo "Boot checks or database migrations failed! Exiting." >&2
   exit 1
 fi
 
 # Start Gunicorn server
-echo "Starting Gunicorn..." >&2
+# SERVER_MODE=asgi runs the ASGI application on uvicorn workers, so the async address APIs can
+# keep many Google lookups in flight per process instead of holding a sync worker each.
+WEB_CONCURRENCY="${WEB_CONCURRENCY:-2}"
+# --preload imports the application (and its URLconf) once in the master before forking.
 # Use exec to ensure signals are properly handled and logs are forwarded
-exec gunicorn --bind :8080 --workers 2 Hobart.wsgi:application
+if [ "$SERVER_MODE" = "asgi" ]; then
+  echo "Starting Gunicorn with uvicorn workers (ASGI)..." >&2
+  exec gunicorn --bind :8080 --workers "$WEB_CONCURRENCY" --preload --worker-class uvicorn_worker.UvicornWorker Hobart.asgi:application
+else
+  echo "Starting Gunicorn..." >&2
+  exec gunicorn --bind :8080 --workers "$WEB_CONCURRENCY" --preload Hobart.wsgi:application
+fi
@@ -0,0 +1,78 @@
+import csv
+import io
+from django.db import transaction
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iter_csv_rows(file, encoding='utf-8-sig', delimiter=','):
+    """
+    Streams the rows of an uploaded CSV file without decoding the whole upload into memory.
+    """
+    text_stream = io.TextIOWrapper(file, encoding=encoding, newline='')
+    try:
+        yield from csv.reader(text_stream, delimiter=delimiter)
+    finally:
+        # Detach so the wrapper does not close the underlying upload when it is garbage collected.
+        text_stream.detach()
+
+
+def bulk_upsert_by_code(model, rows, update_fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Inserts or updates rows of `model` keyed on its unique `code` field.
+
+    `rows` is an iterable of dicts holding 'code' and every field in `update_fields`; it is
+    consumed lazily, so a generator that validates as it parses keeps memory flat. Existing
+    rows are loaded once and diffed so that unchanged rows are never written, and changes are
+    flushed with one `bulk_create(update_conflicts=True)` statement per chunk.
+
+    The whole upload runs in a single transaction: a ValueError raised by `rows` half way
+    through the file rolls back every chunk already written.
+
+    Returns a dictionary with the inserted, updated and unchanged counts.
+    """
+    update_fields = list(update_fields)
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    with transaction.atomic():
+        existing = {
+            values[0]: values[1:]
+            for values in model.objects.values_list('code', *update_fields).iterator()
+        }
+
+        pending = {}
+        for row in rows:
+            code = row['code']
+            values = tuple(row[field] for field in update_fields)
+
+            current = existing.get(code)
+            if current == values:
+                counts['unchanged'] += 1
+                continue
+
+            # A code repeated within one chunk would make the upsert touch the same row twice.
+            if code in pending:
+                _flush_upsert_chunk(model, pending, update_fields)
+
+            counts['inserted' if current is None else 'updated'] += 1
+            existing[code] = values
+            pending[code] = row
+
+            if len(pending) >= chunk_size:
+                _flush_upsert_chunk(model, pending, update_fields)
+
+        _flush_upsert_chunk(model, pending, update_fields)
+
+    return counts
+
+
+def _flush_upsert_chunk(model, pending, update_fields):
+    if not pending:
+        return
+    model.objects.bulk_create(
+        [model(**row) for row in pending.values()],
+        update_conflicts=True,
+        unique_fields=['code'],
+        update_fields=update_fields,
+    )
+    pending.clear()
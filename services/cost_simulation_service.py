@@ -0,0 +1,179 @@
+"""
+What-if repricing of the whole fleet. The cost of a trip is linear in the TravelCostParameters
+(minutes, km, and two fixed charges), so the materialized trips (ClientCostToServe) are reduced
+once per process to per-group sums of those four features; pricing any number of scenarios is
+then a small matrix product, whatever the number of trips. Quantiles need per-trip costs and are
+taken from a fixed uniform sample. Nothing is saved and no API is called.
+"""
+import math
+import threading
+import numpy as np
+from django.db.models import Count, Max
+from client.models import ClientCostToServe, ClientGroup
+from core.reference_data import get_latest_travel_cost_parameters
+from core.version_stamps import COST_SIMULATION_GROUPINGS, get_version
+from organization.models import Territory
+
+PARAMETER_FIELDS = ('cost_per_minute', 'cost_per_km', 'truck_depreciation_fixed_cost', 'supply_charge_fixed_cost')
+GROUPINGS = ('territory', 'client_group')
+MAX_SCENARIOS = 20
+QUANTILES = (0.5, 0.9, 0.99)
+# Trips kept for the quantiles; exact below this many trips, within a fraction of a percent above.
+QUANTILE_SAMPLE_SIZE = 50000
+
+_lock = threading.Lock()
+_trips = {'version': None, 'arrays': None}
+
+
+# --- Trip Arrays ---
+def _table_version():
+    """
+    Changes whenever a row is added, removed or recomputed (refreshes stamp computed_at), or a
+    client may have moved to another territory or group: the groupings come from the Client rows,
+    which a cost refresh does not touch (address.signals bumps that stamp).
+    """
+    stats = ClientCostToServe.objects.aggregate(count=Count('pk'), latest=Max('computed_at'))
+    return stats['count'], stats['latest'], get_version(COST_SIMULATION_GROUPINGS)
+
+
+def _reduce(features, territories, client_groups):
+    """Per-group feature sums for each grouping, plus the quantile sample."""
+    groupings = {}
+    for grouping, ids in (('territory', territories), ('client_group', client_groups)):
+        group_ids, inverse = np.unique(ids, return_inverse=True)
+        sums = np.column_stack([
+            np.bincount(inverse, weights=features[:, column], minlength=len(group_ids)) for column in range(features.shape[1])
+        ]) if len(ids) else np.zeros((0, features.shape[1]))
+        groupings[grouping] = (group_ids, np.bincount(inverse, minlength=len(group_ids)), sums)
+
+    sample = features
+    if len(features) > QUANTILE_SAMPLE_SIZE:
+        sample = features[np.random.default_rng(0).choice(len(features), QUANTILE_SAMPLE_SIZE, replace=False)]
+    return {
+        'trips': len(features),
+        'feature_sums': features.sum(axis=0),
+        'groupings': groupings,
+        'sample': np.ascontiguousarray(sample.T),
+    }
+
+
+def load_trip_arrays(force=False):
+    """
+    Returns the reduced trips: 'trips', 'feature_sums' (the four features summed, in
+    PARAMETER_FIELDS order: minutes, km, 1, 1), 'groupings' {grouping: (group ids, counts,
+    G x 4 feature sums)} with -1 for an unset group, and 'sample' (4 x M features).
+    Cached per process until the table changes.
+    """
+    version = _table_version()
+    with _lock:
+        if not force and _trips['version'] == version:
+            return _trips['arrays']
+
+    rows = ClientCostToServe.objects.values_list(
+        'duration_seconds', 'distance_meters', 'client__territory_id', 'client__client_group_id',
+    )
+    count = version[0]
+    durations = np.empty(count)
+    distances = np.empty(count)
+    territories = np.empty(count, dtype=np.int64)
+    groups = np.empty(count, dtype=np.int64)
+    size = 0
+    for size, (duration, distance, territory_id, group_id) in enumerate(rows.iterator(chunk_size=10000), start=1):
+        if size > count:
+            # Rows added since the version was read; they are picked up on the next load.
+            size = count
+            break
+        durations[size - 1] = duration
+        distances[size - 1] = distance
+        territories[size - 1] = territory_id if territory_id is not None else -1
+        groups[size - 1] = group_id if group_id is not None else -1
+
+    features = np.column_stack((durations[:size] / 60, distances[:size] / 1000, np.ones(size), np.ones(size)))
+    arrays = _reduce(features, territories[:size], groups[:size])
+    with _lock:
+        _trips['version'], _trips['arrays'] = version, arrays
+    return arrays
+
+
+# --- Scenarios ---
+def _parameter_row(source, defaults=None):
+    values = []
+    for field in PARAMETER_FIELDS:
+        value = source.get(field) if isinstance(source, dict) else getattr(source, field)
+        if value is None and defaults is not None:
+            value = defaults[PARAMETER_FIELDS.index(field)]
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"'{field}' must be a finite number.")
+        if value < 0:
+            raise ValueError(f"'{field}' must not be negative.")
+        values.append(value)
+    return values
+
+
+def _group_labels(grouping, ids):
+    ids = [int(i) for i in ids if i >= 0]
+    if grouping == 'territory':
+        names = {territory.pk: str(territory) for territory in Territory.objects.filter(pk__in=ids)}
+    else:
+        names = dict(ClientGroup.objects.filter(pk__in=ids).values_list('pk', 'name'))
+    names[-1] = '(none)'
+    return names
+
+
+def simulate_costs(scenarios, group_by='territory'):
+    """
+    Prices every materialized trip under the current parameters and each candidate scenario
+    (dicts with PARAMETER_FIELDS and an optional 'name'; missing fields default to the current
+    values). Returns fleet totals, quantiles and per-group totals, each with its delta to current.
+    Raises ValueError for malformed scenarios or groupings.
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}.")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"At most {MAX_SCENARIOS} scenarios can be compared at once.")
+    current = get_latest_travel_cost_parameters()
+    if current is None:
+        raise ValueError("Travel cost parameters not configured.")
+
+    baseline = _parameter_row(current)
+    names = ['current'] + [str(scenario.get('name') or f'scenario {index}') for index, scenario in enumerate(scenarios, start=1)]
+    parameters = np.array([baseline] + [_parameter_row(scenario, baseline) for scenario in scenarios])
+
+    arrays = load_trip_arrays()
+    trips = arrays['trips']
+    totals = parameters @ arrays['feature_sums']
+    group_ids, counts, feature_sums = arrays['groupings'][group_by]
+    # G groups x S scenarios.
+    group_totals = feature_sums @ parameters.T
+    labels = _group_labels(group_by, group_ids)
+
+    sample_costs = parameters @ arrays['sample']
+    sample_size = sample_costs.shape[1]
+    if sample_size:
+        positions = [min(sample_size - 1, int(q * (sample_size - 1))) for q in QUANTILES]
+        quantiles = np.partition(sample_costs, positions, axis=1)[:, positions].T
+    else:
+        quantiles = np.zeros((len(QUANTILES), len(names)))
+
+    results = []
+    for column, name in enumerate(names):
+        results.append({
+            'name': name,
+            'parameters': dict(zip(PARAMETER_FIELDS, parameters[column].tolist())),
+            'total_cost': round(float(totals[column]), 2),
+            'delta': round(float(totals[column] - totals[0]), 2),
+            'mean_cost': round(float(totals[column] / trips), 2) if trips else None,
+            'quantiles_sampled': sample_size < trips,
+            'quantiles': {f'p{int(q * 100)}': round(float(quantiles[row, column]), 2) for row, q in enumerate(QUANTILES)},
+            'groups': [
+                {
+                    'group': labels.get(int(group_id), str(group_id)),
+                    'clients': int(counts[row]),
+                    'total_cost': round(float(group_totals[row, column]), 2),
+                    'delta': round(float(group_totals[row, column] - group_totals[row, 0]), 2),
+                }
+                for row, group_id in enumerate(group_ids)
+            ],
+        })
+    return {'trips': trips, 'group_by': group_by, 'scenarios': results}
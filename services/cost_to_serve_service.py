@@ -0,0 +1,151 @@
+"""
+Maintains the ClientCostToServe table: for every geocoded client, the nearest technician (by
+driving time from their home), the trip's duration and distance, and its cost under the latest
+TravelCostParameters. A refresh only reroutes clients whose address or technician roster changed;
+when only the parameters changed the stored figures are repriced without any API call.
+"""
+import hashlib
+import numpy as np
+from django.utils import timezone
+from address.geo import haversine_km_matrix
+from client.models import Client, ClientCostToServe
+from core.reference_data import get_latest_travel_cost_parameters
+from employees.models import EmployeeProfile
+from services.travel_cost_service import price_travel
+from services.travel_time_service import get_travel_times
+
+# Technicians whose driving time is checked per client, picked by great-circle distance.
+CANDIDATE_TECHNICIANS = 3
+DEFAULT_BATCH_SIZE = 500
+
+_FIGURE_FIELDS = [
+    'technician', 'client_address', 'technicians_signature', 'parameters',
+    'duration_seconds', 'distance_meters', 'total_cost', 'is_estimate', 'computed_at',
+]
+
+
+def technicians_signature(technicians):
+    """Digest of the technicians and their home addresses; any hire, departure or move changes it."""
+    roster = ','.join(f'{technician.pk}:{technician.address_id}' for technician in sorted(technicians, key=lambda t: t.pk))
+    return hashlib.sha1(roster.encode('ascii')).hexdigest()
+
+
+def _routable_technicians():
+    return list(
+        EmployeeProfile.objects.filter(
+            role=EmployeeProfile.Role.TECHNICIAN, address__latitude__isnull=False, address__longitude__isnull=False,
+        ).select_related('address')
+    )
+
+
+def _nearest_technicians(clients, technicians, technician_lats, technician_lngs, candidates):
+    """Indices of the `candidates` closest technicians (great-circle) for each client."""
+    distances = haversine_km_matrix(
+        [client.address.latitude for client in clients], [client.address.longitude for client in clients],
+        technician_lats, technician_lngs,
+    )
+    if candidates >= len(technicians):
+        return np.argsort(distances, axis=1)
+    nearest = np.argpartition(distances, candidates - 1, axis=1)[:, :candidates]
+    return np.take_along_axis(nearest, np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1), axis=1)
+
+
+def _route_batch(clients, technicians, technician_lats, technician_lngs, signature, params, candidates, gmaps_client):
+    """Builds fresh ClientCostToServe rows for a batch of clients, looking up travel times in one go."""
+    nearest = _nearest_technicians(clients, technicians, technician_lats, technician_lngs, candidates)
+    pairs = [
+        (technicians[index].address, client.address)
+        for client, indices in zip(clients, nearest) for index in indices
+    ]
+    travel_times = get_travel_times(pairs, gmaps_client=gmaps_client)
+
+    now = timezone.now()
+    rows = []
+    for client, indices in zip(clients, nearest):
+        options = []
+        for index in indices:
+            technician = technicians[index]
+            travel = travel_times.get((technician.address_id, client.address_id))
+            if technician.address_id == client.address_id:
+                travel = (0, 0, False)
+            if travel:
+                options.append((travel[0], travel[1], travel[2], technician))
+        if not options:
+            continue
+        duration, distance, is_estimate, technician = min(options, key=lambda option: (option[2], option[0]))
+        rows.append(ClientCostToServe(
+            client=client, technician=technician, client_address_id=client.address_id,
+            technicians_signature=signature, parameters=params,
+            duration_seconds=duration, distance_meters=distance,
+            total_cost=price_travel(duration, distance, params)['total_cost'],
+            is_estimate=is_estimate, computed_at=now,
+        ))
+    return rows
+
+
+def refresh_cost_to_serve(full=False, batch_size=DEFAULT_BATCH_SIZE, candidates=CANDIDATE_TECHNICIANS, gmaps_client=None):
+    """
+    Brings ClientCostToServe up to date and returns counts of what was done. `full` reroutes every
+    client regardless of what changed. Raises ValueError when there are no cost parameters or no
+    technician with a geocoded home.
+    """
+    params = get_latest_travel_cost_parameters()
+    if params is None:
+        raise ValueError("Travel cost parameters not configured.")
+    technicians = _routable_technicians()
+    if not technicians:
+        raise ValueError("No technician has a geocoded home address.")
+    signature = technicians_signature(technicians)
+    technician_lats = [technician.address.latitude for technician in technicians]
+    technician_lngs = [technician.address.longitude for technician in technicians]
+
+    stats = {'routed': 0, 'repriced': 0, 'unchanged': 0, 'estimated': 0, 'unroutable': 0}
+    stats['removed'], _ = ClientCostToServe.objects.filter(client__address__latitude__isnull=True).delete()
+
+    clients = (
+        Client.objects.filter(address__latitude__isnull=False, address__longitude__isnull=False)
+        .select_related('address', 'cost_to_serve')
+        .defer('address__components')
+        .order_by('pk')
+    )
+    batch = []
+
+    def flush():
+        to_route, to_reprice = [], []
+        for client in batch:
+            try:
+                row = client.cost_to_serve
+            except ClientCostToServe.DoesNotExist:
+                row = None
+            if full or row is None or row.client_address_id != client.address_id or row.technicians_signature != signature:
+                to_route.append(client)
+            elif row.parameters_id != params.pk:
+                to_reprice.append(row)
+            else:
+                stats['unchanged'] += 1
+
+        if to_route:
+            rows = _route_batch(to_route, technicians, technician_lats, technician_lngs, signature, params, candidates, gmaps_client)
+            ClientCostToServe.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['client'], update_fields=_FIGURE_FIELDS,
+            )
+            stats['routed'] += len(rows)
+            stats['estimated'] += sum(row.is_estimate for row in rows)
+            stats['unroutable'] += len(to_route) - len(rows)
+
+        if to_reprice:
+            now = timezone.now()
+            for row in to_reprice:
+                row.total_cost = price_travel(row.duration_seconds, row.distance_meters, params)['total_cost']
+                row.parameters = params
+                row.computed_at = now
+            ClientCostToServe.objects.bulk_update(to_reprice, ['total_cost', 'parameters', 'computed_at'])
+            stats['repriced'] += len(to_reprice)
+        batch.clear()
+
+    for client in clients.iterator(chunk_size=batch_size):
+        batch.append(client)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return stats
@@ -0,0 +1,110 @@
+"""
+Coverage gaps: how far geocoded clients are from the nearest technician's home, by map cell.
+Clients are binned into a grid of roughly `cell_km` square cells and the great-circle distance
+from every client to every technician is taken in vectorized blocks, so the whole client base
+is covered in seconds without pricing a single trip. A cell is flagged when its clients are on
+average further than `threshold_km` from their nearest technician.
+"""
+import math
+import numpy as np
+from address.geo import KM_PER_DEGREE_LATITUDE, haversine_km_matrix
+from client.models import Client
+from employees.models import EmployeeProfile
+from services.travel_time_service import FALLBACK_SPEED_KMH, ROAD_DISTANCE_FACTOR
+
+DEFAULT_CELL_KM = 5.0
+DEFAULT_THRESHOLD_KM = 60.0
+# Clients per block of the client x technician distance matrix.
+DISTANCE_BLOCK = 20000
+
+
+def _geocoded_clients():
+    rows = np.array(list(
+        Client.objects.filter(address__latitude__isnull=False, address__longitude__isnull=False)
+        .values_list('address__latitude', 'address__longitude')
+    ), dtype=float)
+    return rows.reshape(-1, 2)
+
+
+def _technicians():
+    technicians = list(
+        EmployeeProfile.objects.filter(
+            role=EmployeeProfile.Role.TECHNICIAN, address__latitude__isnull=False, address__longitude__isnull=False,
+        ).select_related('user', 'address').order_by('pk')
+    )
+    coordinates = np.array([(t.address.latitude, t.address.longitude) for t in technicians], dtype=float).reshape(-1, 2)
+    return technicians, coordinates
+
+
+def _nearest_km(points, technician_coordinates):
+    """Distance from each point to its nearest technician, and that technician's index."""
+    distances = np.empty(len(points))
+    nearest = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), DISTANCE_BLOCK):
+        block = points[start:start + DISTANCE_BLOCK]
+        matrix = haversine_km_matrix(block[:, 0], block[:, 1], technician_coordinates[:, 0], technician_coordinates[:, 1])
+        nearest[start:start + len(block)] = matrix.argmin(axis=1)
+        distances[start:start + len(block)] = matrix[np.arange(len(block)), nearest[start:start + len(block)]]
+    return distances, nearest
+
+
+def _estimated_minutes(km):
+    return km * ROAD_DISTANCE_FACTOR / FALLBACK_SPEED_KMH * 60
+
+
+def coverage_grid(cell_km=DEFAULT_CELL_KM, threshold_km=DEFAULT_THRESHOLD_KM):
+    """
+    Returns {'cell_km', 'threshold_km', 'clients', 'technicians', 'flagged_cells', 'flagged_clients',
+    'cells': [...]}, each cell with its bounds, client centroid, client count, mean and max distance
+    to the nearest technician, the technician nearest its centroid, an estimated driving time
+    (great-circle distance stretched to a road distance at the fallback speed) and 'flagged'.
+    Cells come worst first. Raises ValueError for a non-positive or non-finite size or threshold,
+    or when no technician has a geocoded home.
+    """
+    if not (math.isfinite(cell_km) and math.isfinite(threshold_km)) or cell_km <= 0 or threshold_km <= 0:
+        raise ValueError("The cell size and the threshold must be positive, finite numbers.")
+    technicians, technician_coordinates = _technicians()
+    if not technicians:
+        raise ValueError("No technician has a geocoded home address.")
+    points = _geocoded_clients()
+    result = {
+        'cell_km': cell_km, 'threshold_km': threshold_km, 'clients': len(points), 'technicians': len(technicians),
+        'flagged_cells': 0, 'flagged_clients': 0, 'cells': [],
+    }
+    if not len(points):
+        return result
+
+    # One longitude step for the whole grid, taken at the clients' mean latitude: cells stay
+    # comparable across a province-sized area and an index maps back to its bounds.
+    lat_step = cell_km / KM_PER_DEGREE_LATITUDE
+    lng_step = cell_km / (KM_PER_DEGREE_LATITUDE * max(np.cos(np.radians(points[:, 0].mean())), 0.01))
+    cells = np.floor(points / (lat_step, lng_step)).astype(np.int64)
+    keys, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+
+    distances, _ = _nearest_km(points, technician_coordinates)
+    mean_km = np.bincount(inverse, weights=distances) / counts
+    max_km = np.zeros(len(keys))
+    np.maximum.at(max_km, inverse, distances)
+    centroids = np.column_stack([
+        np.bincount(inverse, weights=points[:, 0]) / counts, np.bincount(inverse, weights=points[:, 1]) / counts,
+    ])
+    _, centroid_technicians = _nearest_km(centroids, technician_coordinates)
+    flagged = mean_km > threshold_km
+
+    result['flagged_cells'] = int(flagged.sum())
+    result['flagged_clients'] = int(counts[flagged].sum())
+    for index in np.lexsort((-counts, -mean_km)):
+        technician = technicians[centroid_technicians[index]]
+        result['cells'].append({
+            'south': float(keys[index, 0] * lat_step), 'west': float(keys[index, 1] * lng_step),
+            'north': float((keys[index, 0] + 1) * lat_step), 'east': float((keys[index, 1] + 1) * lng_step),
+            'lat': round(float(centroids[index, 0]), 6), 'lng': round(float(centroids[index, 1]), 6),
+            'clients': int(counts[index]),
+            'mean_km': round(float(mean_km[index]), 1),
+            'max_km': round(float(max_km[index]), 1),
+            'estimated_minutes': round(float(_estimated_minutes(mean_km[index]))),
+            'technician': {'id': technician.pk, 'name': technician.user.get_full_name() or technician.user.username},
+            'flagged': bool(flagged[index]),
+        })
+    return result
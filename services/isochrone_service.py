@@ -0,0 +1,116 @@
+"""
+Drive-time isochrones: the geocoded clients within a driving-time threshold of an Address (a
+technician's home, typically). Clients further than the threshold at MAX_SPEED_KMH are ruled out
+by great-circle distance; the others are priced with services.travel_time_service, which reads
+the TravelTime cache and batches the missing pairs into Routes API matrix requests.
+
+Results are cached per origin and threshold under a database version stamp that Address and
+Client saves and deletes bump (address.signals), as do bulk relinks (geocode_legacy_addresses), in
+any process, so a moved or re-geocoded client is never answered from a stale result.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from address.geo import bounding_box, haversine_km_matrix
+from address.models import Address
+from client.models import Client
+from core.version_stamps import ISOCHRONES, get_version
+from services.travel_time_service import get_travel_times
+
+CACHE_SECONDS = getattr(settings, 'ISOCHRONE_CACHE_SECONDS', 24 * 3600)
+# Results holding great-circle estimates (an API error, or a pair without a route) are kept briefly.
+ESTIMATED_CACHE_SECONDS = 300
+# No trip averages more than this, so nothing further than minutes x speed can be reached in time.
+MAX_SPEED_KMH = getattr(settings, 'ISOCHRONE_MAX_SPEED_KMH', 110)
+MAX_MINUTES = 240
+# Client addresses priced per query at most, nearest first; bounds the API cost of one query.
+MAX_CANDIDATES = getattr(settings, 'ISOCHRONE_MAX_CANDIDATES', 1000)
+
+
+# --- Queries ---
+def _candidates(origin, max_minutes):
+    """
+    Client addresses within reach by great-circle distance, nearest first:
+    returns ({address_id: [clients]}, [addresses], truncated).
+    """
+    import numpy as np  # Kept out of the module imports, which the signal handlers load.
+    radius_km = max_minutes / 60 * MAX_SPEED_KMH
+    min_lat, max_lat, min_lng, max_lng = bounding_box(origin.latitude, origin.longitude, radius_km)
+    clients = list(
+        Client.objects.filter(
+            address__latitude__range=(min_lat, max_lat), address__longitude__range=(min_lng, max_lng),
+        ).select_related('address').only(
+            'name', 'account_number', 'address__latitude', 'address__longitude', 'address__place_id', 'address__precision',
+        )
+    )
+    by_address = {}
+    for client in clients:
+        by_address.setdefault(client.address_id, []).append(client)
+    addresses = [address_clients[0].address for address_clients in by_address.values()]
+    if not addresses:
+        return by_address, [], False
+
+    distances = haversine_km_matrix(
+        [origin.latitude], [origin.longitude],
+        [address.latitude for address in addresses], [address.longitude for address in addresses],
+    )[0]
+    order = [index for index in np.argsort(distances, kind='stable') if distances[index] <= radius_km]
+    return by_address, [addresses[index] for index in order[:MAX_CANDIDATES]], len(order) > MAX_CANDIDATES
+
+
+def _compute(origin, max_minutes, gmaps_client):
+    by_address, addresses, truncated = _candidates(origin, max_minutes)
+    travel_times = get_travel_times([(origin, address) for address in addresses], gmaps_client=gmaps_client)
+
+    reached = []
+    estimated = 0
+    for address in addresses:
+        travel = (0, 0, False) if address.pk == origin.pk else travel_times.get((origin.pk, address.pk))
+        if travel is None or travel[0] > max_minutes * 60:
+            continue
+        duration, distance, is_estimate = travel
+        estimated += is_estimate
+        for client in by_address[address.pk]:
+            reached.append({
+                'id': client.pk,
+                'name': client.name,
+                'account_number': client.account_number,
+                'lat': float(address.latitude),
+                'lng': float(address.longitude),
+                'approximate': address.precision == Address.Precision.FSA_CENTROID,
+                'duration_seconds': duration,
+                'distance_meters': distance,
+                'is_estimate': is_estimate,
+            })
+    reached.sort(key=lambda client: (client['duration_seconds'], client['name']))
+    return {
+        'origin': {'address_id': origin.pk, 'lat': float(origin.latitude), 'lng': float(origin.longitude)},
+        'max_minutes': max_minutes,
+        'candidates': len(addresses),
+        'truncated': truncated,
+        'estimated': estimated,
+        'clients': reached,
+    }
+
+
+def clients_within(origin, max_minutes, gmaps_client=None, use_cache=True):
+    """
+    The clients reachable from the `origin` Address within `max_minutes` of driving, nearest first,
+    with each trip's duration and distance. 'truncated' is true when more than MAX_CANDIDATES
+    client addresses were in range (the furthest were not priced); 'estimated' counts the
+    addresses placed with a great-circle estimate. Raises ValueError for an origin without
+    coordinates or a threshold outside 1..MAX_MINUTES.
+    """
+    if origin is None or origin.latitude is None or origin.longitude is None:
+        raise ValueError("The origin has no geocoded address.")
+    max_minutes = int(max_minutes)
+    if not 1 <= max_minutes <= MAX_MINUTES:
+        raise ValueError(f"The threshold must be between 1 and {MAX_MINUTES} minutes.")
+
+    key = f'isochrone:{get_version(ISOCHRONES)}:{origin.pk}:{max_minutes}'
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    result = _compute(origin, max_minutes, gmaps_client)
+    cache.set(key, result, ESTIMATED_CACHE_SECONDS if result['estimated'] else CACHE_SECONDS)
+    return result
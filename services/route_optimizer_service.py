@@ -0,0 +1,206 @@
+"""
+Daily route planning for technicians. The visit order is solved over an asymmetric duration matrix
+with nearest neighbour followed by 2-opt and Or-opt local search, until no move improves the route
+or the CPU time budget runs out. Node 0 is always the technician's home.
+"""
+import time
+from core.reference_data import get_latest_travel_cost_parameters
+from services.travel_time_service import get_travel_matrix
+from services.travel_cost_service import price_travel
+
+DEFAULT_TIME_BUDGET_SECONDS = 0.5
+# Stops per plan. The travel matrix grows with the square of the stops (100 stops: ~10k elements).
+MAX_STOPS = 100
+OR_OPT_MAX_SEGMENT = 3
+_EPSILON = 1e-9
+
+
+# --- Solver ---
+def route_duration(tour, durations):
+    return sum(durations[a][b] for a, b in zip(tour, tour[1:]))
+
+
+def nearest_neighbor_tour(durations, return_to_start=True):
+    """Greedy start: always drive to the closest unvisited stop."""
+    size = len(durations)
+    unvisited = set(range(1, size))
+    tour = [0]
+    while unvisited:
+        row = durations[tour[-1]]
+        nearest = min(unvisited, key=row.__getitem__)
+        unvisited.remove(nearest)
+        tour.append(nearest)
+    if return_to_start:
+        tour.append(0)
+    return tour
+
+
+def _prefix_sums(tour, durations):
+    """
+    forward[k] is the cost of tour[0..k] driven forwards, backward[k] the cost of the same edges
+    driven in reverse. They make the cost change of reversing any segment an O(1) lookup even
+    though the matrix is asymmetric.
+    """
+    forward = [0] * len(tour)
+    backward = [0] * len(tour)
+    for k in range(1, len(tour)):
+        a, b = tour[k - 1], tour[k]
+        forward[k] = forward[k - 1] + durations[a][b]
+        backward[k] = backward[k - 1] + durations[b][a]
+    return forward, backward
+
+
+def _two_opt(tour, durations, closed, deadline):
+    """Reverses segments tour[i..j] while that shortens the route. Returns True if anything changed."""
+    changed = False
+    size = len(tour)
+    last = size - 2 if closed else size - 1
+    improved = True
+    while improved and time.process_time() < deadline:
+        improved = False
+        forward, backward = _prefix_sums(tour, durations)
+        for i in range(1, last):
+            before = tour[i - 1]
+            d_before = durations[before]
+            j = i + 1
+            while j <= last:
+                first, end = tour[i], tour[j]
+                delta = d_before[end] - d_before[first] + (backward[j] - backward[i]) - (forward[j] - forward[i])
+                if j + 1 < size:
+                    after = tour[j + 1]
+                    delta += durations[first][after] - durations[end][after]
+                if delta < -_EPSILON:
+                    # Apply and keep scanning from the same i with fresh prefix sums.
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    forward, backward = _prefix_sums(tour, durations)
+                    improved = changed = True
+                    j = i + 1
+                    continue
+                j += 1
+            if time.process_time() >= deadline:
+                break
+    return changed
+
+
+def _or_opt(tour, durations, closed, deadline):
+    """
+    Moves segments of 1 to OR_OPT_MAX_SEGMENT stops (optionally reversed) to a better position.
+    Returns True if anything changed.
+    """
+    changed = False
+    improved = True
+    while improved and time.process_time() < deadline:
+        improved = False
+        size = len(tour)
+        last = size - 2 if closed else size - 1
+        forward, backward = _prefix_sums(tour, durations)
+        for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+            for i in range(1, last - length + 2):
+                j = i + length - 1
+                first, end = tour[i], tour[j]
+                before = tour[i - 1]
+                after = tour[j + 1] if j + 1 < size else None
+                removal = -durations[before][first]
+                if after is not None:
+                    removal += durations[before][after] - durations[end][after]
+                reversal = (backward[j] - backward[i]) - (forward[j] - forward[i])
+
+                best = (0.0, None, False)
+                for k in range(0, size - 1 if closed else size):
+                    if i - 1 <= k <= j:
+                        continue
+                    a = tour[k]
+                    b = tour[k + 1] if k + 1 < size else None
+                    if b is None:
+                        straight = durations[a][first]
+                        flipped = durations[a][end] + reversal
+                    else:
+                        d_ab = durations[a][b]
+                        straight = durations[a][first] + durations[end][b] - d_ab
+                        flipped = durations[a][end] + durations[first][b] - d_ab + reversal
+                    if removal + straight < best[0] - _EPSILON:
+                        best = (removal + straight, k, False)
+                    if length > 1 and removal + flipped < best[0] - _EPSILON:
+                        best = (removal + flipped, k, True)
+
+                if best[1] is not None:
+                    _, k, flip = best
+                    segment = tour[i:j + 1]
+                    if flip:
+                        segment.reverse()
+                    remaining = tour[:i] + tour[j + 1:]
+                    insert_at = k + 1 if k < i else k + 1 - length
+                    tour[:] = remaining[:insert_at] + segment + remaining[insert_at:]
+                    improved = changed = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+def solve_route(durations, time_budget=DEFAULT_TIME_BUDGET_SECONDS, return_to_start=True):
+    """
+    Returns the visit order (node indices, starting at 0 and ending at 0 when `return_to_start`)
+    for a square duration matrix. Local search stops at a local optimum or after `time_budget`
+    seconds of CPU time, whichever comes first.
+    """
+    tour = nearest_neighbor_tour(durations, return_to_start)
+    if len(durations) <= 3:
+        return tour
+    deadline = time.process_time() + time_budget
+    while time.process_time() < deadline:
+        _two_opt(tour, durations, return_to_start, deadline)
+        if not _or_opt(tour, durations, return_to_start, deadline):
+            break
+    return tour
+
+
+# --- Technician Routes ---
+def plan_technician_route(technician, clients, time_budget=DEFAULT_TIME_BUDGET_SECONDS, return_to_start=True, gmaps_client=None):
+    """
+    Plans the visit order of `clients` for a technician leaving from their home address.
+    Clients without a geocoded address are returned in 'unrouted'. Raises ValueError when the
+    technician has no geocoded home address or there are more than MAX_STOPS clients.
+    """
+    home = technician.address
+    if home is None or home.latitude is None:
+        raise ValueError(f"Technician {technician} has no geocoded home address.")
+    if len(clients) > MAX_STOPS:
+        raise ValueError(f"A route plan takes at most {MAX_STOPS} clients ({len(clients)} given).")
+
+    routable = [client for client in clients if client.address_id and client.address.latitude is not None]
+    unrouted = [client for client in clients if not (client.address_id and client.address.latitude is not None)]
+    addresses = [home] + [client.address for client in routable]
+    durations, distances, estimated = get_travel_matrix(addresses, gmaps_client=gmaps_client)
+
+    started = time.process_time()
+    tour = solve_route(durations, time_budget=time_budget, return_to_start=return_to_start)
+    solve_seconds = time.process_time() - started
+
+    legs = []
+    for a, b in zip(tour, tour[1:]):
+        legs.append({
+            'from': 'home' if a == 0 else routable[a - 1].account_number,
+            'to': 'home' if b == 0 else routable[b - 1].account_number,
+            'duration_seconds': durations[a][b],
+            'distance_meters': distances[a][b],
+        })
+    total_duration = sum(leg['duration_seconds'] for leg in legs)
+    total_distance = sum(leg['distance_meters'] for leg in legs)
+
+    params = get_latest_travel_cost_parameters()
+    return {
+        'technician': technician.code or technician.pk,
+        'stops': [
+            {'account_number': routable[node - 1].account_number, 'name': routable[node - 1].name, 'client_pk': routable[node - 1].pk}
+            for node in tour if node != 0
+        ],
+        'legs': legs,
+        'unrouted': [client.account_number for client in unrouted],
+        'duration_seconds': total_duration,
+        'distance_meters': total_distance,
+        'initial_duration_seconds': route_duration(nearest_neighbor_tour(durations, return_to_start), durations),
+        'estimated_pairs': estimated,
+        'solve_cpu_seconds': round(solve_seconds, 4),
+        'cost': price_travel(total_duration, total_distance, params, stops=len(routable)) if params else None,
+    }
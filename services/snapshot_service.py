@@ -0,0 +1,266 @@
+"""
+Columnar snapshots of the client, address, territory and employee tables for offline analysis.
+Every column is a plain .npy file, so `load_snapshot` memory-maps it instead of reading it:
+coordinates are float32 (NaN when missing), ids are int32 or int64 (-1 when null), and strings
+are dictionary-encoded as integer codes (-1 when null) into a sorted dictionary, stored as one
+UTF-8 blob plus offsets.
+
+Layout of a snapshot directory:
+    manifest.json                    tables, row counts, column kinds and dtypes
+    <table>/<column>.npy             numeric columns
+    <table>/<column>.codes.npy       string columns: codes into the dictionary
+    <table>/<column>.offsets.npy     string columns: dictionary entry boundaries in the blob
+    <table>/<column>.blob.npy        string columns: the dictionary's UTF-8 bytes
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+from django.utils import timezone
+from address.models import Address
+from client.models import Client, ClientGroup
+from employees.models import EmployeeProfile
+from organization.models import Territory
+
+FORMAT = 'hobart-snapshot'
+VERSION = 1
+LATEST_LINK = 'latest'
+CHUNK_SIZE = 20000
+
+
+# --- Table Definitions ---
+# (column name, queryset field, kind); kinds: 'id', 'int', 'float32', 'bool', 'string'.
+def _tables():
+    return {
+        'clients': (Client.objects.order_by('pk'), [
+            ('id', 'pk', 'id'),
+            ('account_number', 'account_number', 'string'),
+            ('name', 'name', 'string'),
+            ('postal_code', 'postal_code', 'string'),
+            ('address_id', 'address_id', 'id'),
+            ('address_status', 'address_status__name', 'string'),
+            ('client_group_id', 'client_group_id', 'id'),
+            ('territory_id', 'territory_id', 'id'),
+            ('technician_id', 'cost_to_serve__technician_id', 'id'),
+            ('duration_seconds', 'cost_to_serve__duration_seconds', 'float32'),
+            ('distance_meters', 'cost_to_serve__distance_meters', 'float32'),
+            ('cost_to_serve', 'cost_to_serve__total_cost', 'float32'),
+        ]),
+        'addresses': (Address.objects.order_by('pk'), [
+            ('id', 'pk', 'id'),
+            ('latitude', 'latitude', 'float32'),
+            ('longitude', 'longitude', 'float32'),
+            ('precision', 'precision', 'string'),
+            ('postal_code', 'components__postal_code', 'string'),
+            ('city', 'components__locality', 'string'),
+            ('province', 'components__administrative_area_level_1', 'string'),
+        ]),
+        'client_groups': (ClientGroup.objects.order_by('pk'), [
+            ('id', 'pk', 'id'),
+            ('code', 'code', 'string'),
+            ('name', 'name', 'string'),
+        ]),
+        'territories': (Territory.objects.order_by('pk'), [
+            ('id', 'pk', 'id'),
+            ('name', 'name', 'string'),
+            ('type', 'type', 'string'),
+        ]),
+        'territory_fsas': (Territory.fsas.through.objects.order_by('pk'), [
+            ('territory_id', 'territory_id', 'id'),
+            ('fsa', 'fsa__code', 'string'),
+        ]),
+        'employees': (EmployeeProfile.objects.order_by('pk'), [
+            ('id', 'pk', 'id'),
+            ('code', 'code', 'string'),
+            ('role', 'role', 'string'),
+            ('first_name', 'user__first_name', 'string'),
+            ('last_name', 'user__last_name', 'string'),
+            ('address_id', 'address_id', 'id'),
+            ('reports_to_id', 'reports_to_id', 'id'),
+        ]),
+        'employee_territories': (EmployeeProfile.territories.through.objects.order_by('pk'), [
+            ('employee_id', 'employeeprofile_id', 'id'),
+            ('territory_id', 'territory_id', 'id'),
+        ]),
+    }
+
+
+# --- Encoding ---
+def _smallest_signed(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _encode_ids(values):
+    array = np.fromiter((-1 if value is None else value for value in values), dtype=np.int64, count=len(values))
+    return {'': array.astype(np.int32 if not len(array) or array.max() <= np.iinfo(np.int32).max else np.int64)}
+
+
+def _encode_strings(values):
+    """Sorted dictionary of the distinct values plus one code per row (-1 for None)."""
+    dictionary = sorted({value for value in values if value is not None})
+    index = {value: position for position, value in enumerate(dictionary)}
+    codes = np.fromiter((-1 if value is None else index[value] for value in values), dtype=np.int64, count=len(values))
+    encoded = [value.encode('utf-8') for value in dictionary]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {
+        '.codes': codes.astype(_smallest_signed(max(len(dictionary), 1))),
+        '.offsets': offsets,
+        '.blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+    }
+
+
+def _encode(kind, values):
+    if kind == 'id':
+        return _encode_ids(values)
+    if kind == 'string':
+        return _encode_strings([None if value is None else str(value) for value in values])
+    if kind == 'float32':
+        return {'': np.array([np.nan if value is None else float(value) for value in values], dtype=np.float32)}
+    if kind == 'bool':
+        return {'': np.array(values, dtype=bool)}
+    return {'': np.array(values, dtype=np.int64)}
+
+
+# --- Writing ---
+def _write_table(directory, queryset, columns):
+    fields = [field for _, field, _ in columns]
+    values = [[] for _ in columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+        for position, value in enumerate(row):
+            values[position].append(value)
+
+    directory.mkdir()
+    described = {}
+    for (name, _, kind), column in zip(columns, values):
+        files = {}
+        for suffix, array in _encode(kind, column).items():
+            filename = f'{name}{suffix}.npy'
+            np.save(directory / filename, array, allow_pickle=False)
+            files[suffix.lstrip('.') or 'values'] = {'file': filename, 'dtype': array.dtype.str}
+        described[name] = {'kind': kind, 'files': files}
+    return {'rows': len(values[0]) if values else 0, 'columns': described}
+
+
+def write_snapshot(output_dir, keep=None):
+    """
+    Writes a new snapshot directory under `output_dir` and points `output_dir/latest` at it once
+    it is complete, so readers never see a partial snapshot. Keeps the `keep` most recent
+    snapshots when given. Returns (path, manifest).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    created_at = timezone.now()
+    name = f'snapshot-{created_at:%Y%m%dT%H%M%S}'
+    staging = output_dir / f'.{name}.tmp'
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+
+    try:
+        manifest = {'format': FORMAT, 'version': VERSION, 'created_at': created_at.isoformat(), 'tables': {}}
+        for table, (queryset, columns) in _tables().items():
+            manifest['tables'][table] = _write_table(staging / table, queryset, columns)
+        (staging / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+        final = output_dir / name
+        os.rename(staging, final)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    link = output_dir / LATEST_LINK
+    temporary_link = output_dir / f'.{LATEST_LINK}.tmp'
+    if temporary_link.is_symlink() or temporary_link.exists():
+        temporary_link.unlink()
+    temporary_link.symlink_to(name)
+    os.replace(temporary_link, link)
+
+    if keep:
+        snapshots = sorted(path for path in output_dir.glob('snapshot-*') if path.is_dir())
+        for old in snapshots[:-keep]:
+            shutil.rmtree(old)
+    return final, manifest
+
+
+# --- Loading ---
+class StringColumn:
+    """A dictionary-encoded string column: `codes` is memory-mapped, the dictionary decoded on first use."""
+
+    def __init__(self, codes, offsets, blob):
+        self.codes = codes
+        self._offsets = offsets
+        self._blob = blob
+        self._dictionary = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def dictionary(self):
+        """The distinct values, sorted; codes index into it."""
+        if self._dictionary is None:
+            blob = self._blob.tobytes()
+            offsets = self._offsets.tolist()
+            self._dictionary = np.array(
+                [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])], dtype=object,
+            )
+        return self._dictionary
+
+    def code_of(self, value):
+        """The code of `value`, or -1 when it does not occur (for vectorized filters: column.codes == code)."""
+        position = int(np.searchsorted(self.dictionary, value)) if len(self.dictionary) else 0
+        return position if position < len(self.dictionary) and self.dictionary[position] == value else -1
+
+    def decode(self):
+        """The column as an object array of str (None for nulls)."""
+        values = np.empty(len(self.codes), dtype=object)
+        present = self.codes >= 0
+        values[present] = self.dictionary[self.codes[present]]
+        return values
+
+
+class Snapshot:
+    """A loaded snapshot: `snapshot['clients']['latitude']` and so on, every array memory-mapped."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / 'manifest.json').read_text())
+        if self.manifest.get('format') != FORMAT or self.manifest.get('version') != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} {FORMAT}.")
+        self._tables = {}
+
+    @property
+    def created_at(self):
+        return self.manifest['created_at']
+
+    @property
+    def tables(self):
+        return list(self.manifest['tables'])
+
+    def __getitem__(self, table):
+        if table not in self._tables:
+            described = self.manifest['tables'][table]
+            columns = {}
+            for name, column in described['columns'].items():
+                arrays = {
+                    part: np.load(self.path / table / spec['file'], mmap_mode='r', allow_pickle=False)
+                    for part, spec in column['files'].items()
+                }
+                if column['kind'] == 'string':
+                    columns[name] = StringColumn(arrays['codes'], arrays['offsets'], arrays['blob'])
+                else:
+                    columns[name] = arrays['values']
+            self._tables[table] = columns
+        return self._tables[table]
+
+
+def load_snapshot(path):
+    """Maps a snapshot directory, or the latest snapshot when given the output directory."""
+    path = Path(path)
+    if not (path / 'manifest.json').exists() and (path / LATEST_LINK).exists():
+        path = (path / LATEST_LINK).resolve()
+    return Snapshot(path)
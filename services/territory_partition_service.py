@@ -0,0 +1,240 @@
+"""
+Workload-balanced partitioning of geocoded clients between managers. FSAs are the unit of
+assignment (that is how Territories are defined), weighted by their client count. A capacitated
+k-means seeded from each manager's current clients groups them into compact areas whose client
+counts stay within a tolerance of the average. The result is reported side by side with the
+current assignment, together with the FSA moves needed to get there.
+"""
+import math
+import numpy as np
+from address.fsa_geocoder import fsa_code
+from client.models import Client
+from core.reference_data import get_latest_travel_cost_parameters
+from employees.models import EmployeeProfile
+from services.travel_time_service import ROAD_DISTANCE_FACTOR, FALLBACK_SPEED_KMH
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_TOLERANCE = 0.10
+DEFAULT_MAX_ITERATIONS = 25
+
+
+# --- Loading ---
+def load_client_points(queryset=None):
+    """
+    Returns (fsa_codes, latitudes, longitudes) arrays for every geocoded client with a usable FSA,
+    plus the number of geocoded clients skipped for lack of one. The FSA comes from the legacy
+    postal code, or the standardized address when that is empty.
+    """
+    queryset = Client.objects.all() if queryset is None else queryset
+    rows = queryset.filter(address__latitude__isnull=False, address__longitude__isnull=False).values_list(
+        'address__latitude', 'address__longitude', 'postal_code', 'address__components__postal_code',
+    )
+    codes, latitudes, longitudes = [], [], []
+    skipped = 0
+    for latitude, longitude, legacy_postal_code, postal_code in rows.iterator(chunk_size=5000):
+        code = fsa_code(legacy_postal_code) or fsa_code(postal_code or '')
+        if not code:
+            skipped += 1
+            continue
+        codes.append(code)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+    return np.array(codes), np.array(latitudes, dtype=float), np.array(longitudes, dtype=float), skipped
+
+
+def load_manager_fsas(managers):
+    """Returns {fsa_code: manager index} from the managers' current Territories. The first manager wins on overlaps."""
+    owners = {}
+    for index, manager in enumerate(managers):
+        for code in manager.territories.values_list('fsas__code', flat=True):
+            if code:
+                owners.setdefault(code, index)
+    return owners
+
+
+# --- Geometry ---
+def _project(latitudes, longitudes, reference_latitude):
+    """Equirectangular projection to kilometres, accurate enough at the scale of a province."""
+    x = np.radians(longitudes) * math.cos(math.radians(reference_latitude)) * EARTH_RADIUS_KM
+    y = np.radians(latitudes) * EARTH_RADIUS_KM
+    return np.column_stack((x, y))
+
+
+def _pairwise_km(points, centers):
+    return np.sqrt(((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2))
+
+
+def _weighted_centers(points, weights, labels, k, previous):
+    totals = np.bincount(labels, weights=weights, minlength=k)
+    centers = previous.copy()
+    filled = totals > 0
+    for axis in range(2):
+        sums = np.bincount(labels, weights=weights * points[:, axis], minlength=k)
+        centers[filled, axis] = sums[filled] / totals[filled]
+    return centers
+
+
+# --- Capacitated k-means ---
+def _capacitated_assignment(distances, weights, capacity):
+    """
+    Greedy regret assignment: units whose best and second-best centers differ the most choose first,
+    each taking the nearest center with room left. A unit no center has room for goes to the one
+    with the most room, so the capacity is a target rather than a hard limit.
+    """
+    k = distances.shape[1]
+    order_by_distance = np.argsort(distances, axis=1)
+    if k > 1:
+        sorted_distances = np.take_along_axis(distances, order_by_distance[:, :2], axis=1)
+        regret = sorted_distances[:, 1] - sorted_distances[:, 0]
+    else:
+        regret = np.zeros(len(weights))
+    # Heavy units first among equal regrets, so they are not left with no room anywhere.
+    order = np.lexsort((-weights, -regret))
+
+    labels = np.empty(len(weights), dtype=np.int64)
+    load = np.zeros(k)
+    for unit in order:
+        weight = weights[unit]
+        for center in order_by_distance[unit]:
+            if load[center] + weight <= capacity:
+                break
+        else:
+            center = int(np.argmin(load))
+        labels[unit] = center
+        load[center] += weight
+    return labels
+
+
+def capacitated_kmeans(points, weights, centers, tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS):
+    """
+    Partitions weighted points (N x 2, in km) around the given starting centers (K x 2) so that
+    no group holds much more than (1 + tolerance) times the average weight.
+    Returns (labels, centers, iterations).
+    """
+    k = len(centers)
+    capacity = weights.sum() / k * (1 + tolerance)
+    labels = None
+    for iterations in range(1, max(max_iterations, 1) + 1):
+        new_labels = _capacitated_assignment(_pairwise_km(points, centers), weights, capacity)
+        centers = _weighted_centers(points, weights, new_labels, k, centers)
+        converged = labels is not None and np.array_equal(labels, new_labels)
+        labels = new_labels
+        if converged:
+            break
+    return labels, centers, iterations
+
+
+# --- Reporting ---
+def _travel_cost(distances_km, params):
+    """Cost of a round trip from the group's center to every client, priced like price_travel."""
+    if params is None or not len(distances_km):
+        return None
+    road_km = 2 * ROAD_DISTANCE_FACTOR * distances_km
+    minutes = road_km / FALLBACK_SPEED_KMH * 60
+    per_visit = float(params.truck_depreciation_fixed_cost) + float(params.supply_charge_fixed_cost)
+    total = minutes.sum() * float(params.cost_per_minute) + road_km.sum() * float(params.cost_per_km) + per_visit * len(distances_km)
+    return round(float(total), 2)
+
+
+def _manager_key(manager):
+    return manager.code or manager.pk
+
+
+def _summarize(managers, points, client_labels, params):
+    k = len(managers)
+    rows = []
+    for index, manager in enumerate(managers):
+        members = points[client_labels == index]
+        row = {'manager': _manager_key(manager), 'name': str(manager), 'clients': int(len(members))}
+        if len(members):
+            center = members.mean(axis=0)
+            distances = np.sqrt(((members - center) ** 2).sum(axis=1))
+            row.update({
+                'spread_km': round(float(distances.mean()), 1),
+                'max_km': round(float(distances.max()), 1),
+                'travel_cost': _travel_cost(distances, params),
+            })
+        else:
+            row.update({'spread_km': None, 'max_km': None, 'travel_cost': None})
+        rows.append(row)
+
+    counts = np.array([row['clients'] for row in rows], dtype=float)
+    assigned = counts.sum()
+    return {
+        'managers': rows,
+        'assigned_clients': int(assigned),
+        'unassigned_clients': int(len(points) - assigned),
+        # Coefficient of variation of the client counts: 0 is perfectly balanced.
+        'imbalance': round(float(counts.std() / counts.mean()), 3) if k and counts.mean() else None,
+        'travel_cost': round(sum(row['travel_cost'] or 0 for row in rows), 2) if params else None,
+    }
+
+
+def partition_territories(managers=None, tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS, clients=None):
+    """
+    Balances geocoded clients between `managers` (all managers by default) by reassigning whole FSAs.
+    Returns {'current': summary, 'proposed': summary, 'reassignments': [...], ...} where each summary
+    lists every manager's client count, spread (mean and max km from the group's center) and
+    estimated round-trip travel cost.
+    """
+    if managers is None:
+        managers = EmployeeProfile.objects.filter(role=EmployeeProfile.Role.MANAGER).select_related('user').order_by('code')
+    managers = list(managers)
+    if not managers:
+        raise ValueError("There are no managers to partition clients between.")
+
+    codes, latitudes, longitudes, skipped = load_client_points(clients)
+    if not len(codes):
+        raise ValueError("There are no geocoded clients with a postal code to partition.")
+
+    points = _project(latitudes, longitudes, float(np.median(latitudes)))
+    unit_codes, client_units = np.unique(codes, return_inverse=True)
+    weights = np.bincount(client_units).astype(float)
+    unit_points = np.column_stack([
+        np.bincount(client_units, weights=points[:, axis]) / weights for axis in range(2)
+    ])
+
+    # Current assignment, and seeds: each manager starts at the center of the clients they have today.
+    owners = load_manager_fsas(managers)
+    k = len(managers)
+    current_unit_labels = np.array([owners.get(code, -1) for code in unit_codes])
+    seeds = np.empty((k, 2))
+    unowned_seed_order = iter(np.argsort(-weights))
+    for index in range(k):
+        owned = current_unit_labels == index
+        if owned.any():
+            seeds[index] = np.average(unit_points[owned], axis=0, weights=weights[owned])
+        else:
+            # Managers without territories start on the busiest FSAs nobody else was seeded on.
+            seeds[index] = unit_points[next(unowned_seed_order, 0)]
+
+    unit_labels, _, iterations = capacitated_kmeans(unit_points, weights, seeds, tolerance, max_iterations)
+
+    params = get_latest_travel_cost_parameters()
+    current = _summarize(managers, points, current_unit_labels[client_units], params)
+    proposed = _summarize(managers, points, unit_labels[client_units], params)
+
+    reassignments = []
+    moved_clients = 0
+    for unit, code in enumerate(unit_codes):
+        before, after = current_unit_labels[unit], unit_labels[unit]
+        if before != after:
+            moved_clients += int(weights[unit])
+            reassignments.append({
+                'fsa': str(code),
+                'clients': int(weights[unit]),
+                'from': _manager_key(managers[before]) if before >= 0 else None,
+                'to': _manager_key(managers[after]),
+            })
+    reassignments.sort(key=lambda move: (-move['clients'], move['fsa']))
+
+    return {
+        'current': current,
+        'proposed': proposed,
+        'reassignments': reassignments,
+        'moved_clients': moved_clients,
+        'fsas': int(len(unit_codes)),
+        'clients_without_fsa': skipped,
+        'iterations': iterations,
+    }
+
@@ -1,6 +1,30 @@
-from DAO.adresses_DAO import GoogleMapsClient
-from organization.models import TravelCostParameters
+from core.reference_data import get_latest_travel_cost_parameters
 from address.models import Address
+from services.travel_time_service import get_travel_time
+
+def price_travel(duration_seconds, distance_meters, params, stops=1):
+    """
+    Prices driving time and distance with a TravelCostParameters row. The truck depreciation is
+    charged once per trip and the supply charge once per stop.
+    """
+    distance_km = distance_meters / 1000
+    duration_minutes = duration_seconds / 60
+
+    time_cost = duration_minutes * float(params.cost_per_minute)
+    gas_cost = distance_km * float(params.cost_per_km)
+    truck_depreciation = float(params.truck_depreciation_fixed_cost)
+    supply_charge = float(params.supply_charge_fixed_cost) * stops
+    total_cost = time_cost + gas_cost + truck_depreciation + supply_charge
+
+    return {
+        "total_cost": round(total_cost, 2),
+        "time_cost": round(time_cost, 2),
+        "gas_cost": round(gas_cost, 2),
+        "truck_depreciation": truck_depreciation,
+        "supply_charge": supply_charge,
+        "distance_km": round(distance_km, 2),
+        "duration_minutes": round(duration_minutes, 2),
+    }
 
 def calculate_driving_cost(origin_address: Address, destination_address: Address):
     """
@@ -16,37 +40,15 @@ def calculate_driving_cost(origin_address: Address, destination_address: Address
     if not origin_address or not destination_address or not origin_address.place_id or not destination_address.place_id:
         return None
 
-    # 1. Get distance and duration from Google Maps
-    gmaps_client = GoogleMapsClient()
-    distance_matrix = gmaps_client.get_distance_matrix(
-        origin_place_id=origin_address.place_id,
-        destination_place_id=destination_address.place_id
-    )
+    # 1. Get the most recent cost parameters (cached per process, see core.reference_data)
+    params = get_latest_travel_cost_parameters()
+    if params is None:
+        return {"error": "Travel cost parameters not configured."}
 
-    if not distance_matrix:
+    # 2. Get distance and duration, from the TravelTime cache or the Routes API
+    duration_seconds, distance_meters = get_travel_time(origin_address, destination_address)
+    if not duration_seconds and not distance_meters:
         return None
 
-    # 2. Get the most recent cost parameters from the database
-    try:
-        # Use .latest() to be explicit about getting the most recent record.
-        params = TravelCostParameters.objects.latest('created_at')
-    except TravelCostParameters.DoesNotExist:
-        return {"error": "Travel cost parameters not configured."}
-
     # 3. Perform the calculation
-    distance_km = distance_matrix['distance_meters'] / 1000
-    duration_minutes = distance_matrix['duration_seconds'] / 60
-
-    time_cost = duration_minutes * float(params.cost_per_minute)
-    gas_cost = distance_km * float(params.cost_per_km)
-    total_cost = time_cost + gas_cost + float(params.truck_depreciation_fixed_cost) + float(params.supply_charge_fixed_cost)
-
-    return {
-        "total_cost": round(total_cost, 2),
-        "time_cost": round(time_cost, 2),
-        "gas_cost": round(gas_cost, 2),
-        "truck_depreciation": float(params.truck_depreciation_fixed_cost),
-        "supply_charge": float(params.supply_charge_fixed_cost),
-        "distance_km": round(distance_km, 2),
-        "duration_minutes": round(duration_minutes, 2),
-    }
+    return price_travel(duration_seconds, distance_meters, params)
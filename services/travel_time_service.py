@@ -0,0 +1,169 @@
+"""
+Cached driving times between Addresses. Pairs missing from the TravelTime table are fetched from the
+Routes API in blocks of at most ROUTES_MATRIX_BLOCK x ROUTES_MATRIX_BLOCK and stored for reuse, so a
+route over the same sites costs API calls only the first time.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.utils import timezone
+from DAO.adresses_DAO import GoogleMapsClient
+from address.models import TravelTime
+from address.geo import haversine_km
+
+# 25 x 25 = 625 elements and 50 waypoints, the Routes API limits for one matrix request.
+ROUTES_MATRIX_BLOCK = 25
+ROUTES_MATRIX_WAYPOINTS = 50
+TRAVEL_TIME_LOOKUP_BATCH = 500
+# Used when the API has no route for a pair: great-circle distance stretched to a road distance.
+ROAD_DISTANCE_FACTOR = 1.3
+FALLBACK_SPEED_KMH = 50
+
+
+def _waypoint(address):
+    if address.place_id:
+        return {'placeId': address.place_id}
+    return {'location': {'latLng': {'latitude': float(address.latitude), 'longitude': float(address.longitude)}}}
+
+
+def _parse_duration(value):
+    """Routes API durations are strings like '1234s'."""
+    return int(round(float(str(value).rstrip('s') or 0)))
+
+
+def estimate_travel(origin, destination):
+    """A (duration_seconds, distance_meters) guess from the great-circle distance, or None without coordinates."""
+    if None in (origin.latitude, origin.longitude, destination.latitude, destination.longitude):
+        return None
+    road_km = haversine_km(origin.latitude, origin.longitude, destination.latitude, destination.longitude) * ROAD_DISTANCE_FACTOR
+    return int(road_km / FALLBACK_SPEED_KMH * 3600), int(road_km * 1000)
+
+
+def _request_block(origins, destinations, gmaps_client):
+    """One matrix request. Returns {(origin_id, destination_id): (seconds, metres)} for the routable pairs."""
+    elements = gmaps_client.compute_routes_matrix_waypoints(
+        [_waypoint(a) for a in origins], [_waypoint(a) for a in destinations],
+    )
+    fetched = {}
+    for element in elements or []:
+        if element.get('condition', 'ROUTE_EXISTS') != 'ROUTE_EXISTS' or 'duration' not in element:
+            continue
+        origin = origins[element.get('originIndex', 0)]
+        destination = destinations[element.get('destinationIndex', 0)]
+        if origin.pk != destination.pk:
+            fetched[(origin.pk, destination.pk)] = (_parse_duration(element['duration']), int(element.get('distanceMeters', 0)))
+    return fetched
+
+
+def _store(fetched):
+    TravelTime.objects.bulk_create(
+        [
+            TravelTime(origin_id=origin_id, destination_id=destination_id, duration_seconds=duration, distance_meters=distance)
+            for (origin_id, destination_id), (duration, distance) in fetched.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['origin', 'destination'],
+        update_fields=['duration_seconds', 'distance_meters', 'fetched_at'],
+    )
+
+
+def _fetch_missing_pairs(addresses, missing, gmaps_client):
+    """Requests every block holding a missing pair and stores the results. Returns {(origin_id, destination_id): (s, m)}."""
+    blocks = sorted({(i // ROUTES_MATRIX_BLOCK, j // ROUTES_MATRIX_BLOCK) for i, j in missing})
+    fetched = {}
+    for origin_block, destination_block in blocks:
+        origins = addresses[origin_block * ROUTES_MATRIX_BLOCK:(origin_block + 1) * ROUTES_MATRIX_BLOCK]
+        destinations = addresses[destination_block * ROUTES_MATRIX_BLOCK:(destination_block + 1) * ROUTES_MATRIX_BLOCK]
+        fetched.update(_request_block(origins, destinations, gmaps_client))
+    _store(fetched)
+    return fetched
+
+
+def get_travel_matrix(addresses, gmaps_client=None, max_age_days=None):
+    """
+    Returns (durations, distances, estimated_pairs) for a list of saved Addresses: N x N lists of
+    seconds and metres (zero on the diagonal) and the number of pairs the API could not route,
+    which are filled with a great-circle estimate and not cached.
+    Cached pairs older than `max_age_days` are fetched again.
+    """
+    ids = [address.pk for address in addresses]
+    size = len(ids)
+
+    cached = TravelTime.objects.filter(origin_id__in=ids, destination_id__in=ids)
+    if max_age_days is not None:
+        cached = cached.filter(fetched_at__gte=timezone.now() - timedelta(days=max_age_days))
+    known = {
+        (origin_id, destination_id): (duration, distance)
+        for origin_id, destination_id, duration, distance
+        in cached.values_list('origin_id', 'destination_id', 'duration_seconds', 'distance_meters')
+    }
+
+    missing = [
+        (i, j) for i in range(size) for j in range(size)
+        if ids[i] != ids[j] and (ids[i], ids[j]) not in known
+    ]
+    if missing:
+        known.update(_fetch_missing_pairs(addresses, missing, gmaps_client or GoogleMapsClient()))
+
+    durations = [[0] * size for _ in range(size)]
+    distances = [[0] * size for _ in range(size)]
+    estimated = 0
+    for i in range(size):
+        for j in range(size):
+            if ids[i] == ids[j]:
+                continue
+            pair = known.get((ids[i], ids[j]))
+            if pair is None:
+                pair = estimate_travel(addresses[i], addresses[j]) or (0, 0)
+                estimated += 1
+            durations[i][j], distances[i][j] = pair
+    return durations, distances, estimated
+
+
+def get_travel_time(origin, destination, gmaps_client=None):
+    """Returns (duration_seconds, distance_meters) from one Address to another, using the cache."""
+    durations, distances, _ = get_travel_matrix([origin, destination], gmaps_client=gmaps_client)
+    return durations[0][1], distances[0][1]
+
+
+def get_travel_times(pairs, gmaps_client=None):
+    """
+    Returns {(origin_id, destination_id): (duration_seconds, distance_meters, is_estimate)} for a list of
+    (origin, destination) Address pairs. Unlike get_travel_matrix only the listed pairs are requested:
+    the missing ones are grouped by origin, ROUTES_MATRIX_WAYPOINTS - 1 destinations per request.
+    """
+    wanted = {(origin.pk, destination.pk): (origin, destination) for origin, destination in pairs if origin.pk != destination.pk}
+    results = {}
+    keys = list(wanted)
+    for index in range(0, len(keys), TRAVEL_TIME_LOOKUP_BATCH):
+        batch = keys[index:index + TRAVEL_TIME_LOOKUP_BATCH]
+        cached = TravelTime.objects.filter(
+            origin_id__in={origin_id for origin_id, _ in batch},
+            destination_id__in={destination_id for _, destination_id in batch},
+        ).values_list('origin_id', 'destination_id', 'duration_seconds', 'distance_meters')
+        for origin_id, destination_id, duration, distance in cached:
+            if (origin_id, destination_id) in wanted:
+                results[(origin_id, destination_id)] = (duration, distance, False)
+
+    by_origin = defaultdict(list)
+    for key, (origin, destination) in wanted.items():
+        if key not in results:
+            by_origin[origin.pk].append((origin, destination))
+    if by_origin:
+        gmaps_client = gmaps_client or GoogleMapsClient()
+        per_request = ROUTES_MATRIX_WAYPOINTS - 1
+        fetched = {}
+        for origin_pairs in by_origin.values():
+            origin = origin_pairs[0][0]
+            destinations = [destination for _, destination in origin_pairs]
+            for start in range(0, len(destinations), per_request):
+                fetched.update(_request_block([origin], destinations[start:start + per_request], gmaps_client))
+        _store(fetched)
+        for key, (duration, distance) in fetched.items():
+            results[key] = (duration, distance, False)
+
+    for key, (origin, destination) in wanted.items():
+        if key not in results:
+            estimate = estimate_travel(origin, destination)
+            if estimate:
+                results[key] = (*estimate, True)
+    return results
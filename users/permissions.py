@@ -0,0 +1,190 @@
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.utils.functional import SimpleLazyObject
+from core.version_stamps import bump, get_version
+from employees.models import EmployeeProfile
+from organization.models import Territory
+
+SESSION_KEY = '_authorization'
+VERSION_STAMP_KEY = 'authz:{user_id}'
+# Upper bound on how long a session keeps its resolved roles. Invalidation happens through the
+# version stamp; this is a backstop for changes made without signals (raw SQL, .update()).
+MAX_AGE_SECONDS = getattr(settings, 'AUTHORIZATION_MAX_AGE_SECONDS', 300)
+
+
+class UserAuthorization:
+    """The roles, groups and territory scope of a user, resolved once and kept in the session."""
+
+    def __init__(self, user_id=None, is_superuser=False, groups=(), role=None, territory_ids=()):
+        self.user_id = user_id
+        self.is_superuser = is_superuser
+        self.groups = frozenset(groups)
+        self.role = role
+        self.territory_ids = frozenset(territory_ids)
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_director(self):
+        return 'Directors' in self.groups
+
+    @property
+    def is_admin_or_director(self):
+        return self.is_superuser or self.is_director
+
+    @property
+    def has_full_scope(self):
+        """Superusers and directors see every territory."""
+        return self.is_admin_or_director
+
+    def in_group(self, name):
+        return name in self.groups
+
+    def scope_clients(self, queryset):
+        """Restricts a Client queryset to the user's territories, using the ids already in the session."""
+        if self.has_full_scope:
+            return queryset
+        return queryset.filter(territory_id__in=self.territory_ids)
+
+    def to_session(self, version):
+        return {
+            'user_id': self.user_id,
+            'is_superuser': self.is_superuser,
+            'groups': sorted(self.groups),
+            'role': self.role,
+            'territory_ids': sorted(self.territory_ids),
+            'version': version,
+            'resolved_at': time.time(),
+        }
+
+    @classmethod
+    def from_session(cls, data):
+        return cls(
+            user_id=data['user_id'],
+            is_superuser=data['is_superuser'],
+            groups=data['groups'],
+            role=data['role'],
+            territory_ids=data['territory_ids'],
+        )
+
+
+ANONYMOUS = UserAuthorization()
+
+
+def resolve_authorization(user):
+    """Loads a user's roles, groups and territories from the database."""
+    if not user.is_authenticated:
+        return ANONYMOUS
+    profile = EmployeeProfile.objects.filter(user=user).values('role').first()
+    return UserAuthorization(
+        user_id=user.pk,
+        is_superuser=user.is_superuser,
+        groups=user.groups.values_list('name', flat=True),
+        role=profile['role'] if profile else None,
+        territory_ids=Territory.objects.filter(employees__user=user).values_list('pk', flat=True),
+    )
+
+
+def get_authorization_version(user_id):
+    """Returns the user's current invalidation stamp (one indexed lookup, shared by every worker)."""
+    return get_version(VERSION_STAMP_KEY.format(user_id=user_id))
+
+
+def invalidate_authorization(*user_ids):
+    """Forces every session of the given users to re-resolve their roles on the next request."""
+    bump(*(VERSION_STAMP_KEY.format(user_id=user_id) for user_id in user_ids))
+
+
+def get_authorization(request):
+    """
+    Returns the request user's UserAuthorization, resolving it from the database only when the
+    session has no entry, the entry is stale, or it belongs to another user.
+    """
+    cached = getattr(request, '_authorization', None)
+    if cached is not None:
+        return cached
+
+    user = request.user
+    if not user.is_authenticated:
+        request._authorization = ANONYMOUS
+        return ANONYMOUS
+
+    version = get_authorization_version(user.pk)
+    data = request.session.get(SESSION_KEY)
+    if (
+        data
+        and data.get('user_id') == user.pk
+        and data.get('version') == version
+        and time.time() - data.get('resolved_at', 0) < MAX_AGE_SECONDS
+    ):
+        authorization = UserAuthorization.from_session(data)
+    else:
+        authorization = resolve_authorization(user)
+        request.session[SESSION_KEY] = authorization.to_session(version)
+
+    request._authorization = authorization
+    return authorization
+
+
+class AuthorizationMiddleware:
+    """Exposes the cached authorization as `request.authz`, resolved lazily on first use."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, stay async so the async views don't each hold a thread.
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.authz = SimpleLazyObject(lambda: get_authorization(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.authz = SimpleLazyObject(lambda: get_authorization(request))
+        return await self.get_response(request)
+
+
+def authorization_context(request):
+    """Template context processor making `authz` available to every template."""
+    return {'authz': getattr(request, 'authz', ANONYMOUS)}
+
+
+# --- View Helpers ---
+def authorization_required(test):
+    """
+    Function view decorator: like user_passes_test, but `test` receives the cached
+    UserAuthorization instead of the user.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if test(get_authorization(request)):
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+        return _wrapped_view
+    return decorator
+
+
+admin_or_director_required = authorization_required(lambda authz: authz.is_admin_or_director)
+
+
+class AdminOrDirectorRequiredMixin(AccessMixin):
+    """Class view mixin granting access to superusers and members of the Directors group."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not get_authorization(request).is_admin_or_director:
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User, Group
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from employees.models import EmployeeProfile
+from .permissions import invalidate_authorization
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_on_group_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_authorization(instance.pk)
+    elif action == 'pre_clear':
+        invalidate_authorization(*instance.user_set.values_list('pk', flat=True))
+    elif pk_set:
+        invalidate_authorization(*pk_set)
+
+@receiver(pre_delete, sender=Group)
+def invalidate_on_group_delete(sender, instance, **kwargs):
+    invalidate_authorization(*instance.user_set.values_list('pk', flat=True))
+
+@receiver(m2m_changed, sender=EmployeeProfile.territories.through)
+def invalidate_on_territory_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_authorization(instance.user_id)
+    elif action == 'pre_clear':
+        invalidate_authorization(*instance.employees.values_list('user_id', flat=True))
+    elif pk_set:
+        invalidate_authorization(*EmployeeProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def invalidate_on_profile_change(sender, instance, **kwargs):
+    invalidate_authorization(instance.user_id)
+
+@receiver(post_save, sender=User)
+def invalidate_on_user_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_authorization(instance.pk)